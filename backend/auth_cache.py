@@ -0,0 +1,94 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+
+class PrincipalCache:
+    """Short-lived cache of admin documents keyed by token ``(sub, jti)``.
+
+    Lets authenticated requests skip the ``admins`` lookup. Entries expire
+    after ``ttl_seconds``, which also bounds how long a change made by another
+    process can go unnoticed; changes made here are dropped at once through
+    ``invalidate_admin`` and ``invalidate_token``.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, Optional[str]], Tuple[float, dict]]" = OrderedDict()
+
+    def get(self, sub: str, jti: Optional[str]) -> Optional[dict]:
+        key = (sub, jti)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, admin = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return admin
+
+    def set(self, sub: str, jti: Optional[str], admin: dict) -> None:
+        key = (sub, jti)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, admin)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate_admin(self, sub: str) -> None:
+        for key in [k for k in self._entries if k[0] == sub]:
+            del self._entries[key]
+
+    def invalidate_token(self, jti: str) -> None:
+        for key in [k for k in self._entries if k[1] == jti]:
+            del self._entries[key]
+
+
+class RevocationList:
+    """In-memory mirror of revoked token ids.
+
+    Lookups are a set membership test. The source of truth is the
+    ``revoked_tokens`` collection, reloaded periodically so revocations made
+    by other processes are picked up. A reload keeps revocations added here
+    after it started (see ``mark``), since its query may have missed them.
+    """
+
+    def __init__(self):
+        self._revoked: Dict[str, float] = {}
+        # Local additions by sequence number, until a reload has seen them
+        self._seq = 0
+        self._added: Dict[str, int] = {}
+
+    def __contains__(self, jti: str) -> bool:
+        expires_at = self._revoked.get(jti)
+        if expires_at is None:
+            return False
+        if expires_at <= time.time():
+            # The token is past its own expiry; jwt.decode rejects it anyway
+            del self._revoked[jti]
+            return False
+        return True
+
+    def add(self, jti: str, expires_at: float) -> None:
+        self._seq += 1
+        self._revoked[jti] = expires_at
+        self._added[jti] = self._seq
+
+    def mark(self) -> int:
+        """Position to hand to ``replace`` for a snapshot queried after this call."""
+        return self._seq
+
+    def replace(self, entries: Iterable[Tuple[str, float]], since: Optional[int] = None) -> None:
+        """Swap in a snapshot, keeping local additions made after ``since``."""
+        revoked = dict(entries)
+        recent = {jti: seq for jti, seq in self._added.items() if since is not None and seq > since}
+        for jti in recent:
+            if jti in self._revoked:
+                revoked.setdefault(jti, self._revoked[jti])
+        self._added = recent
+        self._revoked = revoked
+
+    @property
+    def ids(self) -> Set[str]:
+        return set(self._revoked)
@@ -0,0 +1,95 @@
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, Optional
+
+
+@dataclass
+class CacheEntry:
+    body: bytes
+    headers: Dict[str, str] = field(default_factory=dict)
+    generation: int = 0
+    expires_at: float = 0.0
+    etag: str = ""
+    # Compressed bodies by content coding, filled on first use
+    encoded: Dict[str, bytes] = field(default_factory=dict)
+
+
+def compute_etag(body: bytes, headers: Optional[Dict[str, str]] = None) -> str:
+    """Strong validator over the body and the headers that describe it."""
+    digest = hashlib.sha256(body)
+    for name, value in sorted((headers or {}).items()):
+        digest.update(f"\n{name.lower()}:{value}".encode('utf-8'))
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison function
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in candidates)
+
+
+class CatalogCache:
+    """Bounded TTL + LRU cache for rendered public catalog responses.
+
+    Writes bump ``generation``; entries stored under an older generation are
+    treated as misses, so invalidation is O(1) and a read that raced with a
+    write can never repopulate the cache with stale data.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.generation = 0
+        self.invalidated_at = float("-inf")
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None or entry.generation != self.generation or entry.expires_at <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def set(self, key: Hashable, body: bytes, headers: Optional[Dict[str, str]] = None,
+            generation: Optional[int] = None) -> CacheEntry:
+        """Store a rendered body.
+
+        ``generation`` is the value observed before loading; if a write bumped
+        it in the meantime the entry is returned but not stored.
+        """
+        if generation is None:
+            generation = self.generation
+        entry = CacheEntry(
+            body=body,
+            headers=dict(headers or {}),
+            generation=generation,
+            expires_at=time.monotonic() + self.ttl_seconds,
+            etag=compute_etag(body, headers),
+        )
+        if generation != self.generation:
+            return entry
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self) -> None:
+        self.generation += 1
+        self.invalidated_at = time.monotonic()
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
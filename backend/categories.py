@@ -0,0 +1,75 @@
+import uuid
+from typing import Dict, List
+
+from pymongo import UpdateOne
+
+# Category ids are derived from the name so they stay stable across
+# processes, reconciliations and re-creation after reaching zero
+CATEGORY_NAMESPACE = uuid.UUID("6f1c2f4e-5a43-4f0e-9a0b-6a1d3c8e2b71")
+
+
+def category_id(name: str) -> str:
+    return str(uuid.uuid5(CATEGORY_NAMESPACE, name))
+
+
+class CategoryCounts:
+    """Per-category media counts kept in their own collection.
+
+    Writers apply ``$inc`` deltas alongside their media writes, so listing
+    categories reads one small document per category instead of grouping
+    the whole media collection. Categories that drop to zero keep their
+    document and are filtered out of ``list``.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def apply(self, deltas: Dict[str, int]) -> None:
+        operations = [
+            UpdateOne(
+                {"name": name},
+                {"$inc": {"count": delta}, "$setOnInsert": {"id": category_id(name)}},
+                upsert=True
+            )
+            for name, delta in deltas.items()
+            if name is not None and delta
+        ]
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+
+    async def move(self, old: str, new: str, count: int = 1) -> None:
+        if old != new:
+            await self.apply({old: -count, new: count})
+
+    async def list(self, collection=None) -> List[dict]:
+        """Categories with media, by name. ``collection`` overrides the handle
+        read from, e.g. one with a different read preference."""
+        collection = self.collection if collection is None else collection
+        return await collection.find(
+            {"count": {"$gt": 0}}, {"_id": 0, "id": 1, "name": 1, "count": 1}
+        ).sort("name", 1).to_list(None)
+
+    async def reconcile(self, media_collection) -> Dict[str, int]:
+        """Recompute every count from the media collection.
+
+        Writes that land while the aggregation runs can be overwritten; run
+        it again, or during a quiet period, if that matters.
+        """
+        pipeline = [{"$group": {"_id": "$category", "count": {"$sum": 1}}}]
+        counts = {
+            c["_id"]: c["count"]
+            for c in await media_collection.aggregate(pipeline).to_list(None)
+            if c["_id"] is not None
+        }
+        operations = [
+            UpdateOne(
+                {"name": name},
+                {"$set": {"count": count}, "$setOnInsert": {"id": category_id(name)}},
+                upsert=True
+            )
+            for name, count in counts.items()
+        ]
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+        await self.collection.delete_many({"name": {"$nin": list(counts)}})
+        return counts
@@ -0,0 +1,140 @@
+import gzip
+from typing import Dict, Iterable, Optional
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is listed in requirements.txt
+    brotli = None
+
+# Preferred first when the client accepts both equally
+CODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+COMPRESSIBLE_TYPES = (
+    "application/json", "application/javascript", "application/xml", "application/manifest+json",
+    "image/svg+xml", "text/",
+)
+
+
+def is_compressible(content_type: str) -> bool:
+    content_type = content_type.split(";")[0].strip().lower()
+    return any(content_type.startswith(t) for t in COMPRESSIBLE_TYPES)
+
+
+def negotiate(accept_encoding: Optional[str], available: Iterable[str] = CODINGS) -> Optional[str]:
+    """Pick the best coding from ``Accept-Encoding``, or None for identity."""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for token in accept_encoding.split(","):
+        name, _, params = token.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for coding in available:
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body: bytes, coding: str, gzip_level: int = 6, brotli_quality: int = 5) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    # mtime=0 keeps the output, and so the ETag, stable across processes
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+def encoded_etag(etag: str, coding: str) -> str:
+    """Strong ETags differ per representation; same scheme as file sidecars."""
+    weak = etag.startswith("W/")
+    tag = etag[2:] if weak else etag
+    return f'{"W/" if weak else ""}{tag[:-1]}-{coding}"'
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing buffered responses.
+
+    Applies to compressible content types of at least ``minimum_size`` bytes
+    that are not already encoded. Bodies are buffered up to ``max_buffer``
+    bytes (``BaseHTTPMiddleware`` turns every response into a stream of
+    chunks); anything larger, event streams, range-capable file responses and
+    HEAD requests pass through untouched.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5,
+                 max_buffer: int = 4 * 1024 * 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.max_buffer = max_buffer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        accept = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"accept-encoding"), None)
+        coding = negotiate(accept)
+
+        start = None
+        chunks = []
+        buffered = 0
+
+        def with_vary(message):
+            headers = [(k, v) for k, v in message.get("headers", []) if k.lower() != b"vary"]
+            vary = [v for k, v in message.get("headers", []) if k.lower() == b"vary"]
+            if b"accept-encoding" not in b",".join(vary).lower():
+                vary.append(b"Accept-Encoding")
+            return headers + [(b"vary", b", ".join(vary))]
+
+        async def send_wrapper(message):
+            nonlocal start, buffered
+            if message["type"] == "http.response.start":
+                headers = {k.lower(): v for k, v in message.get("headers", [])}
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                if (
+                    b"content-encoding" in headers or b"accept-ranges" in headers
+                    or not is_compressible(content_type) or content_type.startswith("text/event-stream")
+                ):
+                    await send(message)
+                    return
+                # Hold the start until the whole body is known
+                start = message
+                return
+            if start is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            buffered += len(chunks[-1])
+            if message.get("more_body"):
+                if buffered > self.max_buffer:
+                    # Too big to hold; send what we have and stream the rest
+                    held, start = start, None
+                    await send({**held, "headers": with_vary(held)})
+                    await send({"type": "http.response.body", "body": b"".join(chunks), "more_body": True})
+                    chunks.clear()
+                return
+
+            held, start = start, None
+            body = b"".join(chunks)
+            chunks.clear()
+            headers = with_vary(held)
+            if coding and len(body) >= self.minimum_size:
+                body = compress(body, coding, self.gzip_level, self.brotli_quality)
+                headers = [
+                    (k, encoded_etag(v.decode("latin-1"), coding).encode("latin-1") if k.lower() == b"etag" else v)
+                    for k, v in headers if k.lower() != b"content-length"
+                ]
+                headers += [(b"content-encoding", coding.encode()), (b"content-length", str(len(body)).encode())]
+            await send({**held, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
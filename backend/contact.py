@@ -0,0 +1,191 @@
+"""Contact form ingestion: per-client rate limiting, duplicate detection and
+batched inserts.
+
+Submissions are acknowledged once they are in the in-process buffer and
+reach Mongo on the next flush, so the inbox lags by at most
+``flush_interval``. The buffer is flushed on shutdown; a hard crash loses
+whatever was still pending.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+
+class BufferFull(Exception):
+    """Too many messages are waiting for a flush, e.g. while Mongo is down."""
+
+
+def message_hash(email: str, subject: str, message: str, window: float,
+                 now: Optional[float] = None) -> str:
+    """Identity of a submission within a ``window`` seconds time bucket,
+    ignoring case and whitespace differences.
+
+    The bucket is part of the hash, so the same text sent again in a later
+    bucket is a new message; a repeat straddling a bucket edge also gets
+    through once.
+    """
+    bucket = int((time.time() if now is None else now) // window)
+    parts = [" ".join(part.split()).lower() for part in (email, subject, message)]
+    normalized = "\x00".join(parts + [str(bucket)])
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def client_address(client_host: Optional[str], forwarded_for: Optional[str], trusted_proxies: int) -> str:
+    """Address of the client behind ``trusted_proxies`` reverse proxies.
+
+    Each proxy appends the address it received the request from to
+    ``X-Forwarded-For``, so the entry ``trusted_proxies`` hops from the right
+    is the last one a trusted proxy wrote; anything left of it is client
+    controlled. With no trusted proxies the header is ignored.
+    """
+    if trusted_proxies > 0 and forwarded_for:
+        hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+        if hops:
+            return hops[-min(trusted_proxies, len(hops))]
+    return client_host or "unknown"
+
+
+class RateLimiter:
+    """Token bucket per key: ``burst`` requests at once, refilled at
+    ``rate`` per second.
+
+    At most ``max_keys`` buckets are tracked; the least recently seen are
+    dropped first, which hands those keys a full bucket again.
+    """
+
+    def __init__(self, rate: float, burst: int, max_keys: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def acquire(self, key: str) -> float:
+        """Take a token for ``key``. Returns 0 when allowed, otherwise the
+        seconds until a token is available."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens >= 1:
+            tokens -= 1
+            wait = 0.0
+        else:
+            wait = (1 - tokens) / self.rate if self.rate > 0 else float("inf")
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class MessageBuffer:
+    """Collects contact messages and writes them with ``insert_many``.
+
+    A flush runs every ``flush_interval`` seconds, or as soon as
+    ``max_batch`` messages are waiting. Hashes of recently accepted messages
+    are remembered so repeats are dropped before they are queued; the unique
+    ``content_hash`` index catches repeats this process has not seen. Hashes
+    include a time bucket (see ``message_hash``), so neither check blocks a
+    message for longer than that bucket.
+    """
+
+    def __init__(self, collection, max_batch: int = 100, flush_interval: float = 1.0,
+                 max_pending: int = 10000, recent_hashes: int = 10000):
+        self.collection = collection
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.recent_hashes = recent_hashes
+        self._pending: List[dict] = []
+        self._recent: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = asyncio.Lock()
+        self._full = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def add(self, doc: dict) -> bool:
+        """Queue ``doc``, which must carry ``content_hash``. Returns False
+        when it repeats a recent message. Raises ``BufferFull`` when the
+        backlog is at ``max_pending``."""
+        content_hash = doc["content_hash"]
+        if content_hash in self._recent:
+            self._recent.move_to_end(content_hash)
+            return False
+        if len(self._pending) >= self.max_pending:
+            raise BufferFull()
+        self._recent[content_hash] = None
+        while len(self._recent) > self.recent_hashes:
+            self._recent.popitem(last=False)
+        self._pending.append(doc)
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        return True
+
+    async def flush(self) -> Dict[str, int]:
+        """Write everything pending. Messages that fail for reasons other
+        than being duplicates go back on the queue and the error is raised.
+
+        Each message gets ``updated_at`` when it is written, however long it
+        waited, so the admin change feed sees it as new.
+        """
+        inserted = duplicates = 0
+        async with self._lock:
+            while self._pending:
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+                now = datetime.now(timezone.utc).isoformat()
+                for doc in batch:
+                    doc["updated_at"] = now
+                try:
+                    result = await self.collection.insert_many(batch, ordered=False)
+                    inserted += len(result.inserted_ids)
+                except BulkWriteError as e:
+                    errors = e.details.get("writeErrors", [])
+                    retry = [batch[err["index"]] for err in errors if err.get("code") != DUPLICATE_KEY]
+                    duplicates += len(errors) - len(retry)
+                    inserted += e.details.get("nInserted", 0)
+                    if retry:
+                        self._pending[:0] = retry
+                        raise
+                except PyMongoError:
+                    self._pending[:0] = batch
+                    raise
+        return {"inserted": inserted, "duplicates": duplicates}
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the periodic flush and write whatever is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush()
+        except PyMongoError:
+            logger.exception("Dropping %d contact messages that could not be written", len(self._pending))
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            try:
+                await self.flush()
+            except PyMongoError:
+                logger.exception("Contact message flush failed; %d messages kept for retry", len(self._pending))
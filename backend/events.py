@@ -0,0 +1,316 @@
+"""Admin change feed: incremental change events for the dashboard.
+
+On a replica set or sharded cluster each subscriber tails its own change
+stream and event ids are resume tokens, so a client can reconnect to any API
+process and continue where it stopped. A standalone mongod has no change
+streams; there one poller per process follows the watched collections while
+anyone is subscribed, and event ids only mean something to that process.
+
+The poller reads documents whose ``updated_at`` moved since its last pass,
+so every writer to a watched collection must set ``updated_at``. Deletes
+leave nothing to query: a pass whose document count disagrees with what it
+knows of, and every ``rescan_every``-th pass regardless, compares the full
+id lists.
+
+Events are ``{"collection", "op", "id", "doc"}`` with ``op`` one of
+``insert``, ``update`` or ``delete``. ``{"op": "reset"}`` (with a
+``collection`` when only one is affected) means the feed cannot say what
+changed and the client should reload.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Field identifying a document to clients, per watched collection
+KEY_FIELDS = {"media": "id", "contact_messages": "id", "settings": "type"}
+HIDDEN_FIELDS = ("_id", "content_hash", "title_terms")
+
+CHANGE_OPERATIONS = {"insert": "insert", "update": "update", "replace": "update", "delete": "delete"}
+
+Event = Tuple[Optional[str], Optional[dict]]
+
+# Ids per query when fetching documents a rescan found changed
+FETCH_BATCH = 500
+
+
+def _visible(doc: Optional[dict]) -> Optional[dict]:
+    if doc is None:
+        return None
+    return {k: v for k, v in doc.items() if k not in HIDDEN_FIELDS}
+
+
+def sse_message(event_id: Optional[str], event: Optional[dict]) -> str:
+    """One Server-Sent Events message. Without an event it only moves the
+    client's last event id, or is a bare keep-alive comment."""
+    lines = []
+    if event_id:
+        lines.append(f"id: {event_id}")
+    if event is not None:
+        lines.append(f"data: {json.dumps(event, default=str, separators=(',', ':'))}")
+    elif not lines:
+        lines.append(": ping")
+    return "\n".join(lines) + "\n\n"
+
+
+def change_event(change: dict) -> dict:
+    """Map a change stream document to a feed event."""
+    collection = change["ns"]["coll"]
+    key = KEY_FIELDS[collection]
+    op = CHANGE_OPERATIONS[change["operationType"]]
+    if op == "delete":
+        before = change.get("fullDocumentBeforeChange")
+        if not before or key not in before:
+            # Without pre-images only the Mongo _id is known
+            return {"op": "reset", "collection": collection}
+        return {"collection": collection, "op": op, "id": before[key], "doc": None}
+    doc = change.get("fullDocument")
+    if doc is None:
+        # Deleted again before the update lookup ran; its delete follows
+        return {"op": "reset", "collection": collection}
+    return {"collection": collection, "op": op, "id": doc.get(key), "doc": _visible(doc)}
+
+
+class ChangeFeed:
+    """Fans out changes to ``collections`` as an async iterator per client.
+
+    ``mode`` is ``auto`` (change streams when the deployment supports them),
+    ``change_stream`` or ``poll``. ``subscribe`` yields ``(event_id, None)``
+    every ``heartbeat`` seconds when idle, so callers can keep the connection
+    alive and the client's resume position current.
+
+    When polling, ``overlap`` is how far behind the newest ``updated_at``
+    seen each pass looks again, for writes from other processes whose
+    clocks or commits lag a little.
+    """
+
+    def __init__(self, db, collections: Iterable[str] = tuple(KEY_FIELDS), mode: str = "auto",
+                 poll_interval: float = 2.0, heartbeat: float = 15.0, history: int = 1000,
+                 rescan_every: int = 30, overlap: float = 5.0):
+        self.db = db
+        self.collections = tuple(collections)
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.heartbeat = heartbeat
+        self.rescan_every = rescan_every
+        self.overlap = overlap
+        self._resolved: Optional[str] = None
+        self._pre_images = False
+        self._setup_lock = asyncio.Lock()
+        # Polling state
+        self._epoch = uuid.uuid4().hex[:12]
+        self._seq = 0
+        self._log: "deque[Tuple[int, dict]]" = deque(maxlen=history)
+        # Per collection: updated_at of every known document, and the newest
+        self._known: Dict[str, Dict[Any, Optional[str]]] = {}
+        self._watermark: Dict[str, str] = {}
+        self._polls = 0
+        self._changed = asyncio.Event()
+        self._subscribers = 0
+        self._poll_task: Optional[asyncio.Task] = None
+
+    async def resolve_mode(self) -> str:
+        async with self._setup_lock:
+            if self._resolved is None:
+                self._resolved = self.mode
+                if self.mode == "auto":
+                    self._resolved = "change_stream" if await self._supports_change_streams() else "poll"
+                if self._resolved == "change_stream":
+                    self._pre_images = await self._enable_pre_images()
+                logger.info("Admin change feed using %s", self._resolved)
+            return self._resolved
+
+    async def _supports_change_streams(self) -> bool:
+        try:
+            hello = await self.db.client.admin.command("hello")
+        except Exception:
+            return False
+        return "setName" in hello or hello.get("msg") == "isdbgrid"
+
+    async def _enable_pre_images(self) -> bool:
+        """Ask for pre-images so deletes can name the document (MongoDB 6+)."""
+        try:
+            for name in self.collections:
+                await self.db.command("collMod", name, changeStreamPreAndPostImages={"enabled": True})
+            return True
+        except PyMongoError as e:
+            logger.info("Change stream pre-images unavailable, deletes will send resets: %s", e)
+            return False
+
+    async def subscribe(self, last_event_id: Optional[str] = None) -> AsyncIterator[Event]:
+        if await self.resolve_mode() == "change_stream":
+            stream = self._watch(last_event_id)
+        else:
+            stream = self._follow(last_event_id)
+        async for item in stream:
+            yield item
+
+    # ---------- change streams ----------
+
+    async def _watch(self, last_event_id: Optional[str]) -> AsyncIterator[Event]:
+        pipeline = [{"$match": {
+            "ns.coll": {"$in": list(self.collections)},
+            "operationType": {"$in": list(CHANGE_OPERATIONS)},
+        }}]
+        options = {"full_document": "updateLookup", "max_await_time_ms": 1000}
+        if self._pre_images:
+            options["full_document_before_change"] = "whenAvailable"
+        resume_after = {"_data": last_event_id} if last_event_id else None
+        while True:
+            try:
+                async with self.db.watch(pipeline, resume_after=resume_after, **options) as stream:
+                    last_sent = time.monotonic()
+                    while stream.alive:
+                        change = await stream.try_next()
+                        if change is not None:
+                            yield change["_id"]["_data"], change_event(change)
+                            last_sent = time.monotonic()
+                        elif time.monotonic() - last_sent >= self.heartbeat:
+                            # The post-batch token keeps quiet clients resumable
+                            token = stream.resume_token
+                            yield (token["_data"] if token else None), None
+                            last_sent = time.monotonic()
+                return
+            except OperationFailure as e:
+                if resume_after is None:
+                    raise
+                # Unknown token or history already gone from the oplog
+                logger.info("Cannot resume admin change feed: %s", e)
+                resume_after = None
+                yield None, {"op": "reset"}
+
+    # ---------- polling ----------
+
+    def _event_id(self, seq: int) -> str:
+        return f"{self._epoch}-{seq}"
+
+    def _emit(self, event: dict) -> None:
+        self._seq += 1
+        self._log.append((self._seq, event))
+
+    async def _poll(self) -> None:
+        seq = self._seq
+        periodic = self._polls % self.rescan_every == 0
+        self._polls += 1
+        for name in self.collections:
+            if name not in self._known or periodic:
+                await self._rescan(name)
+                continue
+            await self._read_updates(name)
+            if await self.db[name].estimated_document_count() != len(self._known[name]):
+                # Deleted, or written with an updated_at already behind us
+                await self._rescan(name)
+        if self._seq != seq:
+            changed, self._changed = self._changed, asyncio.Event()
+            changed.set()
+
+    def _record(self, name: str, doc: dict) -> None:
+        """Emit ``doc`` unless its ``updated_at`` was already seen."""
+        key = KEY_FIELDS[name]
+        known = self._known[name]
+        doc_id, stamp = doc[key], doc.get("updated_at")
+        if doc_id in known and known[doc_id] == stamp:
+            return
+        op = "update" if doc_id in known else "insert"
+        known[doc_id] = stamp
+        if stamp and stamp > self._watermark.get(name, ""):
+            self._watermark[name] = stamp
+        self._emit({"collection": name, "op": op, "id": doc_id, "doc": doc})
+
+    async def _read_updates(self, name: str) -> None:
+        key = KEY_FIELDS[name]
+        since = datetime.fromisoformat(self._watermark[name]) - timedelta(seconds=self.overlap)
+        cursor = self.db[name].find(
+            {"updated_at": {"$gte": since.isoformat()}}, {field: 0 for field in HIDDEN_FIELDS}
+        ).sort("updated_at", 1)
+        async for doc in cursor:
+            if key in doc:
+                self._record(name, doc)
+
+    async def _rescan(self, name: str) -> None:
+        """Compare the full id list with what is known; the first pass only
+        records the baseline."""
+        key = KEY_FIELDS[name]
+        stamps = {
+            doc[key]: doc.get("updated_at")
+            async for doc in self.db[name].find({}, {"_id": 0, key: 1, "updated_at": 1})
+            if key in doc
+        }
+        previous = self._known.get(name)
+        if previous is None:
+            self._known[name] = stamps
+            self._watermark[name] = max(
+                (stamp for stamp in stamps.values() if stamp),
+                default=datetime.now(timezone.utc).isoformat()
+            )
+            return
+        changed: List[Any] = [doc_id for doc_id, stamp in stamps.items() if previous.get(doc_id, 0) != stamp]
+        for start in range(0, len(changed), FETCH_BATCH):
+            batch = changed[start:start + FETCH_BATCH]
+            async for doc in self.db[name].find({key: {"$in": batch}}, {field: 0 for field in HIDDEN_FIELDS}):
+                self._record(name, doc)
+        for doc_id in previous.keys() - stamps.keys():
+            del previous[doc_id]
+            self._emit({"collection": name, "op": "delete", "id": doc_id, "doc": None})
+
+    async def _poll_loop(self) -> None:
+        while self._subscribers:
+            try:
+                await self._poll()
+            except Exception:
+                logger.exception("Admin change feed poll failed")
+            await asyncio.sleep(self.poll_interval)
+        self._poll_task = None
+
+    def _resume_seq(self, last_event_id: Optional[str]) -> Optional[int]:
+        """Sequence to continue after, or None when history is unavailable."""
+        if not last_event_id:
+            return self._seq
+        epoch, _, seq = last_event_id.partition("-")
+        if epoch != self._epoch or not seq.isdigit() or int(seq) > self._seq:
+            return None
+        seq = int(seq)
+        if seq < self._seq and (not self._log or self._log[0][0] > seq + 1):
+            return None
+        return seq
+
+    async def _follow(self, last_event_id: Optional[str]) -> AsyncIterator[Event]:
+        self._subscribers += 1
+        if self._poll_task is None:
+            self._poll_task = asyncio.create_task(self._poll_loop())
+        try:
+            seq = self._resume_seq(last_event_id)
+            if seq is None:
+                seq = self._seq
+                yield self._event_id(seq), {"op": "reset"}
+            last_sent = time.monotonic()
+            while True:
+                changed = self._changed
+                if self._log and self._log[0][0] > seq + 1:
+                    # Fell behind the retained history
+                    seq = self._seq
+                    yield self._event_id(seq), {"op": "reset"}
+                for event_seq, event in list(self._log):
+                    if event_seq > seq:
+                        seq = event_seq
+                        yield self._event_id(seq), event
+                        last_sent = time.monotonic()
+                idle = time.monotonic() - last_sent
+                if idle >= self.heartbeat:
+                    yield self._event_id(seq), None
+                    last_sent = time.monotonic()
+                    continue
+                try:
+                    await asyncio.wait_for(changed.wait(), self.heartbeat - idle)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._subscribers -= 1
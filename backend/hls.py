@@ -0,0 +1,160 @@
+import asyncio
+import json
+import math
+import os
+import shutil
+from dataclasses import dataclass
+from fractions import Fraction
+from pathlib import Path
+from typing import List, Sequence
+
+from workers import JobSkipped
+
+MASTER_PLAYLIST = "master.m3u8"
+SEGMENT_SECONDS = 6
+# Assumed when ffprobe reports no usable frame rate
+DEFAULT_FRAME_RATE = 30
+
+
+@dataclass(frozen=True)
+class Rendition:
+    height: int
+    video_bitrate: str
+    max_bitrate: str
+    audio_bitrate: str
+
+
+HLS_LADDER = (
+    Rendition(360, "800k", "856k", "96k"),
+    Rendition(540, "1400k", "1498k", "128k"),
+    Rendition(720, "2800k", "2996k", "128k"),
+    Rendition(1080, "5000k", "5350k", "192k"),
+)
+
+
+class TranscodeUnavailable(JobSkipped):
+    pass
+
+
+def find_binary(name: str) -> str:
+    binary = shutil.which(os.environ.get(f"{name.upper()}_BINARY", name))
+    if binary is None:
+        raise TranscodeUnavailable(f"{name} is not installed")
+    return binary
+
+
+async def _run(args: Sequence[str], timeout: float) -> bytes:
+    process = await asyncio.create_subprocess_exec(
+        *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+    except BaseException:
+        # Timeouts and shutdown must not leave ffmpeg running
+        process.kill()
+        await process.wait()
+        raise
+    if process.returncode != 0:
+        raise RuntimeError(f"{Path(args[0]).name} exited with {process.returncode}: {stderr.decode(errors='replace')[-500:]}")
+    return stdout
+
+
+def _frame_rate(video: dict) -> float:
+    for field in ("avg_frame_rate", "r_frame_rate"):
+        try:
+            rate = Fraction(video.get(field) or "")
+        except (ValueError, ZeroDivisionError):
+            continue
+        if rate > 0:
+            return float(rate)
+    return DEFAULT_FRAME_RATE
+
+
+async def probe(source: Path) -> dict:
+    """Return the source height, frame rate and whether it has an audio track."""
+    output = await _run([
+        find_binary("ffprobe"), "-v", "error", "-print_format", "json", "-show_streams", str(source)
+    ], timeout=60)
+    streams = json.loads(output).get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    if video is None:
+        raise ValueError("No video stream found")
+    return {
+        "height": int(video.get("height") or 0),
+        "frame_rate": _frame_rate(video),
+        "has_audio": any(s.get("codec_type") == "audio" for s in streams),
+    }
+
+
+def select_ladder(source_height: int, ladder: Sequence[Rendition] = HLS_LADDER) -> List[Rendition]:
+    """Renditions no taller than the source; at least the smallest one."""
+    selected = [r for r in ladder if r.height <= source_height]
+    return selected or [ladder[0]]
+
+
+def ffmpeg_args(ffmpeg: str, source: Path, out_dir: Path, ladder: Sequence[Rendition],
+                has_audio: bool, threads: int = 2, frame_rate: float = DEFAULT_FRAME_RATE) -> List[str]:
+    count = len(ladder)
+    gop = str(math.ceil(frame_rate * SEGMENT_SECONDS))
+    splits = "".join(f"[v{i}]" for i in range(count))
+    scales = ";".join(f"[v{i}]scale=-2:{r.height}[v{i}out]" for i, r in enumerate(ladder))
+    args = [
+        ffmpeg, "-y", "-loglevel", "error", "-threads", str(threads), "-i", str(source),
+        "-filter_complex", f"[0:v]split={count}{splits};{scales}",
+    ]
+    stream_map = []
+    for i, r in enumerate(ladder):
+        args += [
+            "-map", f"[v{i}out]", f"-c:v:{i}", "libx264", "-preset", "veryfast", "-profile:v", "main",
+            f"-b:v:{i}", r.video_bitrate, f"-maxrate:v:{i}", r.max_bitrate,
+            f"-bufsize:v:{i}", r.max_bitrate,
+            # Keyframes on segment boundaries by timestamp, whatever the frame
+            # rate, so every rendition cuts at the same instants; the GOP only
+            # keeps the encoder from adding keyframes in between
+            "-force_key_frames", f"expr:gte(t,n_forced*{SEGMENT_SECONDS})",
+            "-g", gop, "-keyint_min", gop, "-sc_threshold", "0",
+        ]
+        if has_audio:
+            args += ["-map", "0:a:0", f"-c:a:{i}", "aac", f"-b:a:{i}", r.audio_bitrate, "-ac", "2"]
+            stream_map.append(f"v:{i},a:{i},name:{r.height}p")
+        else:
+            stream_map.append(f"v:{i},name:{r.height}p")
+    args += [
+        "-f", "hls", "-hls_time", str(SEGMENT_SECONDS), "-hls_playlist_type", "vod",
+        "-hls_flags", "independent_segments",
+        "-hls_segment_filename", str(out_dir / "%v" / "seg_%04d.ts"),
+        "-master_pl_name", MASTER_PLAYLIST,
+        "-var_stream_map", " ".join(stream_map),
+        str(out_dir / "%v" / "index.m3u8"),
+    ]
+    return args
+
+
+async def package_hls(source: Path, out_dir: Path, timeout: float = 3600, threads: int = 2,
+                      ladder: Sequence[Rendition] = HLS_LADDER) -> Path:
+    """Transcode ``source`` into an HLS ladder under ``out_dir``.
+
+    Output is built in a sibling temp directory and renamed into place, so a
+    half-written ladder is never served. Returns the master playlist path.
+    Reuses an existing ladder, since sources are content addressed.
+    """
+    master = out_dir / MASTER_PLAYLIST
+    if master.exists():
+        return master
+    ffmpeg = find_binary("ffmpeg")
+    info = await probe(source)
+
+    work_dir = out_dir.with_name(f".{out_dir.name}.tmp")
+    await asyncio.to_thread(shutil.rmtree, work_dir, True)
+    await asyncio.to_thread(work_dir.mkdir, parents=True)
+    try:
+        ladder = select_ladder(info["height"], ladder)
+        await _run(ffmpeg_args(
+            ffmpeg, source, work_dir, ladder, info["has_audio"], threads, info["frame_rate"]
+        ), timeout)
+        await asyncio.to_thread(shutil.rmtree, out_dir, True)
+        await asyncio.to_thread(os.replace, work_dir, out_dir)
+    except BaseException:
+        await asyncio.to_thread(shutil.rmtree, work_dir, True)
+        raise
+    return master
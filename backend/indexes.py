@@ -0,0 +1,159 @@
+"""Index provisioning and query-plan checks for every collection the API uses.
+
+``ensure_indexes`` runs at startup and is idempotent. ``check_query_plans``
+runs ``explain()`` on the query behind each route and flags collection
+scans; it backs ``python manage.py check-indexes``.
+"""
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "media": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        # Keyset pagination and the max-order probe walk (order, id)
+        IndexModel([("order", ASCENDING), ("id", ASCENDING)], name="order_id"),
+        IndexModel([("category", ASCENDING), ("order", ASCENDING), ("id", ASCENDING)], name="category_order_id"),
+        IndexModel([("featured", ASCENDING), ("order", ASCENDING), ("id", ASCENDING)], name="featured_order_id"),
+        IndexModel([("variants_status", ASCENDING)], name="variants_status"),
+        IndexModel([("media_type", ASCENDING), ("stream_status", ASCENDING)], name="media_type_stream_status"),
+        # Search ranking; no stemming or stop words since titles mix languages
+        IndexModel([("title", TEXT), ("description", TEXT)], weights={"title": 10, "description": 2},
+                   default_language="none", name="title_description_text"),
+        # Autocomplete prefix scans
+        IndexModel([("title_terms", ASCENDING)], name="title_terms"),
+        # Admin change feed polling on standalone deployments
+        IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+    ],
+    "admins": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("email", ASCENDING)], unique=True, name="email_unique"),
+    ],
+    "contact_messages": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        # Inbox keyset pagination, optionally filtered by read state
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id_desc"),
+        IndexModel([("read", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="read_created_at_id"),
+        # Duplicate submissions within one dedup time bucket, which is part of
+        # the hash; messages from before hashing have none
+        IndexModel([("content_hash", ASCENDING)], unique=True, name="content_hash_unique",
+                   partialFilterExpression={"content_hash": {"$exists": True}}),
+        IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+    ],
+    "categories": [
+        IndexModel([("name", ASCENDING)], unique=True, name="name_unique"),
+    ],
+    "settings": [
+        IndexModel([("type", ASCENDING)], unique=True, name="type_unique"),
+    ],
+    "upload_sessions": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("expires_at", ASCENDING)], name="expires_at"),
+    ],
+    "blobs": [
+        IndexModel([("sha256", ASCENDING)], unique=True, name="sha256_unique"),
+    ],
+    "revoked_tokens": [
+        IndexModel([("jti", ASCENDING)], unique=True, name="jti_unique"),
+        # Mongo drops revocations once the token itself has expired
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl"),
+    ],
+}
+
+
+async def ensure_indexes(db) -> Dict[str, List[str]]:
+    """Create any missing indexes. Returns the index names per collection.
+
+    A failure on one collection (e.g. duplicates blocking a unique index) is
+    logged and does not stop the others.
+    """
+    created = {}
+    for collection, models in INDEXES.items():
+        try:
+            created[collection] = await db[collection].create_indexes(models)
+        except OperationFailure as e:
+            logger.error("Could not create indexes on %s: %s", collection, e)
+    return created
+
+
+@dataclass
+class QueryPlan:
+    route: str
+    collection: str
+    filter: dict
+    sort: Optional[list] = None
+    stages: List[str] = field(default_factory=list)
+    index: Optional[str] = None
+
+    @property
+    def collscan(self) -> bool:
+        return "COLLSCAN" in self.stages
+
+
+# Representative query for each route; the values only need the right shape
+ROUTE_QUERIES = [
+    QueryPlan("GET /api/media", "media", {}, [("order", 1), ("id", 1)]),
+    QueryPlan("GET /api/media?category=", "media", {"category": "Portrait"}, [("order", 1), ("id", 1)]),
+    QueryPlan("GET /api/media?featured=", "media", {"featured": True}, [("order", 1), ("id", 1)]),
+    QueryPlan("GET /api/media?after=", "media",
+              {"$or": [{"order": {"$gt": 1}}, {"order": 1, "id": {"$gt": ""}}]}, [("order", 1), ("id", 1)]),
+    QueryPlan("GET /api/media/{id}", "media", {"id": ""}),
+    QueryPlan("GET /api/media/search", "media", {"$text": {"$search": "portrait"}}),
+    QueryPlan("GET /api/media/search/suggest", "media", {"title_terms": {"$regex": "^po"}}),
+    QueryPlan("backfill-search-terms", "media", {"title_terms": {"$exists": False}}),
+    QueryPlan("POST /api/media/upload (max order)", "media", {}, [("order", -1)]),
+    QueryPlan("backfill-variants", "media", {"variants_status": {"$in": [None, "queued", "pending"]}}),
+    QueryPlan("backfill-streams", "media", {"media_type": "video", "stream_status": {"$in": [None, "queued"]}}),
+    QueryPlan("POST /api/auth/login", "admins", {"email": ""}),
+    QueryPlan("get_current_admin", "admins", {"id": ""}),
+    QueryPlan("GET /api/categories", "categories", {"count": {"$gt": 0}}, [("name", 1)]),
+    QueryPlan("GET /api/settings", "settings", {"type": "site"}),
+    QueryPlan("GET /api/contact/messages", "contact_messages", {}, [("created_at", -1), ("id", -1)]),
+    QueryPlan("GET /api/contact/messages?read=", "contact_messages", {"read": False},
+              [("created_at", -1), ("id", -1)]),
+    QueryPlan("GET /api/contact/messages?after=", "contact_messages",
+              {"$or": [{"created_at": {"$lt": ""}}, {"created_at": "", "id": {"$lt": ""}}]},
+              [("created_at", -1), ("id", -1)]),
+    QueryPlan("POST /api/contact/messages/read", "contact_messages", {"id": {"$in": [""]}}),
+    QueryPlan("admin events poll", "media", {"updated_at": {"$gte": ""}}, [("updated_at", 1)]),
+    QueryPlan("admin events poll (messages)", "contact_messages", {"updated_at": {"$gte": ""}}, [("updated_at", 1)]),
+    QueryPlan("PATCH /api/media/uploads/{id}", "upload_sessions", {"id": ""}),
+    QueryPlan("upload session sweep", "upload_sessions", {"expires_at": {"$lt": ""}}),
+    QueryPlan("blob refcount", "blobs", {"sha256": ""}),
+    QueryPlan("revocation refresh", "revoked_tokens", {"expires_at": {"$gt": 0}}),
+]
+
+
+def _walk_plan(plan: dict, stages: List[str]) -> Optional[str]:
+    index = None
+    if "stage" in plan:
+        stages.append(plan["stage"])
+        index = plan.get("indexName")
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            index = _walk_plan(plan[key], stages) or index
+    for child in plan.get("inputStages", []):
+        index = _walk_plan(child, stages) or index
+    return index
+
+
+async def check_query_plans(db, queries: List[QueryPlan] = ROUTE_QUERIES) -> List[QueryPlan]:
+    """Explain each route query and record its winning plan stages."""
+    results = []
+    for query in queries:
+        cursor = db[query.collection].find(query.filter)
+        if query.sort:
+            cursor = cursor.sort(query.sort)
+        explained = await cursor.explain()
+        winning = explained.get("queryPlanner", {}).get("winningPlan", {})
+        plan = QueryPlan(query.route, query.collection, query.filter, query.sort)
+        plan.index = _walk_plan(winning, plan.stages)
+        if plan.collscan:
+            logger.warning("COLLSCAN for %s on %s", query.route, query.collection)
+        results.append(plan)
+    return results
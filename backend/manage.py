@@ -0,0 +1,81 @@
+"""Maintenance commands for the FINDELMUNNDO backend.
+
+Run from the backend directory, with the same environment as the API:
+
+    python manage.py backfill-variants [--include-failed]
+    python manage.py backfill-streams [--include-failed]
+    python manage.py check-indexes
+    python manage.py reconcile-categories
+    python manage.py backfill-search-terms
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+import server
+from indexes import check_query_plans, ensure_indexes
+
+
+async def backfill_variants(args):
+    return await server.backfill_variants(include_failed=args.include_failed)
+
+
+async def backfill_streams(args):
+    return await server.backfill_streams(include_failed=args.include_failed)
+
+
+async def check_indexes(args):
+    await ensure_indexes(server.db)
+    plans = await check_query_plans(server.db)
+    return {
+        "plans": [
+            {"route": p.route, "collection": p.collection, "index": p.index, "stages": p.stages}
+            for p in plans
+        ],
+        "collscans": [p.route for p in plans if p.collscan],
+    }
+
+
+async def reconcile_categories(args):
+    counts = await server.category_counts.reconcile(server.db.media)
+    return {"categories": counts}
+
+
+async def backfill_search_terms(args):
+    return {"updated": await server.backfill_title_terms()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill = commands.add_parser("backfill-variants", help="Generate thumbnails and variants for existing media")
+    backfill.add_argument("--include-failed", action="store_true", help="Retry media whose last attempt failed")
+    backfill.set_defaults(handler=backfill_variants)
+
+    streams = commands.add_parser("backfill-streams", help="Package existing videos as HLS")
+    streams.add_argument("--include-failed", action="store_true", help="Retry videos whose last attempt failed")
+    streams.set_defaults(handler=backfill_streams)
+
+    indexes = commands.add_parser("check-indexes", help="Create missing indexes and flag route queries that scan a whole collection")
+    indexes.set_defaults(handler=check_indexes)
+
+    reconcile = commands.add_parser("reconcile-categories", help="Recompute category counts from the media collection")
+    reconcile.set_defaults(handler=reconcile_categories)
+
+    search_terms = commands.add_parser("backfill-search-terms", help="Add autocomplete terms to media that lack them")
+    search_terms.set_defaults(handler=backfill_search_terms)
+
+    args = parser.parse_args()
+    try:
+        result = asyncio.run(args.handler(args))
+    finally:
+        server.client.close()
+    print(json.dumps(result, indent=2))
+    if isinstance(result, dict) and result.get("collscans"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
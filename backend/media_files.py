@@ -0,0 +1,255 @@
+import mimetypes
+import os
+import secrets
+import stat
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+from starlette.types import Receive, Scope, Send
+
+from cache import etag_matches
+
+SEND_CHUNK_SIZE = 256 * 1024
+MAX_RANGES = 16
+# Sidecar suffix per content-coding, in order of preference
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+# HLS output; the platform tables often lack or mislabel these
+mimetypes.add_type("application/vnd.apple.mpegurl", ".m3u8")
+mimetypes.add_type("video/mp2t", ".ts")
+
+
+def parse_range(header: str, size: int) -> Optional[List[Tuple[int, int]]]:
+    """Parse a ``Range`` header into inclusive ``(start, end)`` pairs.
+
+    Returns None when the header should be ignored (malformed, or too many
+    ranges) and an empty list when no range is satisfiable.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec:
+        return None
+    ranges = []
+    for part in spec.split(","):
+        start_s, sep, end_s = part.strip().partition("-")
+        if not sep:
+            return None
+        try:
+            if start_s == "":
+                # Suffix range: the last N bytes
+                length = int(end_s)
+                if length <= 0:
+                    continue
+                ranges.append((max(size - length, 0), size - 1))
+                continue
+            start = int(start_s)
+            end = int(end_s) if end_s else size - 1
+        except ValueError:
+            return None
+        if start >= size:
+            continue
+        if start > end:
+            return None
+        ranges.append((start, min(end, size - 1)))
+    if len(ranges) > MAX_RANGES:
+        return None
+    return ranges
+
+
+def file_etag(path: Path, stat_result: os.stat_result) -> str:
+    # Content-addressed uploads carry their SHA-256 in the name
+    stem = path.stem
+    if len(stem) == 64 and all(c in "0123456789abcdef" for c in stem):
+        return f'"{stem[:32]}"'
+    return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+class RangeFileResponse(Response):
+    """Serve a whole file or a set of byte ranges of it.
+
+    Uses the ASGI ``zerocopysend`` extension (sendfile) or ``pathsend`` when
+    the server advertises them, otherwise streams chunks read in a worker
+    thread.
+    """
+
+    def __init__(self, path: Path, size: int, status_code: int, headers: dict, media_type: str,
+                 ranges: Optional[List[Tuple[int, int]]] = None):
+        super().__init__(status_code=status_code, headers=headers)
+        self.path = path
+        self.size = size
+        self.media_type = media_type
+        self.ranges = ranges
+        self.parts: List[Tuple[bytes, int, int]] = []
+
+        if ranges and len(ranges) > 1:
+            boundary = secrets.token_hex(16)
+            self.headers["content-type"] = f"multipart/byteranges; boundary={boundary}"
+            length = 0
+            for start, end in ranges:
+                preamble = (
+                    f"--{boundary}\r\nContent-Type: {media_type}\r\n"
+                    f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+                ).encode("latin-1")
+                self.parts.append((preamble, start, end))
+                length += len(preamble) + end - start + 1 + 2
+            self.epilogue = f"--{boundary}--\r\n".encode("latin-1")
+            self.headers["content-length"] = str(length + len(self.epilogue))
+        else:
+            start, end = ranges[0] if ranges else (0, size - 1)
+            if ranges:
+                self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+            self.headers["content-type"] = media_type
+            self.headers["content-length"] = str(end - start + 1)
+            self.parts.append((b"", start, end))
+            self.epilogue = b""
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD" or self.size == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        extensions = scope.get("extensions") or {}
+        if not self.ranges and "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+            return
+
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            multipart = len(self.parts) > 1
+            for preamble, start, end in self.parts:
+                if preamble:
+                    await send({"type": "http.response.body", "body": preamble, "more_body": True})
+                if "http.response.zerocopysend" in extensions:
+                    await send({
+                        "type": "http.response.zerocopysend",
+                        "file": file.wrapped.fileno(),
+                        "offset": start,
+                        "count": end - start + 1,
+                        "more_body": True
+                    })
+                else:
+                    await file.seek(start)
+                    remaining = end - start + 1
+                    while remaining:
+                        chunk = await file.read(min(SEND_CHUNK_SIZE, remaining))
+                        if not chunk:
+                            break
+                        remaining -= len(chunk)
+                        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                if multipart:
+                    await send({"type": "http.response.body", "body": b"\r\n", "more_body": True})
+        await send({"type": "http.response.body", "body": self.epilogue, "more_body": False})
+
+
+def _stat_file(path: Path) -> Optional[os.stat_result]:
+    try:
+        result = path.stat()
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return result if stat.S_ISREG(result.st_mode) else None
+
+
+def _find_sidecar(path: Path, accept_encoding: str):
+    accepted = {token.split(";")[0].strip().lower() for token in accept_encoding.split(",")}
+    for coding, suffix in PRECOMPRESSED:
+        if coding in accepted:
+            sidecar = path.with_name(path.name + suffix)
+            result = _stat_file(sidecar)
+            if result is not None:
+                return coding, sidecar, result
+    return None
+
+
+def _not_modified_since(request_headers: Headers, stat_result: os.stat_result) -> bool:
+    since = request_headers.get("if-modified-since")
+    if not since:
+        return False
+    try:
+        return int(stat_result.st_mtime) <= parsedate_to_datetime(since).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+async def file_response(request: Request, path: Path, cache_control: str,
+                        media_type: Optional[str] = None, precompressed: bool = True,
+                        etag: Optional[str] = None) -> Response:
+    """Build a conditional, range-aware response for ``path``.
+
+    ``etag`` overrides the validator derived from the name or stat data."""
+    stat_result = await anyio.to_thread.run_sync(_stat_file, path)
+    if stat_result is None:
+        return PlainTextResponse("Not Found", status_code=404)
+
+    media_type = media_type or mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    etag = etag or file_etag(path, stat_result)
+    headers = {
+        "accept-ranges": "bytes",
+        "cache-control": cache_control,
+        "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+    }
+
+    range_header = request.headers.get("range")
+    body_path, size = path, stat_result.st_size
+    if precompressed and not range_header:
+        sidecar = await anyio.to_thread.run_sync(_find_sidecar, path, request.headers.get("accept-encoding", ""))
+        headers["vary"] = "Accept-Encoding"
+        if sidecar is not None:
+            coding, body_path, sidecar_stat = sidecar
+            size = sidecar_stat.st_size
+            headers["content-encoding"] = coding
+            etag = f'{etag[:-1]}-{coding}"'
+    headers["etag"] = etag
+
+    if etag_matches(request.headers.get("if-none-match"), etag) or (
+        "if-none-match" not in request.headers and _not_modified_since(request.headers, stat_result)
+    ):
+        return Response(status_code=304, headers=headers)
+
+    if range_header:
+        # A stale If-Range means the client's partial copy is outdated: send everything
+        if_range = request.headers.get("if-range")
+        if if_range is None or if_range == etag:
+            ranges = parse_range(range_header, size)
+            if ranges == []:
+                headers["content-range"] = f"bytes */{size}"
+                return Response(status_code=416, headers=headers)
+            if ranges:
+                return RangeFileResponse(body_path, size, 206, headers, media_type, ranges)
+
+    return RangeFileResponse(body_path, size, 200, headers, media_type)
+
+
+class MediaFiles:
+    """``StaticFiles`` replacement with ranges, strong ETags, long-lived
+    caching and precompressed sidecar lookup."""
+
+    def __init__(self, directory: Path, cache_control: str, precompressed: bool = True):
+        self.directory = Path(directory).resolve()
+        self.cache_control = cache_control
+        self.precompressed = precompressed
+
+    def resolve(self, relative: str) -> Optional[Path]:
+        parts = [p for p in relative.split("/") if p]
+        # Hidden entries hold temp and partial uploads
+        if not parts or any(p.startswith(".") for p in parts):
+            return None
+        path = (self.directory / Path(*parts)).resolve()
+        if self.directory not in path.parents:
+            return None
+        return path
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request = Request(scope, receive)
+        if request.method not in ("GET", "HEAD"):
+            response = PlainTextResponse("Method Not Allowed", status_code=405)
+        else:
+            path = self.resolve(scope["path"][len(scope.get("root_path", "")):])
+            if path is None:
+                response = PlainTextResponse("Not Found", status_code=404)
+            else:
+                response = await file_response(request, path, self.cache_control, precompressed=self.precompressed)
+        await response(scope, receive, send)
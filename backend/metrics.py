@@ -0,0 +1,221 @@
+"""Prometheus text-format metrics without a client library.
+
+Metrics are process-local: when the API runs with several workers, each one
+reports its own series and the scraper aggregates them.
+"""
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_sample(name: str, labels: Dict[str, str], value: float) -> str:
+    if labels:
+        pairs = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+        return f"{name}{{{pairs}}} {_format_value(value)}"
+    return f"{name} {_format_value(value)}"
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterable[Sample]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            # Per-bucket counts (last is +Inf), then the sum
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 2)
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            values = [(key, list(series)) for key, series in self._values.items()]
+        for key, series in values:
+            labels = dict(zip(self.labelnames, key))
+            running = 0
+            for bound, count in zip((*self.buckets, math.inf), series):
+                running += count
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, running
+            yield f"{self.name}_count", labels, running
+            yield f"{self.name}_sum", labels, series[-1]
+
+
+class Registry:
+    """Metrics plus collectors that produce samples at scrape time."""
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Iterable[Sample]]]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, func: Callable[[], Iterable[Tuple[str, str, str, Iterable[Sample]]]]):
+        """Register ``func`` returning ``(name, kind, help, samples)`` families."""
+        self._collectors.append(func)
+        return func
+
+    def render(self) -> str:
+        families = [(m.name, m.kind, m.documentation, m.samples()) for m in self._metrics]
+        for collect in self._collectors:
+            families.extend(collect())
+        lines = []
+        for name, kind, documentation, samples in families:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(_format_sample(*sample) for sample in samples)
+        return "\n".join(lines) + "\n"
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Times every Mongo command by command name and collection."""
+
+    def __init__(self, duration: Histogram, failures: Counter):
+        self.duration = duration
+        self.failures = failures
+        self._collections: Dict[Tuple[int, object], str] = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        self._collections[(event.request_id, event.connection_id)] = (
+            collection if isinstance(collection, str) else ""
+        )
+
+    def _finish(self, event) -> Tuple[str, str]:
+        collection = self._collections.pop((event.request_id, event.connection_id), "")
+        self.duration.observe(event.duration_micros / 1e6, command=event.command_name, collection=collection)
+        return event.command_name, collection
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        command, collection = self._finish(event)
+        self.failures.inc(command=command, collection=collection)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request counts, latency and response bytes.
+
+    Requests are labelled with the route template (``/api/media/{media_id}``)
+    or the mount path, never the raw URL, to keep series cardinality bounded.
+    Response size comes from ``Content-Length``, so file responses sent with
+    ``pathsend`` are counted too.
+    """
+
+    def __init__(self, app, requests: Counter, latency: Histogram, response_bytes: Counter):
+        self.app = app
+        self.requests = requests
+        self.latency = latency
+        self.response_bytes = response_bytes
+
+    @staticmethod
+    def route_label(scope) -> str:
+        route = scope.get("route")
+        if route is not None and getattr(route, "path", None):
+            return route.path
+        if "app_root_path" in scope and scope.get("root_path") != scope["app_root_path"]:
+            # Matched a Mount, which records its prefix in root_path
+            return scope["root_path"] + "/{path}"
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        length: Optional[int] = None
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status, length
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for name, value in message.get("headers", []):
+                    if name == b"content-length":
+                        length = int(value)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = self.route_label(scope)
+            method = scope["method"]
+            self.requests.inc(method=method, route=route, status=str(status))
+            self.latency.observe(time.perf_counter() - started, method=method, route=route)
+            if length:
+                self.response_bytes.inc(length, route=route)
@@ -0,0 +1,55 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+
+class HasherBusy(Exception):
+    """Too many password operations are queued; the caller should back off."""
+
+
+class PasswordHasher:
+    """bcrypt on a dedicated, size-limited thread pool.
+
+    bcrypt releases the GIL, so a few threads keep hashing off the event loop.
+    At most ``max_pending`` operations may be running or waiting; beyond that
+    ``HasherBusy`` is raised immediately instead of queueing more CPU work.
+    """
+
+    def __init__(self, rounds: int = 12, workers: int = 2, max_pending: int = 8):
+        self.rounds = rounds
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._pending = 0
+
+    async def _submit(self, func, *args):
+        if self._pending >= self.max_pending:
+            raise HasherBusy()
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(self._hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._submit(self._verify, password, hashed)
+
+    def needs_rehash(self, hashed: str) -> bool:
+        # Modular crypt format: $2b$<cost>$<salt+hash>
+        try:
+            return int(hashed.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def _hash(self, password: str) -> str:
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=self.rounds)).decode('utf-8')
+
+    @staticmethod
+    def _verify(password: str, hashed: str) -> bool:
+        return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,120 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict
+
+from pymongo import monitoring
+
+# Upper bounds, in seconds, of the checkout wait histogram buckets
+CHECKOUT_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class _ServerPool:
+    def __init__(self):
+        self.open = 0
+        self.in_use = 0
+        self.checkouts = 0
+        self.checkout_failures: Dict[str, int] = defaultdict(int)
+        self.wait_sum = 0.0
+        self.wait_max = 0.0
+        # Last slot counts waits above the largest bound
+        self.wait_buckets = [0] * (len(CHECKOUT_WAIT_BUCKETS) + 1)
+        self.cleared = 0
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection pool gauges and checkout wait times, per server.
+
+    Registered as a pymongo event listener. Events arrive on Motor's worker
+    threads, so state is guarded by a lock; a checkout's start and finish are
+    always reported on the same thread, which is how waits are timed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._servers: Dict[str, _ServerPool] = defaultdict(_ServerPool)
+
+    @staticmethod
+    def _address(event) -> str:
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def _finish_wait(self, pool: _ServerPool) -> None:
+        started = getattr(self._local, "started", None)
+        self._local.started = None
+        if started is None:
+            return
+        wait = time.perf_counter() - started
+        pool.wait_sum += wait
+        pool.wait_max = max(pool.wait_max, wait)
+        pool.wait_buckets[bisect_left(CHECKOUT_WAIT_BUCKETS, wait)] += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self._servers[self._address(event)].cleared += 1
+
+    def pool_closed(self, event):
+        with self._lock:
+            self._servers.pop(self._address(event), None)
+
+    def connection_created(self, event):
+        with self._lock:
+            self._servers[self._address(event)].open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            pool = self._servers[self._address(event)]
+            pool.open = max(pool.open - 1, 0)
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            pool = self._servers[self._address(event)]
+            pool.checkout_failures[str(event.reason)] += 1
+            self._finish_wait(pool)
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            pool = self._servers[self._address(event)]
+            pool.in_use += 1
+            pool.checkouts += 1
+            self._finish_wait(pool)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            pool = self._servers[self._address(event)]
+            pool.in_use = max(pool.in_use - 1, 0)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Current values per server address; histogram buckets are cumulative."""
+        with self._lock:
+            result = {}
+            for address, pool in self._servers.items():
+                cumulative, running = [], 0
+                for count in pool.wait_buckets:
+                    running += count
+                    cumulative.append(running)
+                result[address] = {
+                    "open": pool.open,
+                    "in_use": pool.in_use,
+                    "checkouts": pool.checkouts,
+                    "checkout_failures": dict(pool.checkout_failures),
+                    "cleared": pool.cleared,
+                    "wait_seconds_sum": pool.wait_sum,
+                    "wait_seconds_max": pool.wait_max,
+                    "wait_seconds_buckets": dict(zip([*map(str, CHECKOUT_WAIT_BUCKETS), "+Inf"], cumulative)),
+                }
+            return result
@@ -0,0 +1,192 @@
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+try:
+    from PIL import Image, ImageOps, UnidentifiedImageError, features
+except ImportError:  # pragma: no cover - Pillow is listed in requirements.txt
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Output formats and their file extensions; AVIF needs a Pillow built with it
+RESIZE_FORMATS = {
+    fmt: ext for fmt, ext in (("jpeg", "jpg"), ("webp", "webp"), ("avif", "avif"), ("png", "png"))
+    if fmt != "avif" or (Image is not None and features.check("avif"))
+}
+SOURCE_FORMATS = {".jpg": "jpeg", ".jpeg": "jpeg", ".png": "png", ".webp": "webp", ".avif": "avif"}
+# Requested sizes and qualities are rounded up to these, so the number of
+# distinct renders per source stays small whatever clients ask for
+RESIZE_BREAKPOINTS = (160, 320, 480, 640, 960, 1280, 1600, 1920, 2560, 3840)
+RESIZE_QUALITIES = (50, 65, 80, 90)
+
+
+class ResizeUnavailable(Exception):
+    pass
+
+
+class ResizeBusy(Exception):
+    """Too many distinct renders are already in flight."""
+
+
+class UndecodableImage(Exception):
+    """The source is not an image Pillow can open, or is implausibly large."""
+
+
+def snap_up(value: Optional[int], steps: Sequence[int]) -> Optional[int]:
+    """Smallest step at or above ``value``, or the largest step."""
+    if value is None:
+        return None
+    return next((step for step in steps if step >= value), steps[-1])
+
+
+@dataclass(frozen=True)
+class ResizeSpec:
+    width: Optional[int]
+    height: Optional[int]
+    fmt: str
+    quality: int
+
+    def cache_key(self, source: Path) -> str:
+        raw = f"{source.name}|{self.width}|{self.height}|{self.fmt}|{self.quality}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def render_resized(source: Path, dest: Path, spec: ResizeSpec) -> None:
+    """Resize ``source`` to fit inside ``spec`` (never upscaling) and encode it."""
+    if Image is None:
+        raise ResizeUnavailable("Pillow is not installed")
+    try:
+        original = Image.open(source)
+        try:
+            # Decode now, so truncated or corrupt data fails here rather
+            # than somewhere in the resize or the encode
+            original.load()
+            image = ImageOps.exif_transpose(original)
+        except BaseException:
+            original.close()
+            raise
+    except FileNotFoundError:
+        raise
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise UndecodableImage(str(e)) from e
+    with original:
+        box = (spec.width or image.width, spec.height or image.height)
+        if box[0] < image.width or box[1] < image.height:
+            image = image.copy()
+            image.thumbnail(box, Image.LANCZOS)
+        options = {"quality": spec.quality}
+        if spec.fmt == "jpeg":
+            image = image.convert("RGB")
+            options.update(optimize=True, progressive=True)
+        elif spec.fmt == "png":
+            options = {"optimize": True}
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = dest.with_name(f".{dest.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+        image.save(tmp_path, format=spec.fmt.upper(), **options)
+        os.replace(tmp_path, dest)
+
+
+class DerivedImageCache:
+    """On-disk cache of resized images with a byte budget and LRU eviction.
+
+    Recency is tracked through file mtimes, which are bumped on every hit, so
+    the cache survives restarts. Concurrent requests for the same variant are
+    coalesced onto a single render, and at most ``max_pending`` distinct
+    renders are queued at once; beyond that ``get`` raises ``ResizeBusy``.
+    """
+
+    def __init__(self, root: Path, max_bytes: int, workers: int = 2, max_pending: int = 16):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="resize")
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._size: Optional[int] = None
+        self._evicting = False
+        self.hits = 0
+        self.misses = 0
+
+    def path_for(self, source: Path, spec: ResizeSpec) -> Path:
+        key = spec.cache_key(source)
+        return self.root / key[:2] / f"{key}.{RESIZE_FORMATS[spec.fmt]}"
+
+    async def get(self, source: Path, spec: ResizeSpec) -> Path:
+        dest = self.path_for(source, spec)
+        loop = asyncio.get_running_loop()
+        if await loop.run_in_executor(self.executor, _touch, dest):
+            self.hits += 1
+            return dest
+
+        key = dest.name
+        pending = self._inflight.get(key)
+        if pending is None:
+            if len(self._inflight) >= self.max_pending:
+                raise ResizeBusy()
+            self.misses += 1
+            pending = loop.create_future()
+            self._inflight[key] = pending
+            try:
+                await loop.run_in_executor(self.executor, render_resized, source, dest, spec)
+                pending.set_result(dest)
+            except BaseException as e:
+                pending.set_exception(e)
+                # Mark retrieved so a render nobody else awaited doesn't warn
+                pending.exception()
+                raise
+            finally:
+                del self._inflight[key]
+            await self._account(dest)
+            return dest
+        self.hits += 1
+        return await asyncio.shield(pending)
+
+    async def _account(self, dest: Path) -> None:
+        loop = asyncio.get_running_loop()
+        if self._size is None:
+            self._size = await loop.run_in_executor(self.executor, _tree_size, self.root)
+        else:
+            self._size += dest.stat().st_size
+        if self._size > self.max_bytes and not self._evicting:
+            self._evicting = True
+            try:
+                self._size = await loop.run_in_executor(self.executor, _evict, self.root, self.max_bytes)
+            finally:
+                self._evicting = False
+
+
+def _touch(path: Path) -> bool:
+    try:
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def _tree_size(root: Path) -> int:
+    return sum(p.stat().st_size for p in root.rglob("*") if p.is_file())
+
+
+def _evict(root: Path, max_bytes: int) -> int:
+    """Delete least recently used files until the cache is 90% of budget."""
+    files = []
+    for path in root.rglob("*"):
+        if path.is_file() and not path.name.startswith("."):
+            stat = path.stat()
+            files.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in files)
+    target = int(max_bytes * 0.9)
+    files.sort()
+    for _, size, path in files:
+        if total <= target:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+    logger.info("Derived image cache evicted down to %d bytes", total)
+    return total
@@ -0,0 +1,83 @@
+"""Catalog search: aggregation pipelines over the media text index.
+
+Ranking comes from the ``title_description_text`` index, where title matches
+weigh more than description matches. Autocomplete reads ``title_terms``, a
+normalized word list kept on each media document, through an anchored
+regex so it stays an index range scan.
+"""
+import re
+import unicodedata
+from typing import List
+
+# Indexed words per title; more than this only hurts autocomplete
+MAX_TITLE_TERMS = 32
+# Documents considered per autocomplete request, whatever the prefix
+SUGGEST_SCAN_LIMIT = 2000
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase and strip accents, so "Été" and "ete" meet."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def title_terms(title: str) -> List[str]:
+    """Distinct words of ``title`` for autocomplete, in order of appearance."""
+    terms = dict.fromkeys(w for w in _WORD.findall(normalize(title or "")) if len(w) > 1)
+    return list(terms)[:MAX_TITLE_TERMS]
+
+
+def _facet(field: str, match: dict) -> List[dict]:
+    return [
+        {"$match": match},
+        {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1, "_id": 1}},
+    ]
+
+
+def search_pipeline(query: str, category: str = None, media_type: str = None, offset: int = 0,
+                    limit: int = 24, projection: dict = None) -> List[dict]:
+    """One round trip for a page of ranked results, the total and facets.
+
+    Each facet is counted without its own filter, so the client can still
+    show the other values to switch to.
+    """
+    filters = {}
+    if category:
+        filters["category"] = category
+    if media_type:
+        filters["media_type"] = media_type
+    results = [
+        {"$match": filters},
+        {"$sort": {"score": -1, "order": 1, "id": 1}},
+        {"$skip": offset},
+        {"$limit": limit},
+    ]
+    if projection:
+        results.append({"$project": projection})
+    return [
+        {"$match": {"$text": {"$search": query}}},
+        {"$addFields": {"score": {"$meta": "textScore"}}},
+        {"$facet": {
+            "results": results,
+            "total": [{"$match": filters}, {"$count": "count"}],
+            "category": _facet("category", {"media_type": media_type} if media_type else {}),
+            "media_type": _facet("media_type", {"category": category} if category else {}),
+        }},
+    ]
+
+
+def suggest_pipeline(prefix: str, limit: int = 8) -> List[dict]:
+    """Most common title words starting with ``prefix``."""
+    anchored = {"$regex": f"^{re.escape(normalize(prefix))}"}
+    return [
+        {"$match": {"title_terms": anchored}},
+        {"$limit": SUGGEST_SCAN_LIMIT},
+        {"$unwind": "$title_terms"},
+        {"$match": {"title_terms": anchored}},
+        {"$group": {"_id": "$title_terms", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1, "_id": 1}},
+        {"$limit": limit},
+    ]
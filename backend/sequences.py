@@ -0,0 +1,30 @@
+from pymongo import ReturnDocument
+
+
+class SequenceAllocator:
+    """Monotonic sequence backed by a single counter document.
+
+    Each ``reserve`` is one atomic ``$inc``, so concurrent callers (in this
+    process or another) never receive the same number, and a batch can take
+    a contiguous block in a single round-trip.
+    """
+
+    def __init__(self, collection, name: str):
+        self.collection = collection
+        self.name = name
+
+    async def reserve(self, count: int = 1) -> int:
+        """Reserve ``count`` consecutive numbers and return the first."""
+        if count < 1:
+            raise ValueError("count must be positive")
+        counter = await self.collection.find_one_and_update(
+            {"_id": self.name},
+            {"$inc": {"value": count}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return counter["value"] - count + 1
+
+    async def ensure_at_least(self, value: int) -> None:
+        """Move the counter up to ``value`` if it is behind; never moves it down."""
+        await self.collection.update_one({"_id": self.name}, {"$max": {"value": value}}, upsert=True)
@@ -1,36 +1,239 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form, Header
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form, Header, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from pymongo.read_preferences import SecondaryPreferred
 import os
+import asyncio
 import logging
+import time
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from pydantic import BaseModel, Field, ConfigDict, TypeAdapter, ValidationError
+from typing import Dict, List, Optional
+import math
 import uuid
 from datetime import datetime, timezone, timedelta
 import jwt
-import bcrypt
 import shutil
+import base64
+import json
+from collections import Counter
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is listed in requirements.txt
+    orjson = None
+
+from cache import CatalogCache, etag_matches
+from passwords import PasswordHasher, HasherBusy
+from auth_cache import PrincipalCache, RevocationList
+from workers import JobWorker
+from indexes import ensure_indexes
+from sequences import SequenceAllocator
+from categories import CategoryCounts
+from search import search_pipeline, suggest_pipeline, title_terms
+from contact import BufferFull, MessageBuffer, RateLimiter, client_address, message_hash
+from events import ChangeFeed, sse_message
+from pool_metrics import PoolMetrics
+from tracing import TracingMiddleware, SamplingProfiler, span
+from compression import CompressionMiddleware, compress, encoded_etag, negotiate
+from metrics import Registry, MongoCommandMetrics, MetricsMiddleware, MONGO_BUCKETS, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from variants import build_variants
+from hls import package_hls
+from media_files import MediaFiles, file_response
+from resizer import (
+    DerivedImageCache, ResizeSpec, ResizeUnavailable, ResizeBusy, UndecodableImage, snap_up,
+    RESIZE_FORMATS, SOURCE_FORMATS, RESIZE_BREAKPOINTS, RESIZE_QUALITIES
+)
+from storage import BlobStore, StoredFile, UploadTooLarge, ChunkInterrupted, stream_upload, stage_file, write_chunk
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # Create uploads directory
-UPLOADS_DIR = ROOT_DIR / 'uploads'
-UPLOADS_DIR.mkdir(exist_ok=True)
+UPLOADS_DIR = Path(os.environ.get('UPLOADS_DIR', str(ROOT_DIR / 'uploads')))
+UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
+
+# Prometheus metrics, served at /api/metrics (bearer METRICS_TOKEN if set)
+metrics = Registry()
+http_requests = metrics.counter(
+    "http_requests_total", "HTTP requests by route and status.", ["method", "route", "status"])
+http_latency = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", ["method", "route"])
+http_response_bytes = metrics.counter(
+    "http_response_bytes_total", "Response body bytes by route.", ["route"])
+upload_bytes = metrics.counter(
+    "media_upload_bytes_total", "Media bytes received, by upload path.", ["kind"])
+contact_submissions = metrics.counter(
+    "contact_submissions_total", "Contact form submissions by outcome.", ["outcome"])
+mongo_commands = MongoCommandMetrics(
+    metrics.histogram("mongo_command_duration_seconds", "Mongo command latency.",
+                      ["command", "collection"], MONGO_BUCKETS),
+    metrics.counter("mongo_command_failures_total", "Failed Mongo commands.", ["command", "collection"])
+)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
 
-# MongoDB connection
+# MongoDB connection. Pool checkouts wait at most MONGO_WAIT_QUEUE_TIMEOUT_MS
+# before failing; MONGO_COMPRESSORS may also list zstd or snappy when their
+# Python packages are installed.
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+mongo_pool_metrics = PoolMetrics()
+client = AsyncIOMotorClient(
+    mongo_url,
+    maxPoolSize=int(os.environ.get('MONGO_MAX_POOL_SIZE', '100')),
+    minPoolSize=int(os.environ.get('MONGO_MIN_POOL_SIZE', '0')),
+    waitQueueTimeoutMS=int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '5000')),
+    serverSelectionTimeoutMS=int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000')),
+    compressors=os.environ.get('MONGO_COMPRESSORS', 'zlib') or None,
+    event_listeners=[mongo_pool_metrics, mongo_commands]
+)
 db = client[os.environ['DB_NAME']]
 
+# Public catalog reads may be served by secondaries; everything else,
+# including all admin reads and writes, stays on the primary
+public_db = client.get_database(
+    os.environ['DB_NAME'],
+    read_preference=SecondaryPreferred(
+        max_staleness=int(os.environ.get('MONGO_MAX_STALENESS_SECONDS', '-1'))
+    )
+)
+# After a catalog write, public reads go to the primary for this long so a
+# lagging secondary cannot refill the catalog cache with the old data
+SECONDARY_READ_GRACE_SECONDS = float(os.environ.get('SECONDARY_READ_GRACE_SECONDS', '10'))
+
+# Content-addressed media files, reference counted in db.blobs
+blob_store = BlobStore(UPLOADS_DIR, db.blobs)
+
+# Thumbnails, responsive widths and video posters, one directory per blob
+VARIANTS_DIR = UPLOADS_DIR / 'variants'
+
+# Adaptive HLS ladders for videos, one directory per blob
+HLS_DIR = UPLOADS_DIR / 'hls'
+HLS_TRANSCODE_TIMEOUT_SECONDS = int(os.environ.get('HLS_TRANSCODE_TIMEOUT_SECONDS', '3600'))
+HLS_FFMPEG_THREADS = int(os.environ.get('HLS_FFMPEG_THREADS', '2'))
+
+# Static assets shipped with the frontend
+PUBLIC_ASSETS_DIR = Path(os.environ.get('PUBLIC_ASSETS_DIR', str(ROOT_DIR.parent / 'frontend' / 'public')))
+PUBLIC_ASSETS_CACHE_CONTROL = os.environ.get('PUBLIC_ASSETS_CACHE_CONTROL', 'public, max-age=86400')
+
+# On-demand resized images, kept on disk under a byte budget
+RESIZE_MAX_DIMENSION = int(os.environ.get('RESIZE_MAX_DIMENSION', '3840'))
+RESIZE_DIMENSIONS = tuple(d for d in RESIZE_BREAKPOINTS if d <= RESIZE_MAX_DIMENSION) or (RESIZE_MAX_DIMENSION,)
+derived_cache = DerivedImageCache(
+    Path(os.environ.get('DERIVED_CACHE_DIR', str(ROOT_DIR / 'derived_cache'))),
+    max_bytes=int(os.environ.get('DERIVED_CACHE_MAX_BYTES', str(2 * 1024 * 1024 * 1024))),
+    workers=int(os.environ.get('RESIZE_WORKERS', '2')),
+    max_pending=int(os.environ.get('RESIZE_MAX_PENDING', '16'))
+)
+
 # JWT Config
 JWT_SECRET = os.environ.get('JWT_SECRET', 'findelmundo_secret_key_2024')
 JWT_ALGORITHM = 'HS256'
 JWT_EXPIRATION_HOURS = 24
 
+# bcrypt runs on its own small pool; excess concurrent logins get a 429
+password_hasher = PasswordHasher(
+    rounds=int(os.environ.get('BCRYPT_ROUNDS', '12')),
+    workers=int(os.environ.get('BCRYPT_WORKERS', '2')),
+    max_pending=int(os.environ.get('BCRYPT_MAX_PENDING', '8'))
+)
+
+# Authenticated requests resolve the admin from memory; revoked token ids
+# are mirrored from db.revoked_tokens
+admin_principals = PrincipalCache(ttl_seconds=float(os.environ.get('ADMIN_CACHE_TTL_SECONDS', '30')))
+revoked_tokens = RevocationList()
+REVOCATION_REFRESH_SECONDS = int(os.environ.get('REVOCATION_REFRESH_SECONDS', '15'))
+
+# Display order for new media, allocated from a counter document
+media_order = SequenceAllocator(db.counters, "media_order")
+
+# Media counts per category, maintained by the media write handlers
+category_counts = CategoryCounts(db.categories)
+
+# Batch endpoints: items per request, and files stored concurrently
+MEDIA_BATCH_MAX = int(os.environ.get('MEDIA_BATCH_MAX', '500'))
+MEDIA_BATCH_IO_CONCURRENCY = int(os.environ.get('MEDIA_BATCH_IO_CONCURRENCY', '4'))
+# A delete claim older than this was left by a request that died mid-delete
+MEDIA_DELETE_CLAIM_SECONDS = int(os.environ.get('MEDIA_DELETE_CLAIM_SECONDS', '300'))
+
+# Contact form: submissions are buffered and inserted in batches of
+# CONTACT_FLUSH_BATCH or every CONTACT_FLUSH_SECONDS, and each client IP may
+# send CONTACT_RATE_BURST messages at once, refilled at CONTACT_RATE_PER_HOUR
+contact_buffer = MessageBuffer(
+    db.contact_messages,
+    max_batch=int(os.environ.get('CONTACT_FLUSH_BATCH', '100')),
+    flush_interval=float(os.environ.get('CONTACT_FLUSH_SECONDS', '1')),
+    max_pending=int(os.environ.get('CONTACT_MAX_PENDING', '10000'))
+)
+contact_rate_limiter = RateLimiter(
+    rate=float(os.environ.get('CONTACT_RATE_PER_HOUR', '20')) / 3600,
+    burst=int(os.environ.get('CONTACT_RATE_BURST', '5'))
+)
+# Identical messages (same email, subject and text) are dropped within the
+# same CONTACT_DEDUP_SECONDS time bucket
+CONTACT_DEDUP_SECONDS = int(os.environ.get('CONTACT_DEDUP_SECONDS', '86400'))
+# Reverse proxies in front of the API that append to X-Forwarded-For. The
+# rate limit keys on the address the outermost of them saw; leave at 0 when
+# clients connect directly, or they could pick their own key.
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', '0'))
+CONTACT_PAGE_DEFAULT = int(os.environ.get('CONTACT_PAGE_DEFAULT', '100'))
+CONTACT_PAGE_MAX = int(os.environ.get('CONTACT_PAGE_MAX', '200'))
+
+# Admin dashboard change feed over SSE: change streams on replica sets,
+# otherwise polling every ADMIN_EVENTS_POLL_SECONDS (ADMIN_EVENTS_MODE forces one),
+# with a full id comparison for deletes every ADMIN_EVENTS_RESCAN_POLLS polls
+admin_events = ChangeFeed(
+    db,
+    mode=os.environ.get('ADMIN_EVENTS_MODE', 'auto'),
+    poll_interval=float(os.environ.get('ADMIN_EVENTS_POLL_SECONDS', '2')),
+    heartbeat=float(os.environ.get('ADMIN_EVENTS_HEARTBEAT_SECONDS', '15')),
+    rescan_every=int(os.environ.get('ADMIN_EVENTS_RESCAN_POLLS', '30'))
+)
+# EventSource cannot send headers, so the stream URL carries a ticket valid
+# this long instead of the access token, which must stay out of access logs
+ADMIN_EVENTS_TICKET_SECONDS = int(os.environ.get('ADMIN_EVENTS_TICKET_SECONDS', '60'))
+ADMIN_EVENTS_TICKET_AUDIENCE = "admin-events"
+
+# Media listing pagination
+MEDIA_PAGE_DEFAULT = int(os.environ.get('MEDIA_PAGE_DEFAULT', '60'))
+MEDIA_PAGE_MAX = int(os.environ.get('MEDIA_PAGE_MAX', '500'))
+
+# Catalog search pagination; deep offsets are refused to bound $skip work
+SEARCH_PAGE_DEFAULT = int(os.environ.get('SEARCH_PAGE_DEFAULT', '24'))
+SEARCH_PAGE_MAX = int(os.environ.get('SEARCH_PAGE_MAX', '100'))
+SEARCH_MAX_OFFSET = int(os.environ.get('SEARCH_MAX_OFFSET', '1000'))
+
+# Upload size limits per media_type, in bytes
+MEDIA_SIZE_LIMITS = {
+    "image": int(os.environ.get('UPLOAD_MAX_BYTES_IMAGE', str(50 * 1024 * 1024))),
+    "video": int(os.environ.get('UPLOAD_MAX_BYTES_VIDEO', str(2 * 1024 * 1024 * 1024))),
+    "audio": int(os.environ.get('UPLOAD_MAX_BYTES_AUDIO', str(500 * 1024 * 1024))),
+}
+MAX_UPLOAD_BYTES = max(MEDIA_SIZE_LIMITS.values())
+# Whole request body of a batch upload; larger sets go through several batches
+MEDIA_BATCH_MAX_BYTES = int(os.environ.get('MEDIA_BATCH_MAX_BYTES', str(MAX_UPLOAD_BYTES)))
+
+# Resumable upload sessions
+UPLOAD_SESSION_TTL_HOURS = int(os.environ.get('UPLOAD_SESSION_TTL_HOURS', '24'))
+UPLOAD_SESSION_SWEEP_SECONDS = int(os.environ.get('UPLOAD_SESSION_SWEEP_SECONDS', '900'))
+# How long one PATCH may hold a session before a retry can take it over
+UPLOAD_WRITE_LEASE_SECONDS = int(os.environ.get('UPLOAD_WRITE_LEASE_SECONDS', '900'))
+
+# Public catalog read cache, invalidated by the admin write handlers
+catalog_cache = CatalogCache(
+    max_entries=int(os.environ.get('CATALOG_CACHE_MAX_ENTRIES', '512')),
+    ttl_seconds=float(os.environ.get('CATALOG_CACHE_TTL_SECONDS', '60'))
+)
+# Browsers and CDNs may store catalog responses but must revalidate them
+CATALOG_CACHE_CONTROL = os.environ.get('CATALOG_CACHE_CONTROL', 'public, max-age=0, must-revalidate')
+
+# gzip/brotli for JSON and text responses of at least COMPRESSION_MIN_SIZE bytes
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', '5'))
+
 # Create the main app
 app = FastAPI()
 
@@ -64,6 +267,23 @@ class MediaCreate(BaseModel):
     category: str = "Portrait"
     media_type: str = "image"  # image or video
 
+class UploadSessionCreate(BaseModel):
+    filename: str
+    size: int = Field(..., gt=0)
+    title: str
+    description: Optional[str] = ""
+    category: str = "Portrait"
+    media_type: str = "image"
+
+class UploadSessionResponse(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    filename: str
+    size: int
+    offset: int
+    status: str
+    expires_at: str
+
 class MediaUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
@@ -71,6 +291,20 @@ class MediaUpdate(BaseModel):
     featured: Optional[bool] = None
     order: Optional[int] = None
 
+class MediaBatchUpdate(MediaUpdate):
+    id: str
+
+class MediaIds(BaseModel):
+    ids: List[str]
+
+class MediaUploadItem(BaseModel):
+    title: Optional[str] = None
+    description: str = ""
+    category: str = "Portrait"
+    media_type: str = "image"
+
+media_upload_items = TypeAdapter(List[MediaUploadItem])
+
 class MediaResponse(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str
@@ -80,6 +314,8 @@ class MediaResponse(BaseModel):
     media_type: str
     file_url: str
     thumbnail_url: Optional[str] = None
+    variants: Optional[Dict[str, Dict[str, str]]] = None
+    stream_url: Optional[str] = None
     featured: bool
     order: int
     created_at: str
@@ -90,6 +326,12 @@ class CategoryResponse(BaseModel):
     name: str
     count: int
 
+# Whole lists are validated in one call into pydantic-core, and Mongo only
+# returns the fields the response needs
+media_list_adapter = TypeAdapter(List[MediaResponse])
+category_list_adapter = TypeAdapter(List[CategoryResponse])
+MEDIA_RESPONSE_PROJECTION = {"_id": 0, **{f: 1 for f in MediaResponse.model_fields}}
+
 class AboutContent(BaseModel):
     bio: str
     artist_name: str
@@ -102,6 +344,10 @@ class ContactMessage(BaseModel):
     subject: str
     message: str
 
+class ContactMessageIds(BaseModel):
+    ids: List[str]
+    read: bool = True
+
 class SiteSettings(BaseModel):
     site_title: str = "FINDELMUNNDO"
     tagline: str = "Audio • Video • Photography"
@@ -113,18 +359,27 @@ class SiteSettings(BaseModel):
 
 # ==================== AUTH HELPERS ====================
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+async def hash_password(password: str) -> str:
+    try:
+        with span("bcrypt.hash"):
+            return await password_hasher.hash(password)
+    except HasherBusy:
+        raise HTTPException(status_code=429, detail="Too many requests", headers={"Retry-After": "1"})
 
-def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+async def verify_password(password: str, hashed: str) -> bool:
+    try:
+        with span("bcrypt.verify"):
+            return await password_hasher.verify(password, hashed)
+    except HasherBusy:
+        raise HTTPException(status_code=429, detail="Too many requests", headers={"Retry-After": "1"})
 
 def create_access_token(admin_id: str) -> str:
-    expire = datetime.now(timezone.utc) + timedelta(hours=JWT_EXPIRATION_HOURS)
-    payload = {"sub": admin_id, "exp": expire}
+    now = datetime.now(timezone.utc)
+    expire = now + timedelta(hours=JWT_EXPIRATION_HOURS)
+    payload = {"sub": admin_id, "jti": uuid.uuid4().hex, "iat": now, "exp": expire}
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
-async def get_current_admin(token: str = None):
+def decode_access_token(token: str = None) -> dict:
     if not token:
         raise HTTPException(status_code=401, detail="Token required")
     
@@ -134,18 +389,58 @@ async def get_current_admin(token: str = None):
     
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        admin_id = payload.get("sub")
-        if not admin_id:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        
-        admin = await db.admins.find_one({"id": admin_id}, {"_id": 0})
-        if not admin:
-            raise HTTPException(status_code=401, detail="Admin not found")
-        return admin
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    if not payload.get("sub"):
+        raise HTTPException(status_code=401, detail="Invalid token")
+    jti = payload.get("jti")
+    if jti and jti in revoked_tokens:
+        raise HTTPException(status_code=401, detail="Token revoked")
+    return payload
+
+async def get_current_admin(token: str = None):
+    payload = decode_access_token(token)
+    admin_id, jti = payload["sub"], payload.get("jti")
+    
+    admin = admin_principals.get(admin_id, jti)
+    if admin is None:
+        with span("mongo.admins"):
+            admin = await db.admins.find_one({"id": admin_id}, {"_id": 0, "password_hash": 0})
+        if not admin:
+            raise HTTPException(status_code=401, detail="Admin not found")
+        admin_principals.set(admin_id, jti, admin)
+    return admin
+
+async def revoke_token(jti: str, expires_at: datetime):
+    await db.revoked_tokens.update_one(
+        {"jti": jti},
+        {"$setOnInsert": {"jti": jti, "expires_at": expires_at}},
+        upsert=True
+    )
+    revoked_tokens.add(jti, expires_at.timestamp())
+    admin_principals.invalidate_token(jti)
+
+async def refresh_revoked_tokens():
+    now = datetime.now(timezone.utc)
+    # Logouts handled here while the query runs may be missing from its result
+    since = revoked_tokens.mark()
+    entries = await db.revoked_tokens.find(
+        {"expires_at": {"$gt": now}}, {"_id": 0, "jti": 1, "expires_at": 1}
+    ).to_list(None)
+    revoked_tokens.replace(
+        ((e["jti"], e["expires_at"].replace(tzinfo=timezone.utc).timestamp()) for e in entries),
+        since=since
+    )
+
+async def run_revocation_refresher():
+    while True:
+        try:
+            await refresh_revoked_tokens()
+        except Exception:
+            logger.exception("Refreshing revoked tokens failed")
+        await asyncio.sleep(REVOCATION_REFRESH_SECONDS)
 
 # ==================== AUTH ROUTES ====================
 
@@ -160,7 +455,7 @@ async def register_admin(data: AdminCreate):
     admin_doc = {
         "id": admin_id,
         "email": data.email,
-        "password_hash": hash_password(data.password),
+        "password_hash": await hash_password(data.password),
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     
@@ -178,10 +473,19 @@ async def register_admin(data: AdminCreate):
 
 @api_router.post("/auth/login", response_model=TokenResponse)
 async def login_admin(data: AdminLogin):
-    admin = await db.admins.find_one({"email": data.email}, {"_id": 0})
-    if not admin or not verify_password(data.password, admin["password_hash"]):
+    with span("mongo.admins"):
+        admin = await db.admins.find_one({"email": data.email}, {"_id": 0})
+    if not admin or not await verify_password(data.password, admin["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
+    # Upgrade hashes made with a different cost factor while we have the password
+    if password_hasher.needs_rehash(admin["password_hash"]):
+        await db.admins.update_one(
+            {"id": admin["id"], "password_hash": admin["password_hash"]},
+            {"$set": {"password_hash": await hash_password(data.password)}}
+        )
+        admin_principals.invalidate_admin(admin["id"])
+    
     token = create_access_token(admin["id"])
     return TokenResponse(
         access_token=token,
@@ -192,6 +496,14 @@ async def login_admin(data: AdminLogin):
         )
     )
 
+@api_router.post("/auth/logout")
+async def logout_admin(authorization: str = Header(None)):
+    payload = decode_access_token(authorization)
+    if payload.get("jti"):
+        expires_at = datetime.fromtimestamp(payload["exp"], tz=timezone.utc)
+        await revoke_token(payload["jti"], expires_at)
+    return {"message": "Logged out"}
+
 @api_router.get("/auth/me", response_model=AdminResponse)
 async def get_current_admin_info(authorization: str = Header(None)):
     admin = await get_current_admin(authorization)
@@ -201,6 +513,60 @@ async def get_current_admin_info(authorization: str = Header(None)):
         created_at=admin["created_at"]
     )
 
+# ==================== CATALOG CACHE ====================
+
+def render_json(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, separators=(",", ":"), ensure_ascii=False).encode('utf-8')
+
+def json_response(content, headers: Optional[dict] = None) -> Response:
+    """Encode ``content`` directly, skipping FastAPI's jsonable_encoder pass."""
+    return Response(content=render_json(content), media_type="application/json", headers=headers)
+
+def catalog_db():
+    """Database handle for public catalog loaders: secondaries when allowed,
+    the primary right after a catalog write."""
+    if time.monotonic() - catalog_cache.invalidated_at < SECONDARY_READ_GRACE_SECONDS:
+        return db
+    return public_db
+
+async def serve_cached(request: Request, key: tuple, loader) -> Response:
+    """Serve a public catalog response from memory, rendering it with
+    ``loader`` on a miss. ``loader`` returns ``(content, headers)``.
+
+    Answers ``304 Not Modified`` when ``If-None-Match`` carries the entry's ETag."""
+    entry = catalog_cache.get(key)
+    status = "hit"
+    if entry is None:
+        status = "miss"
+        generation = catalog_cache.generation
+        content, headers = await loader()
+        with span("render_json"):
+            body = render_json(content)
+        entry = catalog_cache.set(key, body, headers, generation)
+    
+    headers = {
+        **entry.headers,
+        "Cache-Control": CATALOG_CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+        "X-Cache": status
+    }
+    body, etag = entry.body, entry.etag
+    coding = negotiate(request.headers.get("accept-encoding")) if len(body) >= COMPRESSION_MIN_SIZE else None
+    if coding:
+        # Compressed once per cached revision, then reused by every hit
+        body = entry.encoded.get(coding)
+        if body is None:
+            with span("compress"):
+                body = entry.encoded[coding] = compress(entry.body, coding, GZIP_LEVEL, BROTLI_QUALITY)
+        etag = encoded_etag(entry.etag, coding)
+        headers["Content-Encoding"] = coding
+    headers["ETag"] = etag
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 # ==================== MEDIA ROUTES ====================
 
 @api_router.post("/media/upload", response_model=MediaResponse)
@@ -214,66 +580,800 @@ async def upload_media(
 ):
     await get_current_admin(authorization)
     
-    # Generate unique filename
     file_ext = Path(file.filename).suffix.lower()
     file_id = str(uuid.uuid4())
-    filename = f"{file_id}{file_ext}"
-    file_path = UPLOADS_DIR / filename
     
-    # Save file
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Stream the file to disk off the event loop
+    size_limit = MEDIA_SIZE_LIMITS.get(media_type, MEDIA_SIZE_LIMITS["image"])
+    try:
+        with span("upload.stream"):
+            staged = await stream_upload(file, UPLOADS_DIR / ".tmp", max_bytes=size_limit)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=f"File too large for {media_type} (max {e.limit} bytes)")
+    upload_bytes.inc(staged.size, kind="direct")
     
-    # Get max order
-    max_order_doc = await db.media.find_one(sort=[("order", -1)])
-    next_order = (max_order_doc.get("order", 0) + 1) if max_order_doc else 1
+    # Identical content shares one blob on disk
+    with span("upload.store"):
+        stored = await blob_store.put(staged, file_ext)
     
-    media_doc = {
+    return await create_media_record(file_id, stored, title, description, category, media_type)
+
+async def create_media_record(
+    file_id: str,
+    stored: StoredFile,
+    title: str,
+    description: str,
+    category: str,
+    media_type: str,
+    order: Optional[int] = None
+) -> MediaResponse:
+    if order is None:
+        order = await media_order.reserve()
+    media_doc = build_media_doc(file_id, stored, title, description, category, media_type, order)
+    with span("mongo.publish"):
+        await publish_media([media_doc])
+    return MediaResponse(**media_doc)
+
+def build_media_doc(
+    file_id: str,
+    stored: StoredFile,
+    title: str,
+    description: str,
+    category: str,
+    media_type: str,
+    order: int
+) -> dict:
+    now = datetime.now(timezone.utc).isoformat()
+    return {
         "id": file_id,
         "title": title,
+        "title_terms": title_terms(title),
         "description": description,
         "category": category,
         "media_type": media_type,
-        "filename": filename,
-        "file_url": f"/api/uploads/{filename}",
+        "filename": stored.filename,
+        "size": stored.size,
+        "sha256": stored.sha256,
+        "file_url": f"/api/uploads/{stored.filename}",
         "thumbnail_url": None,
+        "variants": None,
+        "variants_status": "queued",
+        "stream_url": None,
+        "stream_status": "queued" if media_type == "video" else None,
         "featured": False,
-        "order": next_order,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "order": order,
+        "created_at": now,
+        "updated_at": now
+    }
+
+async def publish_media(media_docs: List[dict]):
+    """Insert new media documents and queue their background jobs."""
+    await db.media.insert_many(media_docs)
+    await category_counts.apply(Counter(doc["category"] for doc in media_docs))
+    catalog_cache.invalidate()
+    
+    # Jobs the queues cannot take now are left for the backfills
+    deferred_variants = [doc["id"] for doc in media_docs if not variant_worker.submit(doc["id"])]
+    deferred_streams = [
+        doc["id"] for doc in media_docs
+        if doc["media_type"] == "video" and not stream_worker.submit(doc["id"])
+    ]
+    now = datetime.now(timezone.utc).isoformat()
+    if deferred_variants:
+        await db.media.update_many(
+            {"id": {"$in": deferred_variants}}, {"$set": {"variants_status": "pending", "updated_at": now}}
+        )
+    if deferred_streams:
+        await db.media.update_many(
+            {"id": {"$in": deferred_streams}}, {"$set": {"stream_status": "pending", "updated_at": now}}
+        )
+
+@api_router.post("/media/upload/batch")
+async def upload_media_batch(
+    files: List[UploadFile] = File(...),
+    metadata: str = Form("[]"),
+    authorization: str = Header(None)
+):
+    """Upload several files in one request.
+
+    ``metadata`` is a JSON array with one object per file (title, description,
+    category, media_type); omitted fields take the single-upload defaults and
+    the title falls back to the file name. Each file succeeds or fails on its
+    own and gets an entry in ``results``.
+    """
+    await get_current_admin(authorization)
+    
+    if len(files) > MEDIA_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {MEDIA_BATCH_MAX} files per batch")
+    try:
+        items = media_upload_items.validate_json(metadata)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+    if items and len(items) != len(files):
+        raise HTTPException(status_code=400, detail="metadata must have one entry per file")
+    items = items or [MediaUploadItem() for _ in files]
+    
+    semaphore = asyncio.Semaphore(MEDIA_BATCH_IO_CONCURRENCY)
+    
+    async def store(file: UploadFile, item: MediaUploadItem) -> StoredFile:
+        size_limit = MEDIA_SIZE_LIMITS.get(item.media_type, MEDIA_SIZE_LIMITS["image"])
+        async with semaphore:
+            staged = await stream_upload(file, UPLOADS_DIR / ".tmp", max_bytes=size_limit)
+            upload_bytes.inc(staged.size, kind="batch")
+            return await blob_store.put(staged, Path(file.filename).suffix.lower())
+    
+    outcomes = await asyncio.gather(*(store(f, i) for f, i in zip(files, items)), return_exceptions=True)
+    
+    stored = [(index, outcome) for index, outcome in enumerate(outcomes) if isinstance(outcome, StoredFile)]
+    media_docs = {}
+    if stored:
+        # One counter round-trip for the whole batch keeps it in upload order
+        first_order = await media_order.reserve(len(stored))
+        for position, (index, blob) in enumerate(stored):
+            item = items[index]
+            media_docs[index] = build_media_doc(
+                str(uuid.uuid4()), blob, item.title or Path(files[index].filename).stem,
+                item.description, item.category, item.media_type, first_order + position
+            )
+        try:
+            await publish_media(list(media_docs.values()))
+        except Exception:
+            logger.exception("Publishing a batch of %d uploads failed", len(media_docs))
+            # Drop the blob references taken for documents that never got written
+            published = {
+                m["id"] for m in await db.media.find(
+                    {"id": {"$in": [doc["id"] for doc in media_docs.values()]}}, {"_id": 0, "id": 1}
+                ).to_list(len(media_docs))
+            }
+            for index, doc in list(media_docs.items()):
+                if doc["id"] not in published:
+                    await blob_store.release(doc["sha256"])
+                    del media_docs[index]
+    
+    results = []
+    for index, (file, outcome) in enumerate(zip(files, outcomes)):
+        result = {"index": index, "filename": file.filename}
+        if index in media_docs:
+            result.update(status="created", media=MediaResponse(**media_docs[index]).model_dump())
+        elif isinstance(outcome, UploadTooLarge):
+            result.update(status="too_large", detail=f"File too large for {items[index].media_type} (max {outcome.limit} bytes)")
+        elif isinstance(outcome, StoredFile):
+            result.update(status="failed", detail="Upload could not be saved")
+        else:
+            logger.error("Batch upload of %s failed: %r", file.filename, outcome)
+            result.update(status="failed", detail="Upload failed")
+        results.append(result)
+    return {"results": results}
+
+# ==================== MEDIA VARIANTS ====================
+
+def variants_key(media: dict) -> str:
+    # One directory per file on disk; for blobs the stem is the SHA-256
+    return Path(media["filename"]).stem
+
+async def generate_media_variants(media_id: str):
+    media = await db.media.find_one({"id": media_id}, {"_id": 0})
+    if not media:
+        return
+    key = variants_key(media)
+    manifest = await variant_worker.run_blocking(
+        build_variants, UPLOADS_DIR / media["filename"], VARIANTS_DIR / key, media["media_type"]
+    )
+    
+    base_url = f"/api/uploads/variants/{key}"
+    variants = {
+        fmt: {width: f"{base_url}/{name}" for width, name in widths.items()}
+        for fmt, widths in manifest["variants"].items()
+    }
+    await db.media.update_one(
+        {"id": media_id},
+        {"$set": {
+            "thumbnail_url": f"{base_url}/{manifest['thumbnail']}",
+            "variants": variants,
+            "variants_status": "ready",
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }, "$unset": {"variants_error": ""}}
+    )
+    catalog_cache.invalidate()
+
+async def record_variants_failure(media_id: str, error: Exception):
+    logger.error("Variant generation failed for %s: %s", media_id, error)
+    await db.media.update_one(
+        {"id": media_id},
+        {"$set": {
+            "variants_status": "failed",
+            "variants_error": str(error),
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }}
+    )
+
+async def backfill_variants(include_failed: bool = False) -> dict:
+    """Generate variants for media that has none yet, e.g. uploads made
+    before the pipeline existed or jobs dropped by a full queue."""
+    statuses = [None, "queued", "pending"] + (["failed"] if include_failed else [])
+    query = {"variants_status": {"$in": statuses}}
+    summary = {"ready": 0, "failed": 0}
+    async for media in db.media.find(query, {"_id": 0, "id": 1}):
+        error = await variant_worker.run_with_retries(media["id"])
+        if error is None:
+            summary["ready"] += 1
+        else:
+            await record_variants_failure(media["id"], error)
+            summary["failed"] += 1
+    return summary
+
+variant_worker = JobWorker(
+    "variants",
+    generate_media_variants,
+    record_variants_failure,
+    concurrency=int(os.environ.get('VARIANT_WORKERS', '2')),
+    queue_size=int(os.environ.get('VARIANT_QUEUE_SIZE', '256')),
+    max_attempts=int(os.environ.get('VARIANT_MAX_ATTEMPTS', '3'))
+)
+
+# ==================== VIDEO STREAMING ====================
+
+async def generate_media_stream(media_id: str):
+    media = await db.media.find_one({"id": media_id}, {"_id": 0})
+    if not media or media["media_type"] != "video":
+        return
+    await db.media.update_one(
+        {"id": media_id},
+        {"$set": {"stream_status": "processing", "updated_at": datetime.now(timezone.utc).isoformat()}}
+    )
+    
+    key = variants_key(media)
+    await package_hls(
+        UPLOADS_DIR / media["filename"], HLS_DIR / key,
+        timeout=HLS_TRANSCODE_TIMEOUT_SECONDS, threads=HLS_FFMPEG_THREADS
+    )
+    await db.media.update_one(
+        {"id": media_id},
+        {"$set": {
+            "stream_url": f"/api/uploads/hls/{key}/master.m3u8",
+            "stream_status": "ready",
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }, "$unset": {"stream_error": ""}}
+    )
+    catalog_cache.invalidate()
+
+async def record_stream_failure(media_id: str, error: Exception):
+    logger.error("HLS packaging failed for %s: %s", media_id, error)
+    await db.media.update_one(
+        {"id": media_id},
+        {"$set": {
+            "stream_status": "failed",
+            "stream_error": str(error),
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }}
+    )
+
+async def backfill_streams(include_failed: bool = False) -> dict:
+    """Package videos that have no HLS ladder yet."""
+    statuses = [None, "queued", "pending", "processing"] + (["failed"] if include_failed else [])
+    query = {"media_type": "video", "stream_status": {"$in": statuses}}
+    summary = {"ready": 0, "failed": 0}
+    async for media in db.media.find(query, {"_id": 0, "id": 1}):
+        error = await stream_worker.run_with_retries(media["id"])
+        if error is None:
+            summary["ready"] += 1
+        else:
+            await record_stream_failure(media["id"], error)
+            summary["failed"] += 1
+    return summary
+
+# Transcodes are long and CPU bound: keep the pool small so they cannot starve the API
+stream_worker = JobWorker(
+    "hls",
+    generate_media_stream,
+    record_stream_failure,
+    concurrency=int(os.environ.get('HLS_WORKERS', '1')),
+    queue_size=int(os.environ.get('HLS_QUEUE_SIZE', '64')),
+    max_attempts=int(os.environ.get('HLS_MAX_ATTEMPTS', '2')),
+    retry_delay=30.0
+)
+
+# ==================== RESUMABLE UPLOADS ====================
+
+def upload_part_path(upload_id: str) -> Path:
+    return UPLOADS_DIR / ".partial" / f"{upload_id}.part"
+
+def upload_session_expiry() -> str:
+    return (datetime.now(timezone.utc) + timedelta(hours=UPLOAD_SESSION_TTL_HOURS)).isoformat()
+
+async def get_upload_session(upload_id: str) -> dict:
+    session = await db.upload_sessions.find_one({"id": upload_id}, {"_id": 0})
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session
+
+@api_router.post("/media/uploads", response_model=UploadSessionResponse)
+async def init_resumable_upload(data: UploadSessionCreate, authorization: str = Header(None)):
+    admin = await get_current_admin(authorization)
+    
+    size_limit = MEDIA_SIZE_LIMITS.get(data.media_type, MEDIA_SIZE_LIMITS["image"])
+    if data.size > size_limit:
+        raise HTTPException(status_code=413, detail=f"File too large for {data.media_type} (max {size_limit} bytes)")
+    
+    now = datetime.now(timezone.utc).isoformat()
+    session = {
+        "id": str(uuid.uuid4()),
+        "admin_id": admin["id"],
+        "filename": data.filename,
+        "title": data.title,
+        "description": data.description,
+        "category": data.category,
+        "media_type": data.media_type,
+        "size": data.size,
+        "offset": 0,
+        "status": "active",
+        "created_at": now,
+        "updated_at": now,
+        "expires_at": upload_session_expiry()
+    }
+    await db.upload_sessions.insert_one(session)
+    return UploadSessionResponse(**session)
+
+@api_router.get("/media/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def get_resumable_upload(upload_id: str, response: Response, authorization: str = Header(None)):
+    await get_current_admin(authorization)
+    
+    session = await get_upload_session(upload_id)
+    response.headers["Upload-Offset"] = str(session["offset"])
+    response.headers["Upload-Length"] = str(session["size"])
+    return UploadSessionResponse(**session)
+
+@api_router.patch("/media/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def upload_resumable_part(
+    upload_id: str,
+    request: Request,
+    response: Response,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    authorization: str = Header(None)
+):
+    await get_current_admin(authorization)
+    
+    session = await get_upload_session(upload_id)
+    if session["status"] not in ("active", "writing"):
+        raise HTTPException(status_code=409, detail="Upload session is not active")
+    if upload_offset != session["offset"]:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Offset mismatch, expected {session['offset']}",
+            headers={"Upload-Offset": str(session["offset"])}
+        )
+    
+    # Claim the session before touching the part file: a retry of the same
+    # offset must not truncate it under a writer that is still running. A
+    # claim left behind by a crashed process can be taken over once it expires.
+    now = datetime.now(timezone.utc)
+    lease = str(uuid.uuid4())
+    claimed = await db.upload_sessions.update_one(
+        {
+            "id": upload_id,
+            "offset": upload_offset,
+            "$or": [
+                {"status": "active"},
+                {"status": "writing", "lease_expires_at": {"$lt": now.isoformat()}}
+            ]
+        },
+        {"$set": {
+            "status": "writing",
+            "lease": lease,
+            "lease_expires_at": (now + timedelta(seconds=UPLOAD_WRITE_LEASE_SECONDS)).isoformat()
+        }}
+    )
+    if claimed.matched_count == 0:
+        raise HTTPException(
+            status_code=409,
+            detail="Another part is being written to this upload",
+            headers={"Upload-Offset": str(session["offset"])}
+        )
+    release = {"$set": {"status": "active"}, "$unset": {"lease": "", "lease_expires_at": ""}}
+    
+    remaining = session["size"] - session["offset"]
+    try:
+        written = await write_chunk(request.stream(), upload_part_path(upload_id), upload_offset, remaining)
+    except ChunkInterrupted as e:
+        # Keep what arrived so the client can resume from the new offset
+        written = e.written
+    except BaseException as e:
+        await db.upload_sessions.update_one({"id": upload_id, "lease": lease}, release)
+        if isinstance(e, UploadTooLarge):
+            raise HTTPException(status_code=413, detail="Part exceeds declared upload size")
+        raise
+    upload_bytes.inc(written, kind="resumable")
+    
+    # Only the holder of the claim may acknowledge, and only once
+    progress = {
+        "offset": upload_offset + written,
+        "status": "active",
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+        "expires_at": upload_session_expiry()
     }
+    result = await db.upload_sessions.update_one(
+        {"id": upload_id, "lease": lease},
+        {"$set": progress, "$unset": release["$unset"]}
+    )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=409, detail="Upload session changed concurrently")
+    session.update(progress)
     
-    await db.media.insert_one(media_doc)
-    
-    return MediaResponse(
-        id=file_id,
-        title=title,
-        description=description,
-        category=category,
-        media_type=media_type,
-        file_url=media_doc["file_url"],
-        thumbnail_url=None,
-        featured=False,
-        order=next_order,
-        created_at=media_doc["created_at"]
+    response.headers["Upload-Offset"] = str(session["offset"])
+    return UploadSessionResponse(**session)
+
+@api_router.post("/media/uploads/{upload_id}/complete", response_model=MediaResponse)
+async def complete_resumable_upload(upload_id: str, authorization: str = Header(None)):
+    await get_current_admin(authorization)
+    
+    session = await get_upload_session(upload_id)
+    if session["offset"] != session["size"]:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Upload incomplete: {session['offset']} of {session['size']} bytes received"
+        )
+    claimed = await db.upload_sessions.update_one(
+        {"id": upload_id, "status": "active"},
+        {"$set": {"status": "completing"}}
     )
+    if claimed.modified_count == 0:
+        raise HTTPException(status_code=409, detail="Upload session is not active")
+    
+    try:
+        staged = await stage_file(upload_part_path(upload_id))
+    except FileNotFoundError:
+        await db.upload_sessions.delete_one({"id": upload_id})
+        raise HTTPException(status_code=410, detail="Upload data is gone")
+    except BaseException:
+        # Nothing consumed yet, so the client may simply retry
+        await db.upload_sessions.update_one({"id": upload_id}, {"$set": {"status": "active"}})
+        raise
+    if staged.size != session["size"]:
+        # The part file disagrees with the acknowledged offset; never publish it
+        await asyncio.to_thread(staged.path.unlink, missing_ok=True)
+        await db.upload_sessions.delete_one({"id": upload_id})
+        raise HTTPException(
+            status_code=422,
+            detail=f"Upload data is corrupt: {staged.size} of {session['size']} bytes on disk"
+        )
+    try:
+        stored = await blob_store.put(staged, Path(session["filename"]).suffix.lower())
+    except BaseException:
+        await db.upload_sessions.update_one({"id": upload_id}, {"$set": {"status": "active"}})
+        raise
+    
+    media_id = str(uuid.uuid4())
+    try:
+        media = await create_media_record(
+            media_id, stored, session["title"], session["description"],
+            session["category"], session["media_type"]
+        )
+    except BaseException:
+        # The part file now lives in the blob store; without a media
+        # document nothing else will drop the reference taken for it
+        if not await db.media.find_one({"id": media_id}, {"_id": 1}):
+            await blob_store.release(stored.sha256)
+        await db.upload_sessions.delete_one({"id": upload_id})
+        raise
+    await db.upload_sessions.delete_one({"id": upload_id})
+    return media
+
+@api_router.delete("/media/uploads/{upload_id}")
+async def abort_resumable_upload(upload_id: str, authorization: str = Header(None)):
+    await get_current_admin(authorization)
+    
+    await get_upload_session(upload_id)
+    await asyncio.to_thread(upload_part_path(upload_id).unlink, missing_ok=True)
+    await db.upload_sessions.delete_one({"id": upload_id})
+    return {"message": "Upload aborted"}
+
+async def sweep_upload_sessions() -> int:
+    """Drop expired sessions and their partial files. Returns the count removed."""
+    now = datetime.now(timezone.utc).isoformat()
+    expired = await db.upload_sessions.find({"expires_at": {"$lt": now}}, {"_id": 0, "id": 1}).to_list(1000)
+    for session in expired:
+        await asyncio.to_thread(upload_part_path(session["id"]).unlink, missing_ok=True)
+        await db.upload_sessions.delete_one({"id": session["id"]})
+    if expired:
+        logger.info("Swept %d expired upload sessions", len(expired))
+    return len(expired)
+
+async def run_upload_session_sweeper():
+    while True:
+        try:
+            await sweep_upload_sessions()
+        except Exception:
+            logger.exception("Upload session sweep failed")
+        await asyncio.sleep(UPLOAD_SESSION_SWEEP_SECONDS)
+
+def encode_media_cursor(doc: dict) -> str:
+    raw = json.dumps([doc["order"], doc["id"]], separators=(",", ":")).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip("=")
+
+def decode_media_cursor(cursor: str) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        order, media_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(order, int) or not isinstance(media_id, str):
+            raise ValueError
+        return order, media_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def parse_media_fields(fields: Optional[str]) -> Optional[dict]:
+    if not fields:
+        return None
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - set(MediaResponse.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    # id and order are always needed to build the next cursor
+    projection = {f: 1 for f in requested | {"id", "order"}}
+    projection["_id"] = 0
+    return projection
 
 @api_router.get("/media", response_model=List[MediaResponse])
-async def get_all_media(category: Optional[str] = None, featured: Optional[bool] = None):
+async def get_all_media(
+    request: Request,
+    category: Optional[str] = None,
+    featured: Optional[bool] = None,
+    limit: int = Query(MEDIA_PAGE_DEFAULT, ge=1, le=MEDIA_PAGE_MAX),
+    after: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    key = ("media", category, featured, limit, after, fields)
+    return await serve_cached(request, key, lambda: load_media_page(category, featured, limit, after, fields))
+
+async def load_media_page(category, featured, limit, after, fields):
     query = {}
     if category:
         query["category"] = category
     if featured is not None:
         query["featured"] = featured
+    if after:
+        # Keyset pagination over the (order, id) sort key
+        last_order, last_id = decode_media_cursor(after)
+        query["$or"] = [
+            {"order": {"$gt": last_order}},
+            {"order": last_order, "id": {"$gt": last_id}}
+        ]
+    
+    projection = parse_media_fields(fields)
+    cursor = catalog_db().media.find(query, projection or MEDIA_RESPONSE_PROJECTION)
+    # Fetch one extra document to know whether another page exists
+    with span("mongo.media"):
+        media_list = await cursor.sort([("order", 1), ("id", 1)]).limit(limit + 1).to_list(limit + 1)
+    
+    next_cursor = None
+    if len(media_list) > limit:
+        media_list = media_list[:limit]
+        next_cursor = encode_media_cursor(media_list[-1])
     
-    media_list = await db.media.find(query, {"_id": 0}).sort("order", 1).to_list(1000)
-    return [MediaResponse(**m) for m in media_list]
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    if projection is None:
+        with span("validate"):
+            media_list = media_list_adapter.dump_python(media_list_adapter.validate_python(media_list))
+    return media_list, headers
+
+async def backfill_title_terms(batch_size: int = 1000) -> int:
+    """Fill ``title_terms`` on media written before autocomplete existed."""
+    updated = 0
+    operations = []
+    async for media in db.media.find({"title_terms": {"$exists": False}}, {"_id": 0, "id": 1, "title": 1}):
+        operations.append(UpdateOne({"id": media["id"]}, {"$set": {"title_terms": title_terms(media.get("title"))}}))
+        if len(operations) == batch_size:
+            await db.media.bulk_write(operations, ordered=False)
+            updated += len(operations)
+            operations = []
+    if operations:
+        await db.media.bulk_write(operations, ordered=False)
+        updated += len(operations)
+    return updated
+
+# Declared before /media/{media_id}, which would otherwise capture "search"
+@api_router.get("/media/search")
+async def search_media(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    category: Optional[str] = None,
+    media_type: Optional[str] = None,
+    limit: int = Query(SEARCH_PAGE_DEFAULT, ge=1, le=SEARCH_PAGE_MAX),
+    offset: int = Query(0, ge=0, le=SEARCH_MAX_OFFSET)
+):
+    """Full-text search over titles and descriptions, best matches first.
+
+    ``facets`` counts matches per category and media_type; each facet ignores
+    its own filter. Follow ``next_offset`` for the next page.
+    """
+    key = ("search", q, category, media_type, limit, offset)
+    return await serve_cached(request, key, lambda: load_search_page(q, category, media_type, limit, offset))
+
+async def load_search_page(q, category, media_type, limit, offset):
+    pipeline = search_pipeline(q, category, media_type, offset, limit, MEDIA_RESPONSE_PROJECTION)
+    with span("mongo.search"):
+        found = (await catalog_db().media.aggregate(pipeline).to_list(1))[0]
+    total = found["total"][0]["count"] if found["total"] else 0
+    with span("validate"):
+        results = media_list_adapter.dump_python(media_list_adapter.validate_python(found["results"]))
+    return {
+        "query": q,
+        "total": total,
+        "offset": offset,
+        "next_offset": offset + limit if offset + limit < total else None,
+        "results": results,
+        "facets": {
+            field: [{"value": f["_id"], "count": f["count"]} for f in found[field]]
+            for field in ("category", "media_type")
+        },
+    }, {}
+
+@api_router.get("/media/search/suggest")
+async def suggest_media_terms(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=50),
+    limit: int = Query(8, ge=1, le=20)
+):
+    """Title words starting with ``q``, most common first, for autocomplete."""
+    async def load():
+        terms = await catalog_db().media.aggregate(suggest_pipeline(q, limit)).to_list(limit)
+        return {"suggestions": [{"term": t["_id"], "count": t["count"]} for t in terms]}, {}
+    return await serve_cached(request, ("suggest", q, limit), load)
 
 @api_router.get("/media/{media_id}", response_model=MediaResponse)
-async def get_media(media_id: str):
-    media = await db.media.find_one({"id": media_id}, {"_id": 0})
-    if not media:
-        raise HTTPException(status_code=404, detail="Media not found")
-    return MediaResponse(**media)
+async def get_media(media_id: str, request: Request):
+    async def load():
+        media = await catalog_db().media.find_one({"id": media_id}, MEDIA_RESPONSE_PROJECTION)
+        if not media:
+            raise HTTPException(status_code=404, detail="Media not found")
+        return MediaResponse.model_validate(media).model_dump(), {}
+    return await serve_cached(request, ("media_item", media_id), load)
+
+@api_router.post("/media/reorder")
+async def reorder_media(data: MediaIds, authorization: str = Header(None)):
+    """Apply a drag-and-drop ordering in one write.
+
+    ``ids`` lists the moved items in their new sequence. They take over the
+    order values they already held between them, so reordering a filtered
+    subset leaves every other item where it was.
+    """
+    await get_current_admin(authorization)
+    
+    if len(set(data.ids)) != len(data.ids):
+        raise HTTPException(status_code=400, detail="Duplicate media ids")
+    if not data.ids:
+        return {"updated": 0}
+    
+    current = await db.media.find(
+        {"id": {"$in": data.ids}}, {"_id": 0, "id": 1, "order": 1}
+    ).to_list(len(data.ids))
+    missing = set(data.ids) - {m["id"] for m in current}
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Media not found: {', '.join(sorted(missing))}")
+    
+    slots = sorted(m.get("order", 0) for m in current)
+    now = datetime.now(timezone.utc).isoformat()
+    result = await db.media.bulk_write(
+        [
+            UpdateOne({"id": media_id}, {"$set": {"order": order, "updated_at": now}})
+            for media_id, order in zip(data.ids, slots)
+        ],
+        ordered=False
+    )
+    catalog_cache.invalidate()
+    return {"updated": result.modified_count}
+
+@api_router.patch("/media")
+async def update_media_batch(updates: List[MediaBatchUpdate], authorization: str = Header(None)):
+    """Apply many ``MediaUpdate``s, each tagged with its media ``id``, and report a status per item."""
+    await get_current_admin(authorization)
+    
+    if len(updates) > MEDIA_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {MEDIA_BATCH_MAX} updates per batch")
+    changes = {u.id: u.model_dump(exclude={"id"}, exclude_none=True) for u in updates}
+    if len(changes) != len(updates):
+        raise HTTPException(status_code=400, detail="Duplicate media ids")
+    for change in changes.values():
+        if "title" in change:
+            change["title_terms"] = title_terms(change["title"])
+    
+    # One find_one_and_update per item: the pre-image it returns is the
+    # category this write actually replaced, even with concurrent edits
+    now = datetime.now(timezone.utc).isoformat()
+    semaphore = asyncio.Semaphore(MEDIA_BATCH_IO_CONCURRENCY)
+    
+    async def apply(media_id: str, change: dict) -> Optional[dict]:
+        async with semaphore:
+            return await db.media.find_one_and_update(
+                {"id": media_id}, {"$set": {**change, "updated_at": now}}, {"_id": 0, "id": 1, "category": 1}
+            )
+    
+    valid = [media_id for media_id, change in changes.items() if change]
+    written = await asyncio.gather(*(apply(media_id, changes[media_id]) for media_id in valid))
+    previous = {doc["id"]: doc for doc in written if doc is not None}
+    empty = [media_id for media_id, change in changes.items() if not change]
+    if empty:
+        previous.update({
+            m["id"]: m for m in await db.media.find({"id": {"$in": empty}}, {"_id": 0, "id": 1}).to_list(len(empty))
+        })
+    if any(doc is not None for doc in written):
+        deltas = Counter()
+        for media_id in valid:
+            old = previous.get(media_id, {}).get("category")
+            change = changes[media_id]
+            if media_id in previous and "category" in change and change["category"] != old:
+                deltas[old] -= 1
+                deltas[change["category"]] += 1
+        await category_counts.apply(deltas)
+        orders = [changes[media_id]["order"] for media_id in valid if "order" in changes[media_id]]
+        if orders:
+            await media_order.ensure_at_least(max(orders))
+        catalog_cache.invalidate()
+    
+    results = []
+    for media_id, change in changes.items():
+        if media_id not in previous:
+            results.append({"id": media_id, "status": "not_found"})
+        elif not change:
+            results.append({"id": media_id, "status": "invalid", "detail": "No update data provided"})
+        else:
+            results.append({"id": media_id, "status": "updated"})
+    return {"results": results}
+
+@api_router.post("/media/delete")
+async def delete_media_batch(data: MediaIds, authorization: str = Header(None)):
+    """Delete many media items in one request."""
+    await get_current_admin(authorization)
+    
+    if len(data.ids) > MEDIA_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {MEDIA_BATCH_MAX} ids per batch")
+    ids = list(dict.fromkeys(data.ids))
+    
+    # Claim the documents first so a concurrent delete cannot release the
+    # same blobs or decrement the same counts twice
+    claim = uuid.uuid4().hex
+    await db.media.update_many(
+        {"id": {"$in": ids}, **unclaimed_media_filter()},
+        {"$set": {"deleting": claim, "deleting_at": datetime.now(timezone.utc).isoformat()}}
+    )
+    semaphore = asyncio.Semaphore(MEDIA_BATCH_IO_CONCURRENCY)
+    
+    async def delete(media_id: str) -> Optional[dict]:
+        # Only what this request removed itself is counted and released
+        async with semaphore:
+            media = await db.media.find_one_and_delete({"id": media_id, "deleting": claim}, {"_id": 0})
+            if media:
+                try:
+                    await release_media_files(media)
+                except Exception:
+                    # The document is gone either way; a leftover file is only wasted space
+                    logger.exception("Releasing files of deleted media %s failed", media_id)
+            return media
+    
+    try:
+        deleted = [m for m in await asyncio.gather(*(delete(media_id) for media_id in ids)) if m]
+    finally:
+        # Leave nothing claimed behind if a delete failed part way
+        await db.media.update_many({"deleting": claim}, {"$unset": {"deleting": "", "deleting_at": ""}})
+    if deleted:
+        removed = Counter(m["category"] for m in deleted)
+        await category_counts.apply({name: -count for name, count in removed.items()})
+        catalog_cache.invalidate()
+    
+    deleted_ids = {m["id"] for m in deleted}
+    busy = set()
+    if len(deleted_ids) < len(ids):
+        busy = {
+            m["id"] for m in await db.media.find(
+                {"id": {"$in": [i for i in ids if i not in deleted_ids]}}, {"_id": 0, "id": 1}
+            ).to_list(len(ids))
+        }
+    return {"results": [
+        {
+            "id": media_id,
+            "status": "deleted" if media_id in deleted_ids else "in_progress" if media_id in busy else "not_found"
+        }
+        for media_id in ids
+    ]}
 
 @api_router.put("/media/{media_id}", response_model=MediaResponse)
 async def update_media(media_id: str, data: MediaUpdate, authorization: str = Header(None)):
@@ -282,10 +1382,22 @@ async def update_media(media_id: str, data: MediaUpdate, authorization: str = He
     update_data = {k: v for k, v in data.model_dump().items() if v is not None}
     if not update_data:
         raise HTTPException(status_code=400, detail="No update data provided")
+    if "title" in update_data:
+        update_data["title_terms"] = title_terms(update_data["title"])
     
-    result = await db.media.update_one({"id": media_id}, {"$set": update_data})
-    if result.matched_count == 0:
+    previous = await db.media.find_one_and_update(
+        {"id": media_id},
+        {"$set": {**update_data, "updated_at": datetime.now(timezone.utc).isoformat()}},
+        {"_id": 0, "category": 1}
+    )
+    if previous is None:
         raise HTTPException(status_code=404, detail="Media not found")
+    if "category" in update_data:
+        await category_counts.move(previous.get("category"), update_data["category"])
+    if "order" in update_data:
+        # Keep new uploads after anything moved to the end by hand
+        await media_order.ensure_at_least(update_data["order"])
+    catalog_cache.invalidate()
     
     media = await db.media.find_one({"id": media_id}, {"_id": 0})
     return MediaResponse(**media)
@@ -294,40 +1406,54 @@ async def update_media(media_id: str, data: MediaUpdate, authorization: str = He
 async def delete_media(media_id: str, authorization: str = Header(None)):
     await get_current_admin(authorization)
     
-    media = await db.media.find_one({"id": media_id}, {"_id": 0})
+    media = await db.media.find_one_and_delete({"id": media_id, **unclaimed_media_filter()}, {"_id": 0})
     if not media:
+        if await db.media.find_one({"id": media_id}, {"_id": 1}):
+            raise HTTPException(status_code=409, detail="Media is already being deleted")
         raise HTTPException(status_code=404, detail="Media not found")
     
-    # Delete file
-    file_path = UPLOADS_DIR / media["filename"]
-    if file_path.exists():
-        file_path.unlink()
-    
-    await db.media.delete_one({"id": media_id})
+    await category_counts.apply({media["category"]: -1})
+    catalog_cache.invalidate()
+    await release_media_files(media)
     return {"message": "Media deleted successfully"}
 
+def unclaimed_media_filter() -> dict:
+    """Media no delete is working on, counting abandoned claims as free."""
+    stale = (datetime.now(timezone.utc) - timedelta(seconds=MEDIA_DELETE_CLAIM_SECONDS)).isoformat()
+    return {"$or": [{"deleting": {"$exists": False}}, {"deleting_at": {"$lt": stale}}]}
+
+async def release_media_files(media: dict):
+    # Drop this document's reference; the blob goes away with the last one.
+    # Files uploaded before content addressing are not reference counted.
+    if Path(media["filename"]).stem == media.get("sha256"):
+        removed = await blob_store.release(media["sha256"])
+    else:
+        await asyncio.to_thread((UPLOADS_DIR / media["filename"]).unlink, missing_ok=True)
+        removed = True
+    if removed:
+        key = variants_key(media)
+        await asyncio.to_thread(shutil.rmtree, VARIANTS_DIR / key, ignore_errors=True)
+        await asyncio.to_thread(shutil.rmtree, HLS_DIR / key, ignore_errors=True)
+
 # ==================== CATEGORIES ====================
 
 @api_router.get("/categories", response_model=List[CategoryResponse])
-async def get_categories():
-    pipeline = [
-        {"$group": {"_id": "$category", "count": {"$sum": 1}}},
-        {"$sort": {"_id": 1}}
-    ]
-    categories = await db.media.aggregate(pipeline).to_list(100)
-    return [
-        CategoryResponse(id=str(uuid.uuid4()), name=c["_id"], count=c["count"])
-        for c in categories
-    ]
+async def get_categories(request: Request):
+    async def load():
+        categories = await category_counts.list(catalog_db().categories)
+        return category_list_adapter.dump_python(category_list_adapter.validate_python(categories)), {}
+    return await serve_cached(request, ("categories",), load)
 
 # ==================== SETTINGS ====================
 
 @api_router.get("/settings", response_model=SiteSettings)
-async def get_settings():
-    settings = await db.settings.find_one({"type": "site"}, {"_id": 0})
-    if not settings:
-        return SiteSettings()
-    return SiteSettings(**settings)
+async def get_settings(request: Request):
+    async def load():
+        settings = await catalog_db().settings.find_one({"type": "site"}, {"_id": 0})
+        if not settings:
+            return SiteSettings().model_dump(), {}
+        return SiteSettings(**settings).model_dump(), {}
+    return await serve_cached(request, ("settings",), load)
 
 @api_router.put("/settings", response_model=SiteSettings)
 async def update_settings(data: SiteSettings, authorization: str = Header(None)):
@@ -335,39 +1461,299 @@ async def update_settings(data: SiteSettings, authorization: str = Header(None))
     
     settings_doc = data.model_dump()
     settings_doc["type"] = "site"
+    settings_doc["updated_at"] = datetime.now(timezone.utc).isoformat()
     
     await db.settings.update_one(
         {"type": "site"},
         {"$set": settings_doc},
         upsert=True
     )
+    catalog_cache.invalidate()
     return data
 
 # ==================== CONTACT ====================
 
+# Set once the misconfigured-proxy warning below has been logged
+proxy_warning_logged = False
+
+def warn_untrusted_forwarding(forwarded_for: Optional[str]) -> None:
+    """Log once when requests carry X-Forwarded-For but TRUSTED_PROXY_COUNT is 0.
+
+    Behind a proxy that usually means the setting was missed, and every
+    visitor then shares the proxy's rate limit bucket.
+    """
+    global proxy_warning_logged
+    if forwarded_for and TRUSTED_PROXY_COUNT == 0 and not proxy_warning_logged:
+        proxy_warning_logged = True
+        logger.warning(
+            "Requests carry X-Forwarded-For but TRUSTED_PROXY_COUNT is 0; the contact rate limit "
+            "keys on the proxy's address. Set TRUSTED_PROXY_COUNT to the number of proxies in front of the API."
+        )
+
 @api_router.post("/contact")
-async def send_contact_message(data: ContactMessage):
+async def send_contact_message(data: ContactMessage, request: Request):
+    forwarded_for = request.headers.get("x-forwarded-for")
+    warn_untrusted_forwarding(forwarded_for)
+    client_ip = client_address(
+        request.client.host if request.client else None,
+        forwarded_for,
+        TRUSTED_PROXY_COUNT
+    )
+    wait = contact_rate_limiter.acquire(client_ip)
+    if wait:
+        contact_submissions.inc(outcome="rate_limited")
+        raise HTTPException(
+            status_code=429, detail="Too many messages", headers={"Retry-After": str(math.ceil(wait))}
+        )
     message_doc = {
         "id": str(uuid.uuid4()),
         "name": data.name,
         "email": data.email,
         "subject": data.subject,
         "message": data.message,
+        "content_hash": message_hash(data.email, data.subject, data.message, CONTACT_DEDUP_SECONDS),
         "read": False,
         "created_at": datetime.now(timezone.utc).isoformat()
     }
-    await db.contact_messages.insert_one(message_doc)
+    try:
+        accepted = contact_buffer.add(message_doc)
+    except BufferFull:
+        contact_submissions.inc(outcome="rejected")
+        raise HTTPException(status_code=503, detail="Please try again later", headers={"Retry-After": "30"})
+    # Repeats get the same answer so resubmitting reveals nothing
+    contact_submissions.inc(outcome="accepted" if accepted else "duplicate")
     return {"message": "Message sent successfully"}
 
+def encode_message_cursor(doc: dict) -> str:
+    raw = json.dumps([doc["created_at"], doc["id"]], separators=(",", ":")).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip("=")
+
+def decode_message_cursor(cursor: str) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, message_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(created_at, str) or not isinstance(message_id, str):
+            raise ValueError
+        return created_at, message_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @api_router.get("/contact/messages")
-async def get_contact_messages(authorization: str = Header(None)):
+async def get_contact_messages(
+    authorization: str = Header(None),
+    read: Optional[bool] = None,
+    limit: int = Query(CONTACT_PAGE_DEFAULT, ge=1, le=CONTACT_PAGE_MAX),
+    after: Optional[str] = None
+):
+    """Newest first. Follow ``X-Next-Cursor`` with ``after`` for older pages."""
     await get_current_admin(authorization)
     
-    messages = await db.contact_messages.find({}, {"_id": 0}).sort("created_at", -1).to_list(100)
-    return messages
+    query = {}
+    if read is not None:
+        query["read"] = read
+    if after:
+        # Keyset pagination over the (created_at, id) sort key, descending
+        last_created_at, last_id = decode_message_cursor(after)
+        query["$or"] = [
+            {"created_at": {"$lt": last_created_at}},
+            {"created_at": last_created_at, "id": {"$lt": last_id}}
+        ]
+    messages = await db.contact_messages.find(
+        query, {"_id": 0, "content_hash": 0}
+    ).sort([("created_at", -1), ("id", -1)]).limit(limit + 1).to_list(limit + 1)
+    
+    headers = {}
+    if len(messages) > limit:
+        messages = messages[:limit]
+        headers["X-Next-Cursor"] = encode_message_cursor(messages[-1])
+    return json_response(messages, headers)
+
+@api_router.post("/contact/messages/read")
+async def mark_contact_messages(data: ContactMessageIds, authorization: str = Header(None)):
+    """Mark messages read (or unread with ``"read": false``) in one update."""
+    await get_current_admin(authorization)
+    if len(data.ids) > CONTACT_PAGE_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {CONTACT_PAGE_MAX} ids per request")
+    
+    result = await db.contact_messages.update_many(
+        {"id": {"$in": data.ids}},
+        {"$set": {"read": data.read, "updated_at": datetime.now(timezone.utc).isoformat()}}
+    )
+    return {"matched": result.matched_count, "modified": result.modified_count}
+
+# ==================== ADMIN EVENTS ====================
+
+@api_router.post("/admin/events/ticket")
+async def create_admin_events_ticket(authorization: str = Header(None)):
+    """Short-lived ticket for opening ``/admin/events`` from ``EventSource``.
+
+    It only opens the event stream (access token checks reject its
+    audience), and the stream it opens still ends with the access token.
+    """
+    await get_current_admin(authorization)
+    payload = decode_access_token(authorization)
+    now = datetime.now(timezone.utc)
+    ticket = jwt.encode({
+        "sub": payload["sub"],
+        "aud": ADMIN_EVENTS_TICKET_AUDIENCE,
+        "jti": payload.get("jti"),
+        "token_exp": payload["exp"],
+        "iat": now,
+        "exp": now + timedelta(seconds=ADMIN_EVENTS_TICKET_SECONDS)
+    }, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    return {"ticket": ticket, "expires_in": ADMIN_EVENTS_TICKET_SECONDS}
+
+async def admin_for_events_ticket(ticket: str) -> dict:
+    """Validate a stream ticket; returns the claims of the access token it was issued for."""
+    try:
+        claims = jwt.decode(ticket, JWT_SECRET, algorithms=[JWT_ALGORITHM], audience=ADMIN_EVENTS_TICKET_AUDIENCE)
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Ticket expired")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid ticket")
+    jti = claims.get("jti")
+    if jti and jti in revoked_tokens:
+        raise HTTPException(status_code=401, detail="Token revoked")
+    if not await db.admins.find_one({"id": claims.get("sub")}, {"_id": 1}):
+        raise HTTPException(status_code=401, detail="Admin not found")
+    return {"sub": claims["sub"], "jti": jti, "exp": claims.get("token_exp")}
+
+@api_router.get("/admin/events")
+async def stream_admin_events(
+    authorization: str = Header(None),
+    ticket: Optional[str] = None,
+    resume: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None)
+):
+    """Server-Sent Events feed of media, contact message and settings changes.
+
+    Clients that can set headers authenticate as usual; ``EventSource``
+    passes a ticket from ``POST /admin/events/ticket`` instead. Reconnecting
+    clients send ``Last-Event-ID`` (or ``resume``, when they open a new
+    ``EventSource`` with a fresh ticket) and get the events they missed, or
+    a ``reset`` when those are no longer available. The stream ends when
+    the access token expires or is revoked.
+    """
+    if authorization or not ticket:
+        await get_current_admin(authorization)
+        payload = decode_access_token(authorization)
+    else:
+        payload = await admin_for_events_ticket(ticket)
+    last_event_id = last_event_id or resume
+    
+    async def stream():
+        yield "retry: 3000\n\n"
+        async for event_id, event in admin_events.subscribe(last_event_id):
+            if event is None:
+                # Heartbeat: drop clients whose token is no longer good
+                jti = payload.get("jti")
+                if (payload.get("exp") or float("inf")) <= time.time() or (jti and jti in revoked_tokens):
+                    return
+            yield sse_message(event_id, event)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        # Proxies must pass events through as they are written
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# ==================== DIAGNOSTICS ====================
+
+@api_router.get("/admin/mongo-pool")
+async def get_mongo_pool_metrics(authorization: str = Header(None)):
+    """Connection pool gauges and checkout wait times per Mongo server."""
+    await get_current_admin(authorization)
+    return mongo_pool_metrics.snapshot()
+
+@api_router.get("/metrics")
+async def get_metrics(authorization: str = Header(None)):
+    """Prometheus text exposition of this process's metrics."""
+    if METRICS_TOKEN and authorization != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return Response(content=metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+@metrics.collector
+def collect_cache_metrics():
+    caches = {"catalog": catalog_cache, "derived_images": derived_cache}
+    for kind in ("hits", "misses"):
+        yield (f"cache_{kind}_total", "counter", f"Cache {kind} by cache.",
+               [(f"cache_{kind}_total", {"cache": name}, getattr(cache, kind)) for name, cache in caches.items()])
+    yield ("cache_hit_ratio", "gauge", "Hits over lookups since startup.", [
+        ("cache_hit_ratio", {"cache": name}, cache.hits / max(cache.hits + cache.misses, 1))
+        for name, cache in caches.items()
+    ])
+
+@metrics.collector
+def collect_mongo_pool_metrics():
+    pools = mongo_pool_metrics.snapshot()
+    yield ("mongo_pool_connections_open", "gauge", "Open pooled connections.",
+           [("mongo_pool_connections_open", {"address": a}, p["open"]) for a, p in pools.items()])
+    yield ("mongo_pool_connections_in_use", "gauge", "Connections checked out of the pool.",
+           [("mongo_pool_connections_in_use", {"address": a}, p["in_use"]) for a, p in pools.items()])
+    yield ("mongo_pool_checkout_failures_total", "counter", "Failed pool checkouts by reason.", [
+        ("mongo_pool_checkout_failures_total", {"address": a, "reason": reason}, count)
+        for a, p in pools.items() for reason, count in p["checkout_failures"].items()
+    ])
+    wait_samples = []
+    for a, p in pools.items():
+        for bound, count in p["wait_seconds_buckets"].items():
+            wait_samples.append(("mongo_pool_checkout_wait_seconds_bucket", {"address": a, "le": bound}, count))
+        wait_samples.append(("mongo_pool_checkout_wait_seconds_count", {"address": a}, p["wait_seconds_buckets"]["+Inf"]))
+        wait_samples.append(("mongo_pool_checkout_wait_seconds_sum", {"address": a}, p["wait_seconds_sum"]))
+    yield ("mongo_pool_checkout_wait_seconds", "histogram", "Time spent waiting for a pooled connection.", wait_samples)
 
 # ==================== STATIC FILES ====================
 
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+@api_router.get("/uploads/{filename}")
+async def get_upload(
+    filename: str,
+    request: Request,
+    w: Optional[int] = Query(None, ge=1, le=RESIZE_MAX_DIMENSION),
+    h: Optional[int] = Query(None, ge=1, le=RESIZE_MAX_DIMENSION),
+    fmt: Optional[str] = None,
+    q: int = Query(80, ge=1, le=100)
+):
+    if filename.startswith("."):
+        raise HTTPException(status_code=404, detail="File not found")
+    source = UPLOADS_DIR / filename
+    
+    if w is None and h is None and fmt is None:
+        return await file_response(request, source, IMMUTABLE_CACHE_CONTROL)
+    if not source.is_file():
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    source_format = SOURCE_FORMATS.get(source.suffix.lower())
+    if source_format is None:
+        raise HTTPException(status_code=400, detail="Only images can be resized")
+    # Sources in a format this build cannot write default to JPEG
+    fmt = fmt or (source_format if source_format in RESIZE_FORMATS else "jpeg")
+    if fmt not in RESIZE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format, use one of: {', '.join(RESIZE_FORMATS)}")
+    
+    spec = ResizeSpec(
+        width=snap_up(w, RESIZE_DIMENSIONS), height=snap_up(h, RESIZE_DIMENSIONS),
+        fmt=fmt, quality=snap_up(q, RESIZE_QUALITIES)
+    )
+    try:
+        with span("resize"):
+            derived = await derived_cache.get(source, spec)
+    except ResizeUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ResizeBusy:
+        raise HTTPException(status_code=503, detail="Too many resizes in progress", headers={"Retry-After": "1"})
+    except UndecodableImage:
+        raise HTTPException(status_code=415, detail="Source is not a decodable image")
+    # Upload names are content addressed, so a given URL never changes. The
+    # cache file name already hashes the source and parameters; its mtime
+    # moves on every hit, so it cannot feed the ETag.
+    return await file_response(
+        request, derived, IMMUTABLE_CACHE_CONTROL, media_type=f"image/{fmt}",
+        precompressed=False, etag=f'"{derived.stem}"'
+    )
+
 @api_router.get("/")
 async def root():
     return {"message": "FINDELMUNNDO API", "version": "1.0"}
@@ -375,8 +1761,43 @@ async def root():
 # Include the router in the main app
 app.include_router(api_router)
 
-# Mount uploads directory for serving files
-app.mount("/api/uploads", StaticFiles(directory=str(UPLOADS_DIR)), name="uploads")
+# Mount uploads directory for serving files; names never change, so cache forever
+app.mount("/api/uploads", MediaFiles(UPLOADS_DIR, IMMUTABLE_CACHE_CONTROL), name="uploads")
+
+# Large frontend assets (intro video, backgrounds) with range support and revalidation
+if PUBLIC_ASSETS_DIR.is_dir():
+    app.mount("/api/assets", MediaFiles(PUBLIC_ASSETS_DIR, PUBLIC_ASSETS_CACHE_CONTROL), name="assets")
+
+# Innermost, so it shares the endpoint's task: spans see its trace and the
+# profiler can tell this request's samples from others on the event loop.
+# Requests over SLOW_REQUEST_MS are logged with a per-stage breakdown; send
+# "X-Profile: <PROFILE_TOKEN>" or set PROFILE_SAMPLE_RATE to profile.
+app.add_middleware(
+    TracingMiddleware,
+    slow_ms=float(os.environ.get('SLOW_REQUEST_MS', '1000')),
+    sample_rate=float(os.environ.get('PROFILE_SAMPLE_RATE', '0')),
+    token=os.environ.get('PROFILE_TOKEN'),
+    profiler=SamplingProfiler(interval=float(os.environ.get('PROFILE_INTERVAL_MS', '5')) / 1000)
+)
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    # Refuse uploads that cannot fit any limit before the body is spooled
+    if request.method == "POST" and request.url.path == "/api/media/upload":
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES:
+            return JSONResponse(status_code=413, content={"detail": "File too large"})
+    elif request.method == "POST" and request.url.path == "/api/media/upload/batch":
+        # The whole form is spooled before the handler runs, so the total is
+        # only bounded if the client declares it and the server holds it to that
+        content_length = request.headers.get("content-length")
+        if not content_length or not content_length.isdigit():
+            return JSONResponse(status_code=411, content={"detail": "Content-Length required"})
+        if int(content_length) > MEDIA_BATCH_MAX_BYTES:
+            return JSONResponse(
+                status_code=413, content={"detail": f"Batch too large (max {MEDIA_BATCH_MAX_BYTES} bytes)"}
+            )
+    return await call_next(request)
 
 app.add_middleware(
     CORSMiddleware,
@@ -384,6 +1805,23 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Cache", "ETag", "Upload-Offset", "Upload-Length", "Content-Range", "Accept-Ranges"],
+)
+
+# Catalog responses arrive already encoded and pass through untouched
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=COMPRESSION_MIN_SIZE,
+    gzip_level=GZIP_LEVEL,
+    brotli_quality=BROTLI_QUALITY
+)
+
+# Outermost, so it times and counts everything including CORS preflights
+app.add_middleware(
+    MetricsMiddleware,
+    requests=http_requests,
+    latency=http_latency,
+    response_bytes=http_response_bytes
 )
 
 # Configure logging
@@ -393,6 +1831,66 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+async def seed_media_order():
+    """Seed the order counter for databases that predate it."""
+    last = await db.media.find_one({}, {"_id": 0, "order": 1}, sort=[("order", -1)])
+    await media_order.ensure_at_least(last.get("order", 0) if last else 0)
+
+async def seed_category_counts():
+    """Build category counts for databases that predate them."""
+    if await db.categories.estimated_document_count() == 0:
+        await category_counts.reconcile(db.media)
+
+# One-off data migrations for databases that predate a feature. Each is
+# idempotent and recorded in db.migrations once done, so later boots skip it.
+# They run in the background: the API comes up even while Mongo is down, and
+# a failed migration is retried every MIGRATION_RETRY_SECONDS.
+STARTUP_MIGRATIONS = (
+    ("media_order_counter", seed_media_order),
+    ("category_counts", seed_category_counts),
+    ("title_terms", backfill_title_terms),
+)
+MIGRATION_RETRY_SECONDS = int(os.environ.get('MIGRATION_RETRY_SECONDS', '30'))
+
+async def run_startup_migrations():
+    pending = list(STARTUP_MIGRATIONS)
+    while pending:
+        for name, migrate in list(pending):
+            try:
+                if not await db.migrations.find_one({"_id": name}):
+                    await migrate()
+                    await db.migrations.update_one(
+                        {"_id": name},
+                        {"$set": {"completed_at": datetime.now(timezone.utc).isoformat()}},
+                        upsert=True
+                    )
+                pending.remove((name, migrate))
+            except Exception:
+                logger.exception("Migration %s failed, retrying in %ds", name, MIGRATION_RETRY_SECONDS)
+        if pending:
+            await asyncio.sleep(MIGRATION_RETRY_SECONDS)
+
+@app.on_event("startup")
+async def start_background_tasks():
+    try:
+        await ensure_indexes(db)
+    except Exception:
+        logger.exception("Index provisioning failed")
+    app.state.migrations = asyncio.create_task(run_startup_migrations())
+    app.state.upload_sweeper = asyncio.create_task(run_upload_session_sweeper())
+    app.state.revocation_refresher = asyncio.create_task(run_revocation_refresher())
+    variant_worker.start()
+    stream_worker.start()
+    contact_buffer.start()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    app.state.migrations.cancel()
+    app.state.upload_sweeper.cancel()
+    app.state.revocation_refresher.cancel()
+    await variant_worker.stop()
+    await stream_worker.stop()
+    # Write buffered contact messages while the client is still open
+    await contact_buffer.stop()
+    password_hasher.shutdown()
     client.close()
@@ -0,0 +1,239 @@
+import asyncio
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# A delete claim older than this was left by a process that died mid-delete
+BLOB_DELETE_CLAIM_SECONDS = 60
+BLOB_PUT_RETRY_SECONDS = 0.05
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, limit: int):
+        super().__init__(f"Upload exceeds {limit} bytes")
+        self.limit = limit
+
+
+class ChunkInterrupted(Exception):
+    """The source stream failed mid-chunk; ``written`` bytes are durable."""
+
+    def __init__(self, written: int):
+        super().__init__(f"Chunk interrupted after {written} bytes")
+        self.written = written
+
+
+@dataclass
+class StagedFile:
+    """A fully received file waiting to be committed to the blob store."""
+    path: Path
+    size: int
+    sha256: str
+
+
+@dataclass
+class StoredFile:
+    filename: str
+    path: Path
+    size: int
+    sha256: str
+
+
+def _open_temp(directory: Path):
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{uuid.uuid4()}.part"
+    return path, open(path, "wb")
+
+
+def _discard(handle, temp_path: Path) -> None:
+    handle.close()
+    temp_path.unlink(missing_ok=True)
+
+
+def _flush_close(handle) -> None:
+    handle.flush()
+    os.fsync(handle.fileno())
+    handle.close()
+
+
+async def stream_upload(source, temp_dir: Path, max_bytes: Optional[int] = None,
+                        chunk_size: int = UPLOAD_CHUNK_SIZE) -> StagedFile:
+    """Copy an ``UploadFile`` into ``temp_dir`` chunk by chunk.
+
+    Disk writes run in the default thread pool so the event loop keeps serving
+    other requests, and the SHA-256 is computed on the fly. Raises
+    ``UploadTooLarge`` as soon as ``max_bytes`` is exceeded.
+    """
+    temp_path, handle = await asyncio.to_thread(_open_temp, temp_dir)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        while True:
+            chunk = await source.read(chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if max_bytes is not None and size > max_bytes:
+                raise UploadTooLarge(max_bytes)
+            digest.update(chunk)
+            await asyncio.to_thread(handle.write, chunk)
+        await asyncio.to_thread(_flush_close, handle)
+    except BaseException:
+        await asyncio.to_thread(_discard, handle, temp_path)
+        raise
+    return StagedFile(path=temp_path, size=size, sha256=digest.hexdigest())
+
+
+def _open_at(path: Path, offset: int):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handle = open(path, "r+b" if path.exists() else "w+b")
+    # Drop anything past the acknowledged offset, e.g. a torn previous chunk
+    handle.truncate(offset)
+    handle.seek(offset)
+    return handle
+
+
+async def write_chunk(stream, path: Path, offset: int, max_bytes: int) -> int:
+    """Write an async byte stream into ``path`` starting at ``offset``.
+
+    Returns the number of bytes written. If the stream breaks off, the bytes
+    received so far are flushed and reported through ``ChunkInterrupted`` so
+    the caller can acknowledge them and the client can resume from there.
+
+    Anything past ``offset`` is truncated first, so the caller must hold an
+    exclusive claim on ``path`` for the whole write.
+    """
+    handle = await asyncio.to_thread(_open_at, path, offset)
+    written = 0
+    try:
+        try:
+            async for chunk in stream:
+                if not chunk:
+                    continue
+                if written + len(chunk) > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                await asyncio.to_thread(handle.write, chunk)
+                written += len(chunk)
+        except UploadTooLarge:
+            raise
+        except Exception:
+            raise ChunkInterrupted(written)
+    finally:
+        await asyncio.to_thread(_flush_close, handle)
+    return written
+
+
+def _hash_file(path: Path, chunk_size: int) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def hash_file(path: Path, chunk_size: int = UPLOAD_CHUNK_SIZE) -> str:
+    return await asyncio.to_thread(_hash_file, path, chunk_size)
+
+
+async def stage_file(path: Path) -> StagedFile:
+    """Hash a file that was received out of band, e.g. a resumable upload."""
+    sha256 = await hash_file(path)
+    size = (await asyncio.to_thread(path.stat)).st_size
+    return StagedFile(path=path, size=size, sha256=sha256)
+
+
+def _place_blob(source: Path, final_path: Path) -> None:
+    if final_path.exists():
+        source.unlink(missing_ok=True)
+    else:
+        os.replace(source, final_path)
+
+
+class BlobStore:
+    """Content-addressed storage for uploaded media.
+
+    Files are named after their SHA-256, so identical uploads share one file.
+    The ``blobs`` collection keeps a reference count per hash; a file is only
+    removed when the last media document pointing at it is deleted.
+
+    Coordination happens in Mongo, so several API processes can share one
+    upload directory. Before unlinking, ``release`` marks the blob document
+    ``deleting``; ``put`` never takes a reference on such a document and
+    waits for the delete to finish instead, then creates the blob afresh.
+    This relies on the unique ``sha256`` index on the collection.
+    """
+
+    def __init__(self, root: Path, collection):
+        self.root = root
+        self.collection = collection
+
+    async def put(self, staged: StagedFile, suffix: str) -> StoredFile:
+        """Take a reference on the blob for ``staged``, creating it if needed.
+
+        ``staged.path`` is consumed: it is either moved into place or removed
+        when an identical blob already exists.
+        """
+        while True:
+            try:
+                blob = await self.collection.find_one_and_update(
+                    {"sha256": staged.sha256, "deleting_since": {"$exists": False}},
+                    {
+                        "$inc": {"refcount": 1},
+                        "$setOnInsert": {
+                            "sha256": staged.sha256,
+                            "filename": f"{staged.sha256}{suffix}",
+                            "size": staged.size,
+                            "created_at": datetime.now(timezone.utc).isoformat()
+                        }
+                    },
+                    projection={"_id": 0},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+                break
+            except DuplicateKeyError:
+                # Being deleted elsewhere, or created concurrently: look again
+                await self._clear_stale_claim(staged.sha256)
+                await asyncio.sleep(BLOB_PUT_RETRY_SECONDS)
+        final_path = self.root / blob["filename"]
+        await asyncio.to_thread(_place_blob, staged.path, final_path)
+        return StoredFile(filename=blob["filename"], path=final_path, size=staged.size, sha256=staged.sha256)
+
+    async def _clear_stale_claim(self, sha256: str) -> None:
+        stale = (datetime.now(timezone.utc) - timedelta(seconds=BLOB_DELETE_CLAIM_SECONDS)).isoformat()
+        await self.collection.delete_one({"sha256": sha256, "deleting_since": {"$lt": stale}})
+
+    async def release(self, sha256: str) -> Optional[bool]:
+        """Drop one reference. Returns True if the blob file was removed,
+        False if other references remain, None if the hash is not tracked or
+        has no references left to drop."""
+        blob = await self.collection.find_one_and_update(
+            # Never below zero, so a double release cannot free a shared blob
+            {"sha256": sha256, "refcount": {"$gt": 0}, "deleting_since": {"$exists": False}},
+            {"$inc": {"refcount": -1}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.BEFORE
+        )
+        if blob is None:
+            return None
+        if blob["refcount"] > 1:
+            return False
+        # Claim the delete; a put that got in first has raised the count again
+        claimed = await self.collection.update_one(
+            {"sha256": sha256, "refcount": {"$lte": 0}, "deleting_since": {"$exists": False}},
+            {"$set": {"deleting_since": datetime.now(timezone.utc).isoformat()}}
+        )
+        if claimed.modified_count == 0:
+            return False
+        try:
+            await asyncio.to_thread((self.root / blob["filename"]).unlink, missing_ok=True)
+        finally:
+            await self.collection.delete_one({"sha256": sha256, "deleting_since": {"$exists": True}})
+        return True
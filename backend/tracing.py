@@ -0,0 +1,220 @@
+"""Per-request stage timing, slow-request logs and an opt-in sampling profiler.
+
+Code marks stages with ``span("name")``; outside a traced request it costs a
+context-variable lookup. Everything stays in process and is written to the
+log, so no collector is needed.
+"""
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger("tracing")
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("trace", default=None)
+
+# Spans kept per trace; stage totals still include any beyond this
+MAX_SPANS = 200
+
+
+class Trace:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Tuple[str, float, float]] = []
+        self.stages: Dict[str, List[float]] = defaultdict(lambda: [0.0, 0])
+
+    def add(self, name: str, start: float, end: float) -> None:
+        if len(self.spans) < MAX_SPANS:
+            self.spans.append((name, start - self.started, end - start))
+        stage = self.stages[name]
+        stage[0] += end - start
+        stage[1] += 1
+
+    def breakdown(self) -> Dict[str, dict]:
+        """Milliseconds and call count per stage. Concurrent stages overlap,
+        so totals can exceed the request duration."""
+        return {
+            name: {"ms": round(total * 1000, 3), "count": count}
+            for name, (total, count) in sorted(self.stages.items(), key=lambda s: -s[1][0])
+        }
+
+
+@contextmanager
+def span(name: str):
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, start, time.perf_counter())
+
+
+class ProfileSession:
+    def __init__(self, frame):
+        self.frame = frame
+        self.samples = 0
+        self.self_counts: Counter = Counter()
+        self.total_counts: Counter = Counter()
+
+    def record(self, stack: List[str]) -> None:
+        self.samples += 1
+        if stack:
+            self.self_counts[stack[0]] += 1
+        # Recursion must not count a function more than once per sample
+        self.total_counts.update(set(stack))
+
+    def summary(self, interval: float, top: int = 15) -> dict:
+        return {
+            "samples": self.samples,
+            "interval_ms": interval * 1000,
+            "self": [{"function": f, "samples": n} for f, n in self.self_counts.most_common(top)],
+            "total": [{"function": f, "samples": n} for f, n in self.total_counts.most_common(top)],
+        }
+
+
+class SamplingProfiler:
+    """Samples the event loop thread's stack while any session is active.
+
+    A sample is attributed to a session only when the session's request frame
+    is on the stack, i.e. the loop was running that request at the time.
+    Work handed to thread pools (bcrypt, file copies, resizing) shows up in
+    the request's spans rather than in its samples.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self._sessions: List[ProfileSession] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._target: Optional[int] = None
+
+    def start(self, frame) -> ProfileSession:
+        session = ProfileSession(frame)
+        with self._lock:
+            self._target = threading.get_ident()
+            self._sessions.append(session)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+                self._thread.start()
+        return session
+
+    def stop(self, session: ProfileSession) -> None:
+        with self._lock:
+            self._sessions.remove(session)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                sessions = list(self._sessions)
+                if not sessions:
+                    self._thread = None
+                    return
+            frame = sys._current_frames().get(self._target)
+            frames, stack = [], []
+            while frame is not None:
+                frames.append(id(frame))
+                code = frame.f_code
+                stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}:{code.co_firstlineno}")
+                frame = frame.f_back
+            for session in sessions:
+                if id(session.frame) in frames:
+                    # Only the frames below the request's own entry point
+                    session.record(stack[:frames.index(id(session.frame))])
+
+
+class TracingMiddleware:
+    """ASGI middleware that traces each request.
+
+    Requests slower than ``slow_ms`` are logged as one JSON line with a
+    per-stage breakdown. A request is profiled when it sends ``header`` with
+    the value ``token`` (ignored when no token is configured) or is picked by
+    ``sample_rate``; profiled requests are always logged, and header-triggered
+    ones also get a ``Server-Timing`` response header. Event streams are long
+    by design and are never logged as slow.
+
+    Install it innermost so it runs in the endpoint's task.
+    """
+
+    def __init__(self, app, slow_ms: float = 1000, sample_rate: float = 0.0,
+                 header: str = "x-profile", token: Optional[str] = None,
+                 profiler: Optional[SamplingProfiler] = None):
+        self.app = app
+        self.slow_ms = slow_ms
+        self.sample_rate = sample_rate
+        self.header = header.lower().encode()
+        self.token = token.encode() if token else None
+        self.profiler = profiler or SamplingProfiler()
+
+    def _requested(self, scope) -> bool:
+        if self.token is None:
+            return False
+        return any(name == self.header and value == self.token for name, value in scope["headers"])
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace()
+        token = _current.set(trace)
+        requested = self._requested(scope)
+        session = None
+        if requested or (self.sample_rate and random.random() < self.sample_rate):
+            session = self.profiler.start(sys._getframe())
+        status = 500
+        streaming = False
+
+        async def send_wrapper(message):
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                streaming = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", [])
+                )
+                if requested:
+                    timing = ", ".join(
+                        f'{name.replace(" ", "_")};dur={stage["ms"]}'
+                        for name, stage in trace.breakdown().items()
+                    )
+                    elapsed = (time.perf_counter() - trace.started) * 1000
+                    timing = f"{timing}, total;dur={elapsed:.3f}" if timing else f"total;dur={elapsed:.3f}"
+                    message["headers"] = [*message.get("headers", []), (b"server-timing", timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            if session is not None:
+                self.profiler.stop(session)
+            duration_ms = (time.perf_counter() - trace.started) * 1000
+            if session is not None or (duration_ms >= self.slow_ms and not streaming):
+                self._log(scope, status, duration_ms, trace, session)
+
+    def _log(self, scope, status: int, duration_ms: float, trace: Trace,
+             session: Optional[ProfileSession]) -> None:
+        route = scope.get("route")
+        record = {
+            "event": "slow_request" if duration_ms >= self.slow_ms else "profiled_request",
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": getattr(route, "path", None),
+            "status": status,
+            "duration_ms": round(duration_ms, 3),
+            "stages": trace.breakdown(),
+            "spans": [[name, round(start * 1000, 3), round(length * 1000, 3)] for name, start, length in trace.spans],
+        }
+        if session is not None:
+            record["profile"] = session.summary(self.profiler.interval)
+        logger.warning(json.dumps(record))
@@ -0,0 +1,121 @@
+import json
+import os
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+from typing import Dict, Sequence
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # pragma: no cover - Pillow is listed in requirements.txt
+    Image = None
+
+from workers import JobSkipped
+
+VARIANT_WIDTHS = (320, 640, 1280, 1920)
+THUMBNAIL_WIDTH = 480
+VARIANT_QUALITY = {"webp": 80, "avif": 55, "jpeg": 82}
+MANIFEST_NAME = "manifest.json"
+
+
+class VariantsUnavailable(JobSkipped):
+    """The toolchain needed for this media type is not installed."""
+
+
+def variant_formats() -> Sequence[str]:
+    formats = ["webp", "jpeg"]
+    if Image is not None and features.check("avif"):
+        formats.insert(0, "avif")
+    return formats
+
+
+def _tmp_path(path: Path) -> Path:
+    # Unique per thread so two jobs for the same blob never share a temp file
+    return path.with_name(f".{path.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+
+
+def _save(image, path: Path, fmt: str) -> None:
+    tmp_path = _tmp_path(path)
+    options = {"quality": VARIANT_QUALITY[fmt]}
+    if fmt == "jpeg":
+        image = image.convert("RGB")
+        options.update(optimize=True, progressive=True)
+    image.save(tmp_path, format=fmt.upper(), **options)
+    os.replace(tmp_path, path)
+
+
+def _resize(image, width: int):
+    if image.width <= width:
+        return image
+    height = round(image.height * width / image.width)
+    return image.resize((width, height), Image.LANCZOS)
+
+
+def render_image_variants(source: Path, out_dir: Path, widths: Sequence[int] = VARIANT_WIDTHS) -> Dict:
+    """Write a thumbnail and responsive widths of ``source`` into ``out_dir``.
+
+    Returns a manifest of file names relative to ``out_dir``:
+    ``{"thumbnail": ..., "variants": {fmt: {width: name}}}``. Widths larger
+    than the original are skipped, but the original width is always kept.
+    """
+    if Image is None:
+        raise VariantsUnavailable("Pillow is not installed")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        targets = sorted({w for w in widths if w < image.width} | {min(image.width, max(widths))})
+
+        manifest = {"thumbnail": None, "variants": {}}
+        for fmt in variant_formats():
+            ext = "jpg" if fmt == "jpeg" else fmt
+            names = {}
+            for width in targets:
+                name = f"w{width}.{ext}"
+                _save(_resize(image, width), out_dir / name, fmt)
+                names[str(width)] = name
+            manifest["variants"][fmt] = names
+
+        thumbnail = ImageOps.fit(image, (THUMBNAIL_WIDTH, round(THUMBNAIL_WIDTH * 5 / 4)), Image.LANCZOS)
+        _save(thumbnail, out_dir / "thumb.webp", "webp")
+        manifest["thumbnail"] = "thumb.webp"
+    return manifest
+
+
+def render_video_poster(source: Path, out_dir: Path, offset_seconds: float = 1.0) -> Dict:
+    """Grab a poster frame with ffmpeg and derive image variants from it."""
+    ffmpeg = shutil.which(os.environ.get("FFMPEG_BINARY", "ffmpeg"))
+    if ffmpeg is None:
+        raise VariantsUnavailable("ffmpeg is not installed")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    poster = out_dir / "poster.jpg"
+    for seek in (offset_seconds, 0):
+        # Very short clips have no frame at the offset; retry from the start
+        subprocess.run(
+            [ffmpeg, "-y", "-loglevel", "error", "-ss", str(seek), "-i", str(source),
+             "-frames:v", "1", "-q:v", "3", str(poster)],
+            check=True, capture_output=True, timeout=120
+        )
+        if poster.exists() and poster.stat().st_size > 0:
+            break
+    manifest = render_image_variants(poster, out_dir)
+    manifest["poster"] = "poster.jpg"
+    return manifest
+
+
+def build_variants(source: Path, out_dir: Path, media_type: str) -> Dict:
+    """Render (or reuse) the variants for one blob. Safe to call repeatedly:
+    blobs are content addressed, so an existing manifest is still valid."""
+    manifest_path = out_dir / MANIFEST_NAME
+    if manifest_path.exists():
+        return json.loads(manifest_path.read_text())
+    if media_type == "video":
+        manifest = render_video_poster(source, out_dir)
+    else:
+        manifest = render_image_variants(source, out_dir)
+    tmp_path = _tmp_path(manifest_path)
+    tmp_path.write_text(json.dumps(manifest))
+    os.replace(tmp_path, manifest_path)
+    return manifest
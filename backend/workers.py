@@ -0,0 +1,92 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JobSkipped(Exception):
+    """The job cannot run in this environment (e.g. a missing binary); retrying will not help."""
+
+
+class JobWorker:
+    """Bounded background queue that runs media jobs off the request path.
+
+    ``process`` is an async callable taking a media id; it does the database
+    work and hands blocking work to ``run_blocking``, which uses a dedicated
+    thread pool so heavy jobs cannot starve the default executor.
+    ``on_failure`` is awaited with the media id and error once retries are
+    exhausted.
+    """
+
+    def __init__(self, name: str, process: Callable[[str], Awaitable[None]],
+                 on_failure: Callable[[str, Exception], Awaitable[None]],
+                 concurrency: int = 2, queue_size: int = 256, max_attempts: int = 3,
+                 retry_delay: float = 2.0):
+        self.name = name
+        self.process = process
+        self.on_failure = on_failure
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=queue_size)
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=name)
+        self._tasks = []
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, media_id: str) -> bool:
+        """Queue a job. Returns False when the queue is full; the media stays
+        pending and is picked up by the next backfill."""
+        try:
+            self.queue.put_nowait(media_id)
+            return True
+        except asyncio.QueueFull:
+            logger.warning("%s queue full, deferring %s", self.name, media_id)
+            return False
+
+    async def run_blocking(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def _run(self) -> None:
+        while True:
+            media_id = await self.queue.get()
+            try:
+                error = await self.run_with_retries(media_id)
+                if error is not None:
+                    await self.on_failure(media_id, error)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("%s job %s crashed", self.name, media_id)
+            finally:
+                self.queue.task_done()
+
+    async def run_with_retries(self, media_id: str) -> Optional[Exception]:
+        """Run one job, retrying transient failures with exponential backoff.
+        Returns the last error, or None on success."""
+        error = None
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await self.process(media_id)
+                return None
+            except JobSkipped as e:
+                return e
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = e
+                logger.warning("%s job %s failed (attempt %d/%d): %s",
+                               self.name, media_id, attempt, self.max_attempts, e)
+                if attempt < self.max_attempts:
+                    await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+        return error
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""Load benchmark for the FINDELMUNNDO API.
+
+Starts the backend in a child process on a local port, seeds it with media,
+drives concurrent load at the main endpoints and prints one JSON report with
+throughput and latency percentiles per scenario. Runs with the same options
+are comparable, so reports can be diffed to catch regressions.
+
+By default the child uses mongomock (``pip install mongomock-motor``) so no
+database is needed; pass ``--mongo-url`` to use a real mongod instead. The
+database named by ``--db-name`` is dropped before seeding.
+
+    python benchmarks/api.py --seed 5000 --concurrency 32 --duration 10
+    python benchmarks/api.py --scenario media_list --env CATALOG_CACHE_TTL_SECONDS=0
+"""
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+BACKEND_DIR = REPO_ROOT / "backend"
+
+ADMIN_EMAIL = "bench@findelmunndo.test"
+ADMIN_PASSWORD = "BenchPass123!"
+CATEGORIES = ["Portrait", "Architecture", "Abstract", "Experimental", "Video"]
+
+
+# ==================== SERVER PROCESS ====================
+
+async def seed_database(db, count: int):
+    await db.media.delete_many({})
+    batch = []
+    for i in range(count):
+        media_id = f"bench-{i:07d}"
+        batch.append({
+            "id": media_id,
+            "title": f"Benchmark item {i}",
+            "description": "Seeded by benchmarks/api.py",
+            "category": CATEGORIES[i % len(CATEGORIES)],
+            "media_type": "image",
+            "filename": f"{media_id}.jpg",
+            "size": 1024,
+            "sha256": None,
+            "file_url": f"/api/uploads/{media_id}.jpg",
+            "thumbnail_url": None,
+            "variants": None,
+            "variants_status": "done",
+            "stream_url": None,
+            "stream_status": None,
+            "featured": i % 10 == 0,
+            "order": i + 1,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        })
+        if len(batch) == 1000:
+            await db.media.insert_many(batch)
+            batch = []
+    if batch:
+        await db.media.insert_many(batch)
+
+
+def serve(args):
+    """Child process entry point: seed, then run uvicorn until terminated."""
+    sys.path.insert(0, str(BACKEND_DIR))
+    if not args.mongo_url:
+        import motor.motor_asyncio
+        from mongomock_motor import AsyncMongoMockClient
+        shared = AsyncMongoMockClient()
+        # server.py creates its client at import time
+        motor.motor_asyncio.AsyncIOMotorClient = lambda *a, **kw: shared
+        os.environ["MONGO_URL"] = "mongodb://mongomock"
+    else:
+        os.environ["MONGO_URL"] = args.mongo_url
+    os.environ["DB_NAME"] = args.db_name
+
+    import uvicorn
+    import server
+
+    async def main():
+        if args.mongo_url:
+            await server.client.drop_database(args.db_name)
+        await seed_database(server.db, args.seed)
+        config = uvicorn.Config(server.app, host="127.0.0.1", port=args.port, log_level="warning")
+        await uvicorn.Server(config).serve()
+
+    asyncio.run(main())
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args, port: int, workdir: Path) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "UPLOADS_DIR": str(workdir / "uploads"),
+        "DERIVED_CACHE_DIR": str(workdir / "derived_cache"),
+        # Production cost by default; lower it to look past bcrypt in auth_login
+        "BCRYPT_ROUNDS": str(args.bcrypt_rounds),
+    }
+    for pair in args.env:
+        key, _, value = pair.partition("=")
+        env[key] = value
+    command = [
+        sys.executable, __file__, "--serve", "--port", str(port), "--seed", str(args.seed),
+        "--db-name", args.db_name
+    ]
+    if args.mongo_url:
+        command += ["--mongo-url", args.mongo_url]
+    return subprocess.Popen(command, env=env, cwd=str(BACKEND_DIR))
+
+
+async def wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float = 120):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"Server exited with {process.returncode}")
+            try:
+                if (await client.get(f"{base_url}/api/")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("Server did not become ready")
+
+
+# ==================== LOAD ====================
+
+def sample_image() -> bytes:
+    try:
+        from PIL import Image
+    except ImportError:
+        # Still exercises the upload path; variant generation will fail
+        return os.urandom(32 * 1024)
+    buffer = io.BytesIO()
+    Image.new("RGB", (640, 480), (120, 40, 200)).save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+
+class Scenario:
+    def __init__(self, name: str, request):
+        self.name = name
+        self.request = request
+
+
+def build_scenarios(token: str, image: bytes, seeded: int):
+    auth = {"Authorization": f"Bearer {token}"}
+    counter = iter(range(10 ** 9))
+
+    def category():
+        return CATEGORIES[next(counter) % len(CATEGORIES)]
+
+    return [
+        Scenario("media_list", lambda c: c.get("/api/media")),
+        Scenario("media_list_category", lambda c: c.get("/api/media", params={"category": category()})),
+        Scenario("media_list_full_page", lambda c: c.get("/api/media", params={"limit": 500})),
+        Scenario("media_detail", lambda c: c.get(f"/api/media/bench-{next(counter) % max(seeded, 1):07d}")),
+        Scenario("categories", lambda c: c.get("/api/categories")),
+        Scenario("settings", lambda c: c.get("/api/settings")),
+        Scenario("auth_me", lambda c: c.get("/api/auth/me", headers=auth)),
+        Scenario("auth_login", lambda c: c.post(
+            "/api/auth/login", json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD})),
+        Scenario("upload", lambda c: c.post(
+            "/api/media/upload", headers=auth,
+            files={"file": (f"bench-{next(counter)}.jpg", image, "image/jpeg")},
+            data={"title": "Benchmark upload", "category": category(), "media_type": "image"})),
+    ]
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest rank
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+async def run_scenario(base_url: str, scenario: Scenario, concurrency: int, duration: float,
+                       warmup: float) -> dict:
+    latencies, statuses = [], Counter()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        measure_from = time.monotonic() + warmup
+        deadline = measure_from + duration
+
+        async def worker():
+            while True:
+                started = time.monotonic()
+                if started >= deadline:
+                    return
+                try:
+                    status = (await scenario.request(client)).status_code
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                finished = time.monotonic()
+                if started >= measure_from:
+                    latencies.append(finished - started)
+                    statuses[str(status)] += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    latencies.sort()
+    errors = sum(n for status, n in statuses.items() if not status.startswith(("2", "3")))
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": dict(statuses),
+        "throughput_rps": round(len(latencies) / duration, 2),
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+            "p50": round(percentile(latencies, 0.50) * 1000, 3),
+            "p95": round(percentile(latencies, 0.95) * 1000, 3),
+            "p99": round(percentile(latencies, 0.99) * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        },
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def benchmark(args) -> dict:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory(prefix="findelmunndo-bench-") as workdir:
+        process = start_server(args, port, Path(workdir))
+        try:
+            await wait_until_ready(base_url, process)
+            async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+                response = await client.post(
+                    "/api/auth/register", json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+                response.raise_for_status()
+                token = response.json()["access_token"]
+
+            scenarios = build_scenarios(token, sample_image(), args.seed)
+            selected = [s for s in scenarios if not args.scenario or s.name in args.scenario]
+            results = {}
+            for scenario in selected:
+                print(f"Running {scenario.name}...", file=sys.stderr)
+                results[scenario.name] = await run_scenario(
+                    base_url, scenario, args.concurrency, args.duration, args.warmup)
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    return {
+        "revision": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "database": "mongod" if args.mongo_url else "mongomock",
+        "seed": args.seed,
+        "concurrency": args.concurrency,
+        "duration_seconds": args.duration,
+        "env": args.env,
+        "scenarios": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=5000, help="Media documents to seed (default 5000)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent requests per scenario")
+    parser.add_argument("--duration", type=float, default=10, help="Measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=1, help="Unmeasured seconds before each scenario")
+    parser.add_argument("--scenario", action="append", help="Run only this scenario; repeatable")
+    parser.add_argument("--mongo-url", help="Use this mongod instead of mongomock")
+    parser.add_argument("--db-name", default="findelmunndo_bench")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra environment for the server process; repeatable")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    report = asyncio.run(benchmark(args))
+    rendered = json.dumps(report, indent=2)
+    print(rendered)
+    if args.output:
+        Path(args.output).write_text(rendered + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Micro-benchmark of the catalog serialization paths.
+
+Compares the original per-item path (``MediaResponse(**m).model_dump()`` then
+``json.dumps``) with the one the API now uses (one ``TypeAdapter`` pass over
+the list, then orjson) on synthetic Mongo documents, and prints JSON.
+
+    python benchmarks/serialization.py --items 500 --repeat 20
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "findelmunndo_bench")
+
+import server  # noqa: E402
+from server import MEDIA_RESPONSE_PROJECTION, MediaResponse, media_list_adapter, render_json  # noqa: E402
+
+
+def make_documents(count: int):
+    now = datetime.now(timezone.utc).isoformat()
+    docs = []
+    for i in range(count):
+        key = f"{i:064x}"
+        doc = {
+            "id": f"media-{i:07d}",
+            "title": f"Item {i}",
+            "description": "A fairly ordinary description of a photograph. " * 3,
+            "category": "Portrait",
+            "media_type": "image",
+            "filename": f"{key}.jpg",
+            "size": 4_000_000,
+            "sha256": key,
+            "file_url": f"/api/uploads/{key}.jpg",
+            "thumbnail_url": f"/api/uploads/variants/{key}/thumb.webp",
+            "variants": {
+                fmt: {str(w): f"/api/uploads/variants/{key}/{w}.{fmt}" for w in (320, 640, 1280, 1920)}
+                for fmt in ("avif", "webp", "jpeg")
+            },
+            "variants_status": "done",
+            "stream_url": None,
+            "stream_status": None,
+            "featured": i % 10 == 0,
+            "order": i,
+            "created_at": now,
+        }
+        docs.append(doc)
+    return docs
+
+
+def per_item(docs) -> bytes:
+    content = [MediaResponse(**m).model_dump() for m in docs]
+    return json.dumps(content, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def adapter(docs) -> bytes:
+    return render_json(media_list_adapter.dump_python(media_list_adapter.validate_python(docs)))
+
+
+def measure(func, docs, repeat: int) -> dict:
+    func(docs)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(docs)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {"min_ms": round(min(timings), 3), "median_ms": round(statistics.median(timings), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=500, help="Documents per page (default 500)")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    full = make_documents(args.items)
+    # What Mongo returns under the API's projection
+    projected = [{k: v for k, v in doc.items() if k in MEDIA_RESPONSE_PROJECTION} for doc in full]
+    # Both paths must produce the same document
+    assert json.loads(per_item(full)) == json.loads(adapter(projected))
+
+    results = {
+        "per_item_json": measure(per_item, full, args.repeat),
+        "adapter_orjson": measure(adapter, projected, args.repeat),
+    }
+    results["speedup"] = round(results["per_item_json"]["median_ms"] / results["adapter_orjson"]["median_ms"], 2)
+    print(json.dumps({
+        "items": args.items,
+        "repeat": args.repeat,
+        "orjson": server.orjson is not None,
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -66,6 +66,13 @@ function App() {
   };
 
   const logout = () => {
+    const token = localStorage.getItem("fdm_token");
+    if (token) {
+      // Revoke server-side too; the local session ends regardless
+      axios
+        .post(`${API}/auth/logout`, null, { headers: { Authorization: `Bearer ${token}` } })
+        .catch(() => {});
+    }
     localStorage.removeItem("fdm_token");
     localStorage.removeItem("fdm_admin");
     setAdmin(null);
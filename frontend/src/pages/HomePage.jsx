@@ -2,6 +2,7 @@ import { useState, useEffect } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
 import { ChevronDown } from 'lucide-react';
 import MinimalArrowButton from '../components/MinimalArrowButton';
+import { API } from '../App';
 
 const HomePage = () => {
   const [showIntro, setShowIntro] = useState(true);
@@ -42,7 +43,7 @@ const HomePage = () => {
               playsInline
               className="absolute inset-0 w-full h-full object-cover"
             >
-              <source src="/intro-video.mp4" type="video/mp4" />
+              <source src={`${API}/assets/intro-video.mp4`} type="video/mp4" />
             </video>
             <div className="absolute inset-0 bg-black/50 z-0" /> {/* Dark overlay over video */}
 
@@ -93,7 +94,10 @@ const HomePage = () => {
             data-testid="home-main-content"
           >
             {/* Hero Section */}
-            <section className="relative h-screen flex items-center justify-center hero-bg">
+            <section
+              className="relative h-screen flex items-center justify-center hero-bg"
+              style={{ backgroundImage: `url(${API}/assets/IMG_5715.jpg)` }}
+            >
               <div className="absolute inset-0 overlay-dark" />
               
               <div className="relative z-10 text-center px-8">
@@ -140,7 +144,10 @@ const HomePage = () => {
             </section>
 
             {/* Portfolio Section (Interactive Cartier-style Chapter) */}
-            <section className="relative h-screen flex items-end justify-start pb-24 md:pb-32 px-8 md:px-24 portfolio-bg">
+            <section
+              className="relative h-screen flex items-end justify-start pb-24 md:pb-32 px-8 md:px-24 portfolio-bg"
+              style={{ backgroundImage: `url(${API}/assets/portfolio-bg.jpg)` }}
+            >
               <div className="absolute inset-0 overlay-dark-bottom" />
               
               <div className="relative z-10 w-full flex flex-col items-start gap-12">
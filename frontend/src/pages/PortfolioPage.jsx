@@ -1,15 +1,36 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef, useCallback } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
 import { X, Play } from 'lucide-react';
 import axios from 'axios';
 import { API } from '../App';
 
+// Responsive widths generated by the backend, e.g. { webp: { 320: url, 640: url } }
+const buildSrcSet = (item) => {
+  const widths = item.variants?.webp;
+  if (!widths) return undefined;
+  return Object.entries(widths)
+    .map(([width, url]) => `${url} ${width}w`)
+    .join(', ');
+};
+
+// Adaptive HLS where the browser plays it natively (Safari, iOS), else the original file
+const supportsHls = typeof document !== 'undefined'
+  && document.createElement('video').canPlayType('application/vnd.apple.mpegurl') !== '';
+
+const videoSource = (item) => (supportsHls && item.stream_url ? item.stream_url : item.file_url);
+
 const PortfolioPage = () => {
   const [media, setMedia] = useState([]);
   const [categories, setCategories] = useState([]);
   const [selectedCategory, setSelectedCategory] = useState('all');
   const [selectedMedia, setSelectedMedia] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [usingPlaceholder, setUsingPlaceholder] = useState(false);
+  // Bumped on every category change so late pages of the old one are dropped
+  const requestRef = useRef(0);
+  const sentinelRef = useRef(null);
 
   // Placeholder images from design guidelines
   const placeholderMedia = [
@@ -64,21 +85,72 @@ const PortfolioPage = () => {
   ];
 
   useEffect(() => {
-    fetchMedia();
     fetchCategories();
   }, []);
 
-  const fetchMedia = async () => {
+  const fetchPage = (cursor) => {
+    const params = {};
+    if (selectedCategory !== 'all') params.category = selectedCategory;
+    if (cursor) params.after = cursor;
+    return axios.get(`${API}/media`, { params });
+  };
+
+  // First screen of the selected category; later pages load on scroll
+  useEffect(() => {
+    const request = ++requestRef.current;
+    setLoading(true);
+    setNextCursor(null);
+    fetchPage(null)
+      .then((response) => {
+        if (request !== requestRef.current) return;
+        // Placeholders stand in for an empty catalog, whichever category is picked
+        if (response.data.length === 0 && (selectedCategory === 'all' || usingPlaceholder)) {
+          setMedia(placeholderMedia);
+          setUsingPlaceholder(true);
+        } else {
+          setMedia(response.data);
+          setUsingPlaceholder(false);
+          setNextCursor(response.headers['x-next-cursor'] || null);
+        }
+      })
+      .catch((error) => {
+        if (request !== requestRef.current) return;
+        console.error('Error fetching media:', error);
+        setMedia(placeholderMedia);
+        setUsingPlaceholder(true);
+      })
+      .finally(() => {
+        if (request === requestRef.current) setLoading(false);
+      });
+  }, [selectedCategory]);
+
+  const loadMore = useCallback(async () => {
+    if (!nextCursor || loadingMore) return;
+    const request = requestRef.current;
+    setLoadingMore(true);
     try {
-      const response = await axios.get(`${API}/media`);
-      setMedia(response.data.length > 0 ? response.data : placeholderMedia);
+      const page = await fetchPage(nextCursor);
+      if (request !== requestRef.current) return;
+      setMedia(prev => [...prev, ...page.data]);
+      setNextCursor(page.headers['x-next-cursor'] || null);
     } catch (error) {
       console.error('Error fetching media:', error);
-      setMedia(placeholderMedia);
     } finally {
-      setLoading(false);
+      setLoadingMore(false);
     }
-  };
+  }, [nextCursor, loadingMore, selectedCategory]);
+
+  useEffect(() => {
+    const sentinel = sentinelRef.current;
+    if (!sentinel || !nextCursor || typeof IntersectionObserver === 'undefined') return undefined;
+    // Start fetching a little before the end of the grid comes into view
+    const observer = new IntersectionObserver(
+      (entries) => { if (entries[0].isIntersecting) loadMore(); },
+      { rootMargin: '600px' }
+    );
+    observer.observe(sentinel);
+    return () => observer.disconnect();
+  }, [nextCursor, loadMore]);
 
   const fetchCategories = async () => {
     try {
@@ -92,9 +164,10 @@ const PortfolioPage = () => {
     }
   };
 
-  const filteredMedia = selectedCategory === 'all' 
-    ? media 
-    : media.filter(m => m.category === selectedCategory);
+  // Real media arrives already filtered by the server
+  const filteredMedia = usingPlaceholder && selectedCategory !== 'all'
+    ? media.filter(m => m.category === selectedCategory)
+    : media;
 
   const allCategories = categories.length > 0 
     ? categories 
@@ -169,7 +242,7 @@ const PortfolioPage = () => {
                   initial={{ opacity: 0, scale: 0.9 }}
                   animate={{ opacity: 1, scale: 1 }}
                   exit={{ opacity: 0, scale: 0.9 }}
-                  transition={{ duration: 0.4, delay: index * 0.05 }}
+                  transition={{ duration: 0.4, delay: (index % 12) * 0.05 }}
                   className={`masonry-item grid-item cursor-pointer ${index % 3 === 1 ? 'md:mt-12' : ''}`}
                   onClick={() => setSelectedMedia(item)}
                   data-testid={`media-item-${item.id}`}
@@ -180,6 +253,8 @@ const PortfolioPage = () => {
                       <div className="relative w-full h-full">
                         <video
                           src={item.file_url}
+                          poster={item.thumbnail_url || undefined}
+                          preload="none"
                           className="w-full h-full object-cover"
                           muted
                           loop
@@ -195,7 +270,9 @@ const PortfolioPage = () => {
                       </div>
                     ) : (
                       <img
-                        src={item.file_url}
+                        src={item.thumbnail_url || item.file_url}
+                        srcSet={buildSrcSet(item)}
+                        sizes="(min-width: 768px) 33vw, 100vw"
                         alt={item.title}
                         className="w-full h-full object-cover"
                         loading="lazy"
@@ -212,6 +289,12 @@ const PortfolioPage = () => {
             </AnimatePresence>
           </motion.div>
         )}
+        <div ref={sentinelRef} aria-hidden="true" />
+        {loadingMore && (
+          <div className="flex justify-center py-12">
+            <div className="loading-line w-32"></div>
+          </div>
+        )}
       </section>
 
       {/* Media Modal */}
@@ -242,7 +325,8 @@ const PortfolioPage = () => {
 
               {selectedMedia.media_type === 'video' ? (
                 <video
-                  src={selectedMedia.file_url}
+                  src={videoSource(selectedMedia)}
+                  poster={selectedMedia.thumbnail_url || undefined}
                   className="max-w-full max-h-[80vh] object-contain"
                   controls
                   autoPlay
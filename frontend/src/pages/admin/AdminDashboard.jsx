@@ -1,4 +1,4 @@
-import { useState, useEffect, useCallback } from 'react';
+import { useState, useEffect, useCallback, useRef } from 'react';
 import { Routes, Route, Link, useLocation, useNavigate } from 'react-router-dom';
 import { motion } from 'framer-motion';
 import axios from 'axios';
@@ -41,6 +41,63 @@ import {
   X,
 } from 'lucide-react';
 
+// Subscribes to /api/admin/events while mounted. EventSource reconnects on
+// its own and resumes after the last event id it received.
+const useAdminEvents = (onEvent) => {
+  const handler = useRef(onEvent);
+  handler.current = onEvent;
+
+  useEffect(() => {
+    const token = localStorage.getItem('fdm_token');
+    if (!token || typeof EventSource === 'undefined') return undefined;
+    let source = null;
+    let retry = null;
+    let closed = false;
+    let lastEventId = null;
+
+    // The URL carries a short-lived ticket, never the access token itself
+    const connect = async () => {
+      try {
+        const { data } = await axios.post(`${API}/admin/events/ticket`, null, {
+          headers: { Authorization: `Bearer ${token}` },
+        });
+        if (closed) return;
+        const params = new URLSearchParams({ ticket: data.ticket });
+        if (lastEventId) params.set('resume', lastEventId);
+        source = new EventSource(`${API}/admin/events?${params}`);
+        source.onmessage = (e) => {
+          lastEventId = e.lastEventId || lastEventId;
+          handler.current(JSON.parse(e.data));
+        };
+        source.onerror = () => {
+          // The browser would retry with the same, soon expired, ticket
+          source.close();
+          if (!closed) retry = setTimeout(connect, 3000);
+        };
+      } catch (error) {
+        if (!closed && error.response?.status !== 401) retry = setTimeout(connect, 10000);
+      }
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retry);
+      if (source) source.close();
+    };
+  }, []);
+};
+
+// Applies an insert/update/delete event to a list of documents keyed by id
+const applyChange = (items, event, compare) => {
+  const rest = items.filter((item) => item.id !== event.id);
+  if (event.op === 'delete') return rest;
+  return [...rest, event.doc].sort(compare);
+};
+
+const byOrder = (a, b) => a.order - b.order || (a.id < b.id ? -1 : 1);
+const newestFirst = (a, b) => (a.created_at < b.created_at ? 1 : a.created_at > b.created_at ? -1 : 0);
+
 const AdminDashboard = () => {
   const { admin, logout } = useAuth();
   const location = useLocation();
@@ -140,16 +197,26 @@ const DashboardOverview = () => {
     fetchStats();
   }, []);
 
+  useAdminEvents((event) => {
+    if (event.op === 'reset') {
+      fetchStats();
+    } else if (event.collection === 'media' && event.op !== 'update') {
+      setStats((s) => ({ ...s, media: s.media + (event.op === 'insert' ? 1 : -1) }));
+    } else if (event.collection === 'contact_messages' && event.op === 'insert') {
+      setStats((s) => ({ ...s, messages: s.messages + 1 }));
+    }
+  });
+
   const fetchStats = async () => {
     try {
-      const [mediaRes, messagesRes] = await Promise.all([
-        axios.get(`${API}/media`),
+      const [categoriesRes, messagesRes] = await Promise.all([
+        axios.get(`${API}/categories`),
         axios.get(`${API}/contact/messages`, {
           headers: { Authorization: `Bearer ${localStorage.getItem('fdm_token')}` },
         }).catch(() => ({ data: [] })),
       ]);
       setStats({
-        media: mediaRes.data.length,
+        media: categoriesRes.data.reduce((total, cat) => total + cat.count, 0),
         messages: messagesRes.data.length,
       });
     } catch (error) {
@@ -233,8 +300,16 @@ const MediaManager = () => {
 
   const fetchMedia = useCallback(async () => {
     try {
-      const response = await axios.get(`${API}/media`);
-      setMedia(response.data);
+      const items = [];
+      let cursor = null;
+      do {
+        const response = await axios.get(`${API}/media`, {
+          params: cursor ? { after: cursor } : {},
+        });
+        items.push(...response.data);
+        cursor = response.headers['x-next-cursor'];
+      } while (cursor);
+      setMedia(items);
     } catch (error) {
       console.error('Error fetching media:', error);
     } finally {
@@ -246,6 +321,14 @@ const MediaManager = () => {
     fetchMedia();
   }, [fetchMedia]);
 
+  useAdminEvents((event) => {
+    if (event.op === 'reset' && (!event.collection || event.collection === 'media')) {
+      fetchMedia();
+    } else if (event.collection === 'media') {
+      setMedia((items) => applyChange(items, event, byOrder));
+    }
+  });
+
   const handleUpload = async (e) => {
     e.preventDefault();
     if (!file) {
@@ -262,7 +345,7 @@ const MediaManager = () => {
     formData.append('media_type', uploadData.media_type);
 
     try {
-      await axios.post(`${API}/media/upload`, formData, {
+      const response = await axios.post(`${API}/media/upload`, formData, {
         headers: {
           'Content-Type': 'multipart/form-data',
           Authorization: `Bearer ${localStorage.getItem('fdm_token')}`,
@@ -272,7 +355,7 @@ const MediaManager = () => {
       setIsUploadOpen(false);
       setUploadData({ title: '', description: '', category: 'Portrait', media_type: 'image' });
       setFile(null);
-      fetchMedia();
+      setMedia((items) => applyChange(items, { op: 'insert', id: response.data.id, doc: response.data }, byOrder));
     } catch (error) {
       console.error('Error uploading:', error);
       toast.error('Erreur lors de l\'upload');
@@ -289,7 +372,7 @@ const MediaManager = () => {
         headers: { Authorization: `Bearer ${localStorage.getItem('fdm_token')}` },
       });
       toast.success('Média supprimé');
-      fetchMedia();
+      setMedia((items) => items.filter((m) => m.id !== id));
     } catch (error) {
       console.error('Error deleting:', error);
       toast.error('Erreur lors de la suppression');
@@ -298,12 +381,12 @@ const MediaManager = () => {
 
   const toggleFeatured = async (item) => {
     try {
-      await axios.put(
+      const response = await axios.put(
         `${API}/media/${item.id}`,
         { featured: !item.featured },
         { headers: { Authorization: `Bearer ${localStorage.getItem('fdm_token')}` } }
       );
-      fetchMedia();
+      setMedia((items) => applyChange(items, { op: 'update', id: item.id, doc: response.data }, byOrder));
     } catch (error) {
       console.error('Error updating:', error);
     }
@@ -502,6 +585,14 @@ const MessagesManager = () => {
     fetchMessages();
   }, []);
 
+  useAdminEvents((event) => {
+    if (event.op === 'reset' && (!event.collection || event.collection === 'contact_messages')) {
+      fetchMessages();
+    } else if (event.collection === 'contact_messages') {
+      setMessages((items) => applyChange(items, event, newestFirst));
+    }
+  });
+
   const fetchMessages = async () => {
     try {
       const response = await axios.get(`${API}/contact/messages`, {
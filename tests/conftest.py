@@ -0,0 +1,70 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+# Read when the server module is imported; keep its directories out of the tree
+SCRATCH_DIR = Path(tempfile.mkdtemp(prefix="findelmundo-tests-"))
+atexit.register(shutil.rmtree, SCRATCH_DIR, ignore_errors=True)
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+os.environ.setdefault("UPLOADS_DIR", str(SCRATCH_DIR / "uploads"))
+os.environ.setdefault("DERIVED_CACHE_DIR", str(SCRATCH_DIR / "derived_cache"))
+
+
+@pytest.fixture
+def mongo_client():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    return mongomock_motor.AsyncMongoMockClient()
+
+
+@pytest.fixture
+def mongo(mongo_client):
+    return mongo_client["test_database"]
+
+
+@pytest.fixture
+def server(mongo_client, mongo, tmp_path, monkeypatch):
+    """The API module wired to an in-memory database and a scratch upload directory."""
+    import server
+    from auth_cache import PrincipalCache, RevocationList
+    from contact import MessageBuffer
+    from events import ChangeFeed
+    from passwords import PasswordHasher
+    from storage import BlobStore
+
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    monkeypatch.setattr(server, "client", mongo_client)
+    monkeypatch.setattr(server, "db", mongo)
+    monkeypatch.setattr(server, "public_db", mongo)
+    monkeypatch.setattr(server, "UPLOADS_DIR", uploads)
+    monkeypatch.setattr(server, "blob_store", BlobStore(uploads, mongo.blobs))
+    monkeypatch.setattr(server, "media_order", server.SequenceAllocator(mongo.counters, "media_order"))
+    monkeypatch.setattr(server, "category_counts", server.CategoryCounts(mongo.categories))
+    monkeypatch.setattr(server, "contact_buffer", MessageBuffer(mongo.contact_messages, flush_interval=0.05))
+    monkeypatch.setattr(server, "admin_events", ChangeFeed(mongo, mode="poll", poll_interval=0.05, heartbeat=0.05))
+    monkeypatch.setattr(server, "admin_principals", PrincipalCache())
+    monkeypatch.setattr(server, "revoked_tokens", RevocationList())
+    # The app shuts its hasher down on exit, so every client needs a new one
+    monkeypatch.setattr(server, "password_hasher", PasswordHasher(rounds=4))
+    monkeypatch.setattr(server, "contact_rate_limiter", server.RateLimiter(rate=1.0, burst=100))
+    server.catalog_cache.invalidate()
+    return server
+
+
+@pytest.fixture
+def api(server):
+    """A client for the API, signed in as an admin."""
+    from fastapi.testclient import TestClient
+
+    with TestClient(server.app, raise_server_exceptions=False) as client:
+        response = client.post("/api/auth/register", json={"email": "admin@example.com", "password": "secret"})
+        client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+        yield client
@@ -0,0 +1,96 @@
+import logging
+import time
+from asyncio import run
+from datetime import datetime, timedelta, timezone
+
+import jwt
+import pytest
+
+
+def ticket_for(api):
+    response = api.post("/api/admin/events/ticket")
+    assert response.status_code == 200
+    return response.json()["ticket"]
+
+
+def test_ticket_is_not_an_access_token(api):
+    ticket = ticket_for(api)
+
+    assert api.get("/api/auth/me", headers={"Authorization": f"Bearer {ticket}"}).status_code == 401
+
+
+def test_event_stream_needs_a_ticket_or_token(api):
+    token = api.headers.pop("Authorization").split(" ", 1)[1]
+
+    assert api.get("/api/admin/events", params={"access_token": token}).status_code == 401
+    assert api.get("/api/admin/events", params={"ticket": "not-a-ticket"}).status_code == 401
+    assert api.get("/api/admin/events", params={"ticket": token}).status_code == 401
+
+
+def test_ticket_is_refused_after_logout(api):
+    ticket = ticket_for(api)
+    api.post("/api/auth/logout")
+    del api.headers["Authorization"]
+
+    assert api.get("/api/admin/events", params={"ticket": ticket}).status_code == 401
+
+
+def test_ticket_stream_ends_with_the_access_token(api, server):
+    claims = jwt.decode(ticket_for(api), server.JWT_SECRET, algorithms=[server.JWT_ALGORITHM],
+                        audience=server.ADMIN_EVENTS_TICKET_AUDIENCE)
+    now = datetime.now(timezone.utc)
+    # Still a valid ticket, but for an access token that has since expired
+    ticket = jwt.encode({**claims, "token_exp": int(time.time()) - 1, "exp": now + timedelta(minutes=1)},
+                        server.JWT_SECRET, algorithm=server.JWT_ALGORITHM)
+    del api.headers["Authorization"]
+
+    response = api.get("/api/admin/events", params={"ticket": ticket})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text == "retry: 3000\n\n"
+
+
+def test_startup_migrations_run_once_and_retry_failures(server, monkeypatch):
+    calls = []
+
+    async def flaky():
+        calls.append("flaky")
+        if calls.count("flaky") == 1:
+            raise RuntimeError("not yet")
+
+    async def steady():
+        calls.append("steady")
+
+    monkeypatch.setattr(server, "STARTUP_MIGRATIONS", (("flaky", flaky), ("steady", steady)))
+    monkeypatch.setattr(server, "MIGRATION_RETRY_SECONDS", 0)
+    run(server.run_startup_migrations())
+    run(server.run_startup_migrations())
+
+    assert calls == ["flaky", "steady", "flaky"]
+    assert {doc["_id"] for doc in run(server.db.migrations.find().to_list(None))} == {"flaky", "steady"}
+
+
+def test_forwarded_for_without_trusted_proxies_warns_once(api, server, monkeypatch, caplog):
+    monkeypatch.setattr(server, "proxy_warning_logged", False)
+    message = {"name": "Ana", "email": "ana@example.com", "subject": "Hi", "message": "Hello"}
+
+    with caplog.at_level(logging.WARNING, logger="server"):
+        for text in ("Hello", "Hello again"):
+            response = api.post("/api/contact", json={**message, "message": text},
+                                headers={"X-Forwarded-For": "203.0.113.7"})
+            assert response.status_code == 200
+
+    assert sum("TRUSTED_PROXY_COUNT" in r.getMessage() for r in caplog.records) == 1
+
+
+@pytest.mark.parametrize("trusted, expected", [(0, "testclient"), (1, "203.0.113.7")])
+def test_contact_rate_limit_key(api, server, monkeypatch, trusted, expected):
+    keys = []
+    monkeypatch.setattr(server, "TRUSTED_PROXY_COUNT", trusted)
+    monkeypatch.setattr(server.contact_rate_limiter, "acquire", lambda key: keys.append(key) or 0)
+
+    api.post("/api/contact", json={"name": "Ana", "email": "ana@example.com", "subject": "Hi", "message": "Hello"},
+             headers={"X-Forwarded-For": "6.6.6.6, 203.0.113.7"})
+
+    assert keys == [expected]
@@ -0,0 +1,78 @@
+import time
+
+from auth_cache import PrincipalCache, RevocationList
+
+
+def test_revocation_expires_with_the_token():
+    revoked = RevocationList()
+    revoked.add("expired", time.time() - 1)
+    revoked.add("live", time.time() + 60)
+
+    assert "expired" not in revoked
+    assert "live" in revoked
+    assert "unknown" not in revoked
+
+
+def test_replace_swaps_in_the_snapshot():
+    revoked = RevocationList()
+    revoked.add("old", time.time() + 60)
+
+    revoked.replace([("other", time.time() + 60)], since=revoked.mark())
+
+    assert "old" not in revoked
+    assert "other" in revoked
+
+
+def test_replace_keeps_revocations_made_while_it_was_loading():
+    revoked = RevocationList()
+    mark = revoked.mark()
+    # Revoked locally after the snapshot query started, so possibly missing from it
+    revoked.add("logout", time.time() + 60)
+
+    revoked.replace([("other", time.time() + 60)], since=mark)
+
+    assert "logout" in revoked
+    assert "other" in revoked
+
+
+def test_kept_revocation_is_dropped_once_a_snapshot_has_seen_it():
+    revoked = RevocationList()
+    mark = revoked.mark()
+    revoked.add("logout", time.time() + 60)
+    revoked.replace([], since=mark)
+
+    # A later snapshot that started after the add is authoritative
+    revoked.replace([], since=revoked.mark())
+
+    assert "logout" not in revoked
+
+
+def test_replace_without_mark_keeps_nothing_local():
+    revoked = RevocationList()
+    revoked.add("logout", time.time() + 60)
+
+    revoked.replace([])
+
+    assert revoked.ids == set()
+
+
+def test_principal_cache_invalidation():
+    cache = PrincipalCache()
+    cache.set("admin", "token-1", {"id": "admin"})
+    cache.set("admin", "token-2", {"id": "admin"})
+
+    cache.invalidate_token("token-1")
+    assert cache.get("admin", "token-1") is None
+    assert cache.get("admin", "token-2") == {"id": "admin"}
+
+    cache.invalidate_admin("admin")
+    assert cache.get("admin", "token-2") is None
+
+
+def test_principal_cache_is_bounded():
+    cache = PrincipalCache(max_entries=2)
+    for jti in ("a", "b", "c"):
+        cache.set("admin", jti, {"id": "admin"})
+
+    assert cache.get("admin", "a") is None
+    assert cache.get("admin", "c") is not None
@@ -0,0 +1,89 @@
+import gzip
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from cache import compute_etag, etag_matches
+from compression import CompressionMiddleware, compress, encoded_etag, negotiate
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, None),
+    ("", None),
+    ("gzip", "gzip"),
+    ("GZIP;q=0.5", "gzip"),
+    ("gzip;q=0", None),
+    ("identity", None),
+    ("*", "gzip"),
+    ("*, gzip;q=0", None),
+    ("gzip;q=bogus", None),
+])
+def test_negotiate(accept, expected):
+    assert negotiate(accept, ("gzip",)) == expected
+
+
+def test_negotiate_prefers_higher_weight_then_server_order():
+    assert negotiate("gzip;q=1, br;q=0.5", ("br", "gzip")) == "gzip"
+    assert negotiate("gzip, br", ("br", "gzip")) == "br"
+
+
+def test_encoded_etag_keeps_weakness():
+    assert encoded_etag('"abc"', "gzip") == '"abc-gzip"'
+    assert encoded_etag('W/"abc"', "br") == 'W/"abc-br"'
+
+
+@pytest.mark.parametrize("if_none_match, expected", [
+    (None, False),
+    ("", False),
+    ("*", True),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"other", "abc"', True),
+    ('"abc-gzip"', False),
+])
+def test_etag_matches(if_none_match, expected):
+    assert etag_matches(if_none_match, '"abc"') is expected
+
+
+def test_compute_etag_covers_headers():
+    assert compute_etag(b"body") == compute_etag(b"body", {})
+    assert compute_etag(b"body", {"Content-Type": "text/plain"}) != compute_etag(b"body")
+
+
+@pytest.fixture
+def client():
+    body = b'{"items": "' + b"x" * 4096 + b'"}'
+
+    async def catalog(request):
+        return Response(body, media_type="application/json", headers={"etag": '"catalog"'})
+
+    app = Starlette(routes=[Route("/catalog", catalog)])
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return TestClient(app), body
+
+
+def test_compressed_response_gets_its_own_etag(client):
+    client, body = client
+    response = client.get("/catalog", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == '"catalog-gzip"'
+    assert "accept-encoding" in response.headers["vary"].lower()
+    assert response.content == body
+
+
+def test_identity_response_is_untouched(client):
+    client, body = client
+    response = client.get("/catalog", headers={"Accept-Encoding": "identity"})
+
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == '"catalog"'
+    assert response.content == body
+
+
+def test_gzip_output_is_stable():
+    assert compress(b"same", "gzip") == compress(b"same", "gzip")
+    assert gzip.decompress(compress(b"same", "gzip")) == b"same"
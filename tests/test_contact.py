@@ -0,0 +1,57 @@
+from asyncio import run
+
+import pytest
+
+from contact import MessageBuffer, RateLimiter, client_address, message_hash
+
+
+@pytest.mark.parametrize("forwarded_for, trusted, expected", [
+    # Without trusted proxies the header is client controlled
+    ("6.6.6.6", 0, "10.0.0.1"),
+    (None, 1, "10.0.0.1"),
+    ("203.0.113.7", 1, "203.0.113.7"),
+    # Whatever the client prepended stays left of the trusted hop
+    ("6.6.6.6, 203.0.113.7", 1, "203.0.113.7"),
+    ("6.6.6.6, 203.0.113.7, 10.1.0.5", 2, "203.0.113.7"),
+    # Fewer hops than proxies: the leftmost is the best there is
+    ("203.0.113.7", 3, "203.0.113.7"),
+    (" , ", 1, "10.0.0.1"),
+])
+def test_client_address(forwarded_for, trusted, expected):
+    assert client_address("10.0.0.1", forwarded_for, trusted) == expected
+
+
+def test_client_address_without_peer():
+    assert client_address(None, None, 0) == "unknown"
+
+
+def test_message_hash_ignores_case_and_whitespace():
+    assert message_hash("A@b.co", "Hi  there", "Hello\nworld", 3600, now=0) == \
+        message_hash("a@b.co", "hi there", "hello world", 3600, now=0)
+    assert message_hash("a@b.co", "hi", "hello", 3600, now=0) != message_hash("a@b.co", "hi", "bye", 3600, now=0)
+
+
+def test_message_hash_changes_with_the_time_bucket():
+    first = message_hash("a@b.co", "hi", "hello", 3600, now=10)
+
+    assert message_hash("a@b.co", "hi", "hello", 3600, now=3599) == first
+    assert message_hash("a@b.co", "hi", "hello", 3600, now=3600) != first
+
+
+def test_rate_limiter_buckets_per_key():
+    limiter = RateLimiter(rate=0.001, burst=2)
+
+    assert limiter.acquire("a") == 0
+    assert limiter.acquire("a") == 0
+    assert limiter.acquire("a") > 0
+    assert limiter.acquire("b") == 0
+
+
+def test_message_buffer_drops_repeats_and_stamps_writes(mongo):
+    buffer = MessageBuffer(mongo.contact_messages)
+    doc = {"id": "1", "content_hash": message_hash("a@b.co", "hi", "hello", 3600, now=0)}
+
+    assert buffer.add(doc) is True
+    assert buffer.add({**doc, "id": "2"}) is False
+    assert run(buffer.flush()) == {"inserted": 1, "duplicates": 0}
+    assert run(mongo.contact_messages.find_one({"id": "1"}))["updated_at"]
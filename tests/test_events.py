@@ -0,0 +1,81 @@
+from asyncio import run
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from events import ChangeFeed
+
+
+def stamp(seconds=0):
+    return (datetime.now(timezone.utc) + timedelta(seconds=seconds)).isoformat()
+
+
+@pytest.fixture
+def feed(mongo):
+    run(mongo.media.insert_one({"id": "existing", "title": "Old", "updated_at": stamp(-60)}))
+    feed = ChangeFeed(mongo, collections=("media",), mode="poll", overlap=1.0)
+    run(feed._poll())
+    return feed
+
+
+def events(feed, after=0):
+    return [(event["op"], event["id"]) for seq, event in feed._log if seq > after]
+
+
+def test_first_poll_only_records_the_baseline(feed):
+    assert events(feed) == []
+
+
+def test_inserts_and_updates_are_read_incrementally(feed, mongo):
+    run(mongo.media.insert_one({"id": "new", "title": "New", "updated_at": stamp()}))
+    run(mongo.media.update_one({"id": "existing"}, {"$set": {"title": "Edited", "updated_at": stamp(1)}}))
+    run(feed._poll())
+
+    assert events(feed) == [("insert", "new"), ("update", "existing")]
+    assert feed._log[-1][1]["doc"]["title"] == "Edited"
+
+
+def test_unchanged_documents_inside_the_overlap_are_not_repeated(feed, mongo):
+    run(mongo.media.insert_one({"id": "new", "updated_at": stamp()}))
+    run(feed._poll())
+    seq = feed._seq
+    run(feed._poll())
+
+    assert events(feed, after=seq) == []
+
+
+def test_deletes_are_caught_by_the_count_check(feed, mongo):
+    run(mongo.media.delete_one({"id": "existing"}))
+    run(feed._poll())
+
+    assert events(feed) == [("delete", "existing")]
+
+
+def test_writes_behind_the_watermark_are_caught_by_the_count_check(feed, mongo):
+    run(mongo.media.insert_one({"id": "late", "updated_at": stamp(-3600)}))
+    run(feed._poll())
+
+    assert events(feed) == [("insert", "late")]
+
+
+def test_periodic_rescan_catches_what_the_count_hides(mongo):
+    run(mongo.media.insert_one({"id": "existing", "updated_at": stamp(-60)}))
+    feed = ChangeFeed(mongo, collections=("media",), mode="poll", rescan_every=2)
+    run(feed._poll())
+    run(mongo.media.delete_one({"id": "existing"}))
+    run(mongo.media.insert_one({"id": "late", "updated_at": stamp(-3600)}))
+    run(feed._poll())
+    assert events(feed) == []
+
+    run(feed._poll())
+    assert sorted(events(feed)) == [("delete", "existing"), ("insert", "late")]
+
+
+def test_resume_position(feed, mongo):
+    run(mongo.media.insert_one({"id": "new", "updated_at": stamp()}))
+    run(feed._poll())
+
+    assert feed._resume_seq(feed._event_id(0)) == 0
+    assert feed._resume_seq(feed._event_id(feed._seq + 1)) is None
+    assert feed._resume_seq("another-process-0") is None
+    assert feed._resume_seq(None) == feed._seq
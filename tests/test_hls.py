@@ -0,0 +1,35 @@
+from pathlib import Path
+
+import pytest
+
+from hls import DEFAULT_FRAME_RATE, HLS_LADDER, SEGMENT_SECONDS, _frame_rate, ffmpeg_args, select_ladder
+
+
+@pytest.mark.parametrize("video, expected", [
+    ({"avg_frame_rate": "30000/1001", "r_frame_rate": "30/1"}, 30000 / 1001),
+    ({"avg_frame_rate": "0/0", "r_frame_rate": "25/1"}, 25.0),
+    ({"avg_frame_rate": "60"}, 60.0),
+    ({"avg_frame_rate": "bogus"}, DEFAULT_FRAME_RATE),
+    ({}, DEFAULT_FRAME_RATE),
+])
+def test_frame_rate(video, expected):
+    assert _frame_rate(video) == pytest.approx(expected)
+
+
+def option_values(args, name):
+    return [args[i + 1] for i, arg in enumerate(args) if arg == name]
+
+
+def test_keyframes_follow_segment_boundaries_at_any_frame_rate():
+    ladder = select_ladder(1080)
+    args = ffmpeg_args("ffmpeg", Path("in.mp4"), Path("out"), ladder, has_audio=True, frame_rate=60)
+
+    assert option_values(args, "-force_key_frames") == [f"expr:gte(t,n_forced*{SEGMENT_SECONDS})"] * len(ladder)
+    assert option_values(args, "-g") == [str(60 * SEGMENT_SECONDS)] * len(ladder)
+
+
+def test_ladder_never_upscales():
+    heights = [r.height for r in select_ladder(720)]
+
+    assert heights and max(heights) <= 720
+    assert select_ladder(100) == [min(HLS_LADDER, key=lambda r: r.height)]
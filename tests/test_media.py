@@ -0,0 +1,90 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+
+def upload(api, *items):
+    """Upload one file per ``(content, category)`` and return the media ids."""
+    files = [("files", (f"photo{i}.jpg", data, "image/jpeg")) for i, (data, _) in enumerate(items)]
+    metadata = json.dumps([{"category": category} for _, category in items])
+    results = api.post("/api/media/upload/batch", files=files, data={"metadata": metadata}).json()["results"]
+    return [r["media"]["id"] for r in results]
+
+
+def counts(api, server):
+    docs = api.portal.call(lambda: server.db.categories.find({}, {"_id": 0}).to_list(None))
+    return {doc["name"]: doc["count"] for doc in docs if doc["count"]}
+
+
+def claim(api, server, media_id, age):
+    claimed_at = (datetime.now(timezone.utc) - timedelta(seconds=age)).isoformat()
+    api.portal.call(
+        server.db.media.update_one,
+        {"id": media_id}, {"$set": {"deleting": "another-request", "deleting_at": claimed_at}}
+    )
+
+
+def find_blob(api, server, media_id):
+    media = api.portal.call(server.db.media.find_one, {"id": media_id})
+    return api.portal.call(server.db.blobs.find_one, {"sha256": media["sha256"]})
+
+
+@pytest.fixture
+def media(api):
+    return upload(api, (b"one", "Portrait"), (b"two", "Portrait"), (b"two", "Landscape"))
+
+
+def test_batch_update_moves_category_counts(api, server, media):
+    response = api.patch("/api/media", json=[
+        {"id": media[0], "category": "Landscape"},
+        {"id": media[2], "category": "Landscape"},
+        {"id": "missing", "category": "Street"},
+        {"id": media[1]},
+    ])
+
+    assert [r["status"] for r in response.json()["results"]] == ["updated", "updated", "not_found", "invalid"]
+    assert counts(api, server) == {"Portrait": 1, "Landscape": 2}
+
+
+def test_batch_update_counts_from_what_it_replaced(api, server, media):
+    # Moved by someone else after the batch was prepared
+    api.portal.call(server.db.media.update_one, {"id": media[0]}, {"$set": {"category": "Street"}})
+    api.portal.call(server.category_counts.move, "Portrait", "Street")
+
+    api.patch("/api/media", json=[{"id": media[0], "category": "Landscape"}])
+
+    assert counts(api, server) == {"Portrait": 1, "Landscape": 2}
+
+
+def test_batch_delete_releases_shared_blobs_once(api, server, media):
+    response = api.post("/api/media/delete", json={"ids": [media[1], "missing", media[1]]})
+
+    assert response.json()["results"] == [{"id": media[1], "status": "deleted"}, {"id": "missing", "status": "not_found"}]
+    assert find_blob(api, server, media[2])["refcount"] == 1
+    assert counts(api, server) == {"Portrait": 1, "Landscape": 1}
+
+
+def test_batch_delete_skips_media_claimed_by_another_delete(api, server, media):
+    claim(api, server, media[0], age=0)
+
+    response = api.post("/api/media/delete", json={"ids": [media[0], media[1]]})
+
+    assert [r["status"] for r in response.json()["results"]] == ["in_progress", "deleted"]
+    assert counts(api, server) == {"Portrait": 1, "Landscape": 1}
+    assert api.portal.call(server.db.media.find_one, {"id": media[0]})["deleting"] == "another-request"
+
+
+def test_single_delete_respects_the_claim(api, server, media):
+    claim(api, server, media[0], age=0)
+
+    assert api.delete(f"/api/media/{media[0]}").status_code == 409
+    assert counts(api, server) == {"Portrait": 2, "Landscape": 1}
+
+
+def test_abandoned_claims_expire(api, server, media):
+    claim(api, server, media[0], age=server.MEDIA_DELETE_CLAIM_SECONDS + 60)
+
+    assert api.delete(f"/api/media/{media[0]}").status_code == 200
+    assert counts(api, server) == {"Portrait": 1, "Landscape": 1}
+    assert api.delete(f"/api/media/{media[0]}").status_code == 404
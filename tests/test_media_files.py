@@ -0,0 +1,98 @@
+import gzip
+
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+from media_files import MAX_RANGES, MediaFiles, parse_range
+
+BODY = bytes(range(256)) * 4
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", [(0, 99)]),
+    ("bytes=1000-", [(1000, 1023)]),
+    ("bytes=-24", [(1000, 1023)]),
+    ("bytes=-5000", [(0, 1023)]),
+    ("bytes=1000-5000", [(1000, 1023)]),
+    ("bytes=0-0, 10-19", [(0, 0), (10, 19)]),
+    # Unsatisfiable parts are dropped, leaving nothing to serve
+    ("bytes=2000-2100", []),
+    ("bytes=-0", []),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, len(BODY)) == expected
+
+
+@pytest.mark.parametrize("header", ["items=0-1", "bytes=", "bytes=5", "bytes=a-b", "bytes=20-10"])
+def test_parse_range_ignores_malformed_headers(header):
+    assert parse_range(header, len(BODY)) is None
+
+
+def test_parse_range_ignores_too_many_ranges():
+    header = "bytes=" + ",".join(f"{i}-{i}" for i in range(MAX_RANGES + 1))
+    assert parse_range(header, len(BODY)) is None
+
+
+@pytest.fixture
+def files(tmp_path):
+    (tmp_path / "clip.mp4").write_bytes(BODY)
+    app = Starlette(routes=[Mount("/files", app=MediaFiles(tmp_path, "public, max-age=60"))])
+    return TestClient(app)
+
+
+def test_single_range(files):
+    response = files.get("/files/clip.mp4", headers={"Range": "bytes=10-19"})
+
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 10-19/{len(BODY)}"
+    assert response.content == BODY[10:20]
+
+
+def test_multiple_ranges_are_sent_as_multipart(files):
+    response = files.get("/files/clip.mp4", headers={"Range": "bytes=0-3, 100-103"})
+
+    assert response.status_code == 206
+    content_type, _, boundary = response.headers["content-type"].partition("; boundary=")
+    assert content_type == "multipart/byteranges"
+    assert int(response.headers["content-length"]) == len(response.content)
+    expected = b"".join(
+        f"--{boundary}\r\nContent-Type: video/mp4\r\nContent-Range: bytes {start}-{end}/{len(BODY)}\r\n\r\n".encode()
+        + BODY[start:end + 1] + b"\r\n"
+        for start, end in ((0, 3), (100, 103))
+    ) + f"--{boundary}--\r\n".encode()
+    assert response.content == expected
+
+
+def test_unsatisfiable_range(files):
+    response = files.get("/files/clip.mp4", headers={"Range": "bytes=5000-"})
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(BODY)}"
+
+
+def test_conditional_get_uses_the_etag(files):
+    etag = files.get("/files/clip.mp4").headers["etag"]
+
+    assert files.get("/files/clip.mp4", headers={"If-None-Match": etag}).status_code == 304
+    assert files.get("/files/clip.mp4", headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+
+
+def test_precompressed_sidecar_has_its_own_etag(files, tmp_path):
+    (tmp_path / "clip.mp4.gz").write_bytes(gzip.compress(BODY))
+    plain = files.get("/files/clip.mp4", headers={"Accept-Encoding": "identity"})
+    encoded = files.get("/files/clip.mp4", headers={"Accept-Encoding": "gzip"})
+
+    assert encoded.headers["content-encoding"] == "gzip"
+    assert encoded.headers["etag"] == plain.headers["etag"][:-1] + '-gzip"'
+    assert files.get(
+        "/files/clip.mp4", headers={"Accept-Encoding": "gzip", "If-None-Match": plain.headers["etag"]}
+    ).status_code == 200
+
+
+def test_hidden_entries_are_not_served(files, tmp_path):
+    (tmp_path / ".partial").mkdir()
+    (tmp_path / ".partial" / "upload.part").write_bytes(b"partial")
+
+    assert files.get("/files/.partial/upload.part").status_code == 404
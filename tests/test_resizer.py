@@ -0,0 +1,72 @@
+import asyncio
+import io
+
+import pytest
+
+from resizer import (
+    RESIZE_FORMATS, DerivedImageCache, ResizeSpec, UndecodableImage, render_resized, snap_up,
+)
+
+Image = pytest.importorskip("PIL.Image")
+features = pytest.importorskip("PIL.features")
+
+
+@pytest.mark.parametrize("value, expected", [(None, None), (1, 160), (160, 160), (161, 320), (9999, 640)])
+def test_snap_up(value, expected):
+    assert snap_up(value, (160, 320, 640)) == expected
+
+
+def test_avif_only_offered_when_pillow_can_encode_it():
+    assert ("avif" in RESIZE_FORMATS) == bool(features.check("avif"))
+
+
+def write_image(path, size=(400, 200), fmt="JPEG"):
+    Image.new("RGB", size, (200, 30, 30)).save(path, format=fmt)
+    return path
+
+
+def test_render_fits_inside_the_box(tmp_path):
+    source = write_image(tmp_path / "source.jpg")
+    render_resized(source, tmp_path / "out.webp", ResizeSpec(width=100, height=None, fmt="webp", quality=80))
+
+    with Image.open(tmp_path / "out.webp") as out:
+        assert out.size == (100, 50)
+        assert out.format == "WEBP"
+
+
+def test_render_never_upscales(tmp_path):
+    source = write_image(tmp_path / "source.jpg")
+    render_resized(source, tmp_path / "out.jpg", ResizeSpec(width=1600, height=None, fmt="jpeg", quality=80))
+
+    with Image.open(tmp_path / "out.jpg") as out:
+        assert out.size == (400, 200)
+
+
+def test_truncated_source_is_undecodable(tmp_path):
+    data = io.BytesIO()
+    Image.new("RGB", (400, 200)).save(data, format="JPEG")
+    source = tmp_path / "broken.jpg"
+    source.write_bytes(data.getvalue()[:200])
+
+    with pytest.raises(UndecodableImage):
+        render_resized(source, tmp_path / "out.jpg", ResizeSpec(width=100, height=None, fmt="jpeg", quality=80))
+    assert not (tmp_path / "out.jpg").exists()
+
+
+def test_missing_source_is_not_mistaken_for_corrupt(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        render_resized(tmp_path / "gone.jpg", tmp_path / "out.jpg", ResizeSpec(100, None, "jpeg", 80))
+
+
+def test_concurrent_requests_share_one_render(tmp_path):
+    source = write_image(tmp_path / "source.jpg")
+    cache = DerivedImageCache(tmp_path / "cache", max_bytes=10 * 1024 * 1024)
+    spec = ResizeSpec(width=160, height=None, fmt="jpeg", quality=65)
+
+    async def fetch_twice():
+        return await asyncio.gather(cache.get(source, spec), cache.get(source, spec))
+
+    first, second = asyncio.run(fetch_twice())
+
+    assert first == second and first.exists()
+    assert cache.misses == 1
@@ -0,0 +1,79 @@
+from asyncio import run
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from storage import BlobStore, stage_file
+
+
+@pytest.fixture
+def store(mongo, tmp_path):
+    run(mongo.blobs.create_index("sha256", unique=True))
+    root = tmp_path / "blobs"
+    root.mkdir()
+    return BlobStore(root, mongo.blobs)
+
+
+def put(store, tmp_path, data=b"same bytes", name="upload.part"):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return run(store.put(run(stage_file(path)), ".jpg"))
+
+
+def test_identical_uploads_share_one_blob(store, mongo, tmp_path):
+    first = put(store, tmp_path, name="a.part")
+    second = put(store, tmp_path, name="b.part")
+
+    assert first.path == second.path
+    assert first.path.read_bytes() == b"same bytes"
+    assert not (tmp_path / "b.part").exists()
+    assert run(mongo.blobs.find_one({"sha256": first.sha256}))["refcount"] == 2
+
+
+def test_file_removed_with_last_reference(store, mongo, tmp_path):
+    stored = put(store, tmp_path, name="a.part")
+    put(store, tmp_path, name="b.part")
+
+    assert run(store.release(stored.sha256)) is False
+    assert stored.path.exists()
+    assert run(store.release(stored.sha256)) is True
+    assert not stored.path.exists()
+    assert run(mongo.blobs.find_one({"sha256": stored.sha256})) is None
+
+
+def test_release_never_drops_below_zero(store, mongo, tmp_path):
+    stored = put(store, tmp_path)
+    # A blob document whose count already reached zero, e.g. after a crash
+    # between the decrement and the delete claim
+    run(mongo.blobs.update_one({"sha256": stored.sha256}, {"$set": {"refcount": 0}}))
+
+    assert run(store.release(stored.sha256)) is None
+    assert run(mongo.blobs.find_one({"sha256": stored.sha256}))["refcount"] == 0
+    assert stored.path.exists()
+
+
+def test_release_ignores_blob_being_deleted(store, mongo, tmp_path):
+    stored = put(store, tmp_path)
+    run(mongo.blobs.update_one(
+        {"sha256": stored.sha256}, {"$set": {"deleting_since": datetime.now(timezone.utc).isoformat()}}
+    ))
+
+    assert run(store.release(stored.sha256)) is None
+    assert run(mongo.blobs.find_one({"sha256": stored.sha256}))["refcount"] == 1
+
+
+def test_release_of_unknown_hash(store):
+    assert run(store.release("0" * 64)) is None
+
+
+def test_put_takes_over_stale_delete_claim(store, mongo, tmp_path):
+    stored = put(store, tmp_path, name="a.part")
+    stale = (datetime.now(timezone.utc) - timedelta(days=1)).isoformat()
+    run(mongo.blobs.update_one({"sha256": stored.sha256}, {"$set": {"refcount": 0, "deleting_since": stale}}))
+
+    again = put(store, tmp_path, name="b.part")
+
+    blob = run(mongo.blobs.find_one({"sha256": again.sha256}))
+    assert blob["refcount"] == 1
+    assert "deleting_since" not in blob
+    assert again.path.read_bytes() == b"same bytes"
@@ -0,0 +1,133 @@
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+
+DATA = b"\xff\xd8" + bytes(range(256)) * 8
+
+
+def start_upload(api, size=len(DATA)):
+    response = api.post("/api/media/uploads", json={"filename": "photo.jpg", "size": size, "title": "Photo"})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def send_part(api, upload_id, data=DATA, offset=0):
+    return api.patch(f"/api/media/uploads/{upload_id}", content=data, headers={"Upload-Offset": str(offset)})
+
+
+def find_session(api, server, upload_id):
+    # Mongo calls must run on the client's event loop
+    return api.portal.call(server.db.upload_sessions.find_one, {"id": upload_id})
+
+
+def hold_lease(api, server, upload_id, lease, expires_in):
+    expires_at = (datetime.now(timezone.utc) + timedelta(seconds=expires_in)).isoformat()
+    api.portal.call(
+        server.db.upload_sessions.update_one,
+        {"id": upload_id}, {"$set": {"status": "writing", "lease": lease, "lease_expires_at": expires_at}}
+    )
+
+
+def find_blob(api, server, data=DATA):
+    return api.portal.call(server.db.blobs.find_one, {"sha256": hashlib.sha256(data).hexdigest()})
+
+
+def test_resumable_upload(api, server):
+    upload_id = start_upload(api)
+    assert send_part(api, upload_id, DATA[:100]).headers["Upload-Offset"] == "100"
+    assert send_part(api, upload_id, DATA[100:], offset=100).status_code == 200
+
+    response = api.post(f"/api/media/uploads/{upload_id}/complete")
+
+    assert response.status_code == 200
+    assert find_blob(api, server)["refcount"] == 1
+    assert find_session(api, server, upload_id) is None
+
+
+def test_part_refused_while_another_holds_the_lease(api, server):
+    upload_id = start_upload(api)
+    hold_lease(api, server, upload_id, "other", expires_in=300)
+
+    response = send_part(api, upload_id)
+
+    assert response.status_code == 409
+    assert response.headers["Upload-Offset"] == "0"
+    assert not server.upload_part_path(upload_id).exists()
+
+
+def test_expired_lease_is_taken_over(api, server):
+    upload_id = start_upload(api)
+    hold_lease(api, server, upload_id, "crashed", expires_in=-300)
+
+    assert send_part(api, upload_id).status_code == 200
+    session = find_session(api, server, upload_id)
+    assert session["status"] == "active" and session["offset"] == len(DATA)
+    assert "lease" not in session
+
+
+def test_failed_store_leaves_the_upload_retryable(api, server, monkeypatch):
+    upload_id = start_upload(api)
+    send_part(api, upload_id)
+    put = server.blob_store.put
+
+    async def failing_put(staged, suffix):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(server.blob_store, "put", failing_put)
+    assert api.post(f"/api/media/uploads/{upload_id}/complete").status_code == 500
+    assert find_session(api, server, upload_id)["status"] == "active"
+
+    monkeypatch.setattr(server.blob_store, "put", put)
+    assert api.post(f"/api/media/uploads/{upload_id}/complete").status_code == 200
+
+
+def test_failed_publish_releases_the_blob(api, server, monkeypatch):
+    upload_id = start_upload(api)
+    send_part(api, upload_id)
+
+    async def failing_create(*args, **kwargs):
+        raise RuntimeError("insert failed")
+
+    monkeypatch.setattr(server, "create_media_record", failing_create)
+    assert api.post(f"/api/media/uploads/{upload_id}/complete").status_code == 500
+
+    assert find_blob(api, server) is None
+    assert find_session(api, server, upload_id) is None
+
+
+def upload_batch(api, *contents):
+    files = [("files", (f"photo{i}.jpg", data, "image/jpeg")) for i, data in enumerate(contents)]
+    return api.post("/api/media/upload/batch", files=files, data={"metadata": json.dumps([{}] * len(contents))})
+
+
+def test_batch_upload(api, server):
+    response = upload_batch(api, DATA, b"other")
+
+    assert [r["status"] for r in response.json()["results"]] == ["created", "created"]
+    assert api.portal.call(server.db.media.count_documents, {}) == 2
+
+
+def test_batch_upload_over_the_total_limit(api, server, monkeypatch):
+    monkeypatch.setattr(server, "MEDIA_BATCH_MAX_BYTES", len(DATA))
+
+    assert upload_batch(api, DATA, DATA).status_code == 413
+
+
+def test_batch_upload_needs_a_declared_length(api):
+    response = api.post(
+        "/api/media/upload/batch", content=iter([b"--x--\r\n"]),
+        headers={"Content-Type": "multipart/form-data; boundary=x"}
+    )
+
+    assert response.status_code == 411
+
+
+def test_failed_batch_publish_releases_the_blobs(api, server, monkeypatch):
+    async def failing_publish(media_docs):
+        raise RuntimeError("insert failed")
+
+    monkeypatch.setattr(server, "publish_media", failing_publish)
+    response = upload_batch(api, DATA)
+
+    assert [r["status"] for r in response.json()["results"]] == ["failed"]
+    assert find_blob(api, server) is None